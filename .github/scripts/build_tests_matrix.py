@@ -13,39 +13,82 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import argparse
+import heapq
+import json
 import os
-import yaml
+import sys
 
-def main():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../tools/scripts"))
+from test_list_resolver import resolve_tests
+
+def get_test_list():
+    # L0 regression tests, minus the Verilator skip list and $EXCLUDE_TESTS
+    excluded = [s.strip() for s in os.environ.get("EXCLUDE_TESTS", "").split(",")]
+    return resolve_tests("L0_regression", simulator="verilator", excluded=excluded)
 
-    # Load and parse YAML description    
-    file_name = "src/integration/stimulus/L0_regression.yml"
+def load_durations(file_name):
+    # Recorded per-test run times: {test: seconds}, {test: {"seconds": ...}} or
+    # a sim_perf.json of run_verilator_l0_regression.py ({"tests": {...}})
+    if not file_name or not os.path.exists(file_name):
+        return {}
     with open(file_name, "r") as fp:
-        yaml_root = yaml.safe_load(fp)
+        records = json.load(fp)
+    if isinstance(records.get("tests"), dict):
+        records = records["tests"]
+    durations = {}
+    for test, record in records.items():
+        seconds = record.get("seconds") if isinstance(record, dict) else record
+        if seconds is not None:
+            durations[test] = float(seconds)
+    return durations
 
-    # Get excluded test list
-    excluded = os.environ.get("EXCLUDE_TESTS", "")
-    excluded = [s.strip() for s in excluded.strip().split(",")]
+def build_buckets(tests, durations, num_buckets, default_duration=None):
+    # Greedy LPT: longest test first, always into the bucket with the least
+    # total run time. Tests without a recorded duration get the mean one, so
+    # without any durations the buckets balance by test count.
+    if default_duration is None:
+        known = [durations[t] for t in tests if t in durations]
+        default_duration = sum(known) / len(known) if known else 1.0
+    weighted = sorted(((durations.get(t, default_duration), t) for t in dict.fromkeys(tests)),
+                      key=lambda x: (-x[0], x[1]))
 
-    # Get test list
-    content = yaml_root["contents"][0]
-    tests = content["tests"]
-    paths = tests["paths"]
+    buckets = [{"name": f"bucket{i}", "tests": [], "seconds": 0.0} for i in range(min(num_buckets, len(weighted)))]
+    heap = [(0.0, i) for i in range(len(buckets))]
+    for seconds, test in weighted:
+        total, i = heapq.heappop(heap)
+        buckets[i]["tests"].append(test)
+        buckets[i]["seconds"] = total + seconds
+        heapq.heappush(heap, (total + seconds, i))
 
-    # Extract test names from paths
-    test_list = []
-    for path in paths:
-        parts = path.split("/")
+    for bucket in buckets:
+        bucket["tests"] = " ".join(bucket["tests"])
+        if durations:
+            bucket["seconds"] = round(bucket["seconds"])
+        else:
+            del bucket["seconds"]
+    return buckets
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Verilator smoke test matrix from L0_regression.yml")
+    parser.add_argument("--buckets", type=int, default=0,
+                        help="emit a JSON list of this many buckets instead of one entry per test, "
+                             "balanced by --durations if given, else by test count")
+    parser.add_argument("--durations", default=None,
+                        help="recorded per-test run times in seconds (JSON), e.g. the sim_perf.json "
+                             "of run_verilator_l0_regression.py")
+    parser.add_argument("--default-duration", type=float, default=None,
+                        help="seconds assumed for tests without a recorded duration (default: the mean)")
+    args = parser.parse_args()
 
-        for i, part in enumerate(parts):
-            if part == "test_suites" and i + 1 < len(parts):
-                test_name = parts[i+1]
-                if test_name not in excluded:
-                    test_list.append(test_name)
-                break
+    test_list = get_test_list()
 
     # Output names
-    print(test_list)
+    if args.buckets <= 0:
+        print(test_list)
+    else:
+        buckets = build_buckets(test_list, load_durations(args.durations), args.buckets, args.default_duration)
+        print(json.dumps(buckets, separators=(",", ":")))
 
 if __name__ == "__main__":
     main()
@@ -19,148 +19,162 @@
 # This script generates:
 # UDS, key, IV, ciphertext
 # FE, key, IV, ciphertext
+#
+# AES runs in-process with the "cryptography" package (pip install cryptography)
+# and falls back to the openssl command line tool when it is not installed.
 #********************************************************************************
+import argparse
+import multiprocessing
 import os
-import subprocess
-import re
 import random
 import secrets
-from pathlib import Path
-
-def encrypt(plaintext_filename, key_str, iv_str):
-    #Encrypt UDS (to be used to drive DOE)
-    command = 'cat '+ plaintext_filename +' | xxd -r -ps | openssl enc -aes-256-cbc -e -out temp -K ' + key_str + ' -iv ' + iv_str + ' -nopad'
-    subprocess.run(command, shell=True)
-    command = 'xxd -p -c 1000 temp'
-    encrypted = subprocess.check_output(command, shell=True)
-    cipher_str = str(encrypted)[2:-3] #Chomp extra chars and convert to string
-    return cipher_str
-
-def decrypt_and_compare(ciphertext_filename, key_str, iv_str, plain_str, flow):
-    #Decrypt previous (this step is only to make sure openssl command is working)
-    command = 'cat ' + ciphertext_filename + ' | xxd -r -ps | openssl enc -aes-256-cbc -d -out temp -K ' + key_str + ' -iv ' + iv_str + ' -nopad'
-    subprocess.run(command, shell=True)
-    command = 'xxd -p -c 1000 temp'
-    decrypted = subprocess.check_output(command, shell=True)
-    decrypted_str = str(decrypted)[2:-3]
+import struct
+import subprocess
+import sys
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
+
+CALIPTRA_ROOT = os.environ.get("CALIPTRA_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../.."))
+sys.path.insert(0, os.path.join(CALIPTRA_ROOT, "tools/scripts"))
+from atomic_file import atomic_open, write_atomic
+
+# (flow, plaintext bytes) of one vector set; all three share the obfuscation key
+DOE_FLOWS = (("UDS", 64), ("FE", 32), ("HEK", 32))
+
+# Bytes of one set in the bulk files: key, IV, plaintext, ciphertext per flow
+DOE_SET_BYTES = sum(32 + 16 + 2 * plain_bytes for _, plain_bytes in DOE_FLOWS)
+
+# Binary bulk file header: magic, version, number of sets, bytes per set
+DOE_BIN_MAGIC = b"DOEV"
+DOE_BIN_HEADER = struct.Struct("<4sIII")
+
+def openssl_aes_256_cbc(data, key, iv, direction):
+    #AES-256-CBC through the openssl command line tool, direction is "-e" or "-d"
+    command = ["openssl", "enc", "-aes-256-cbc", direction, "-K", key.hex(), "-iv", iv.hex(), "-nopad"]
+    return subprocess.run(command, input=data, stdout=subprocess.PIPE, check=True).stdout
+
+def encrypt(plaintext, key, iv):
+    #AES-256-CBC without padding, plaintext is a whole number of blocks
+    if Cipher is None:
+        return openssl_aes_256_cbc(plaintext, key, iv, "-e")
+    encryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).encryptor()
+    return encryptor.update(plaintext) + encryptor.finalize()
+
+def decrypt_and_compare(ciphertext, key, iv, plaintext, flow):
+    #Decrypt again (this step is only to make sure the encryption round-trips)
+    if Cipher is None:
+        decrypted = openssl_aes_256_cbc(ciphertext, key, iv, "-d")
+    else:
+        decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+        decrypted = decryptor.update(ciphertext) + decryptor.finalize()
 
     #Compare decrypted and plaintext to make sure they're matching
-    if decrypted_str != plain_str:
-        print(decrypted_str+'\n'+plain_str)
-        print("Plaintext mismatch when decrypting " + flow + "! Check openssl command\n")
-
-def generate_rand_bytes(num_bytes): #(key_bytes, iv_bytes, plaintext_bytes):
-    #Generate 256-bit OBF KEY - UDS
-    #key_str = str(secrets.token_hex(key_bytes)) #OBF KEY - 256 bit
-
-    #Generate 128-bit IV
-    #iv_str = str(secrets.token_hex(iv_bytes)) #IV - 128 bit
-
-    #Generate 384-bit UDS (plaintext)
-    #plain_str = str(secrets.token_hex(plaintext_bytes)) #UDS - 384 bit (12 dwords)
-    #return key_str, iv_str, plain_str
-    rand_str = str(secrets.token_hex(num_bytes))
-    return rand_str
-
-
-def generate_doe_testvector():
-    f = open("doe_test_vector.txt", "w")
-    g = open("doe_test_vectors_all.txt", "a")
-    
-    #-------------------------------------
-    #UDS
-    #-------------------------------------
-    p = open("uds", "w")
-    c = open("ciphertext", "w")
-
-    #key_str, iv_str, plain_str = generate_rand_bytes(32, 16, 64)
-    key_str     = generate_rand_bytes(32)
-    iv_str      = generate_rand_bytes(16)
-    plain_str   = generate_rand_bytes(64)
-    # key_str = "002ec695b21f27581a745c72e5b9f484865bc95eb10a13d584f57062166838d6"
-    # iv_str = "a07b6cf2c26e78194b698f30ed0f5bdb"
-    # plain_str = "754e68e5bdb5df41fca420e77655c76fe8ac8e4bc55727b2132bfdf9419a3b21b0dcc413c6f3f64a9b2d6cc1d861065b"
-    p.write(plain_str)
-    p.close()
-
-    #Encrypt plaintext
-    cipher_str = encrypt("uds", key_str, iv_str)
-    c.write(cipher_str)
-    c.close()
-
-    #Decrypt ciphertext and make sure it matches with generated plaintext
-    decrypt_and_compare("ciphertext", key_str, iv_str, plain_str, "UDS")
-    
-
-    #Write all values to a file to be used in test
-    f.write(key_str+'\n'+iv_str+'\n'+plain_str+'\n'+cipher_str+'\n')
-    g.write("OBF UDS key: "+key_str+'\n'+ "IV: "+iv_str+'\n'+ "UDS plaintext: "+plain_str+'\n'+ "UDS ciphertext: "+cipher_str+'\n')
-
-    #-------------------------------------
-    #FE
-    #-------------------------------------
-    p = open("fe", "w")
-    c = open("ciphertext", "w")
-    
-    plain_str = "" #Clear out plain str
-    #iv_str, plain_str = generate_rand_bytes(16, 32) #Use same key as UDS
-    iv_str      = generate_rand_bytes(16)
-    plain_str   = generate_rand_bytes(32)
-    p.write(plain_str)
-    p.close()
-
-    #Encrypt plaintext
-    cipher_str = encrypt("fe", key_str, iv_str)
-    c.write(cipher_str)
-    c.close()
-
-    #Decrypt ciphertext and make sure it matches with generated plaintext
-    decrypt_and_compare("ciphertext", key_str, iv_str, plain_str, "FE")
-    
+    if decrypted != plaintext:
+        print(decrypted.hex()+'\n'+plaintext.hex())
+        print("Plaintext mismatch when decrypting " + flow + "!\n")
+
+def generate_rand_bytes(num_bytes):
+    return secrets.token_bytes(num_bytes)
+
+def seeded_rand_bytes(seed, set_id):
+    #Set set_id of a seed is reproducible on its own, independent of the other sets
+    return random.Random("doe:%d:%d" % (seed, set_id)).randbytes
+
+def generate_doe_vector_set(rand_bytes=generate_rand_bytes):
+    """Returns [(flow, key, iv, plaintext, ciphertext)] for UDS, FE and HEK"""
+    key = rand_bytes(32) #OBF KEY - 256 bit, same key for all flows
+    vector_set = []
+    for flow, plain_bytes in DOE_FLOWS:
+        iv = rand_bytes(16) #IV - 128 bit
+        plaintext = rand_bytes(plain_bytes)
+        ciphertext = encrypt(plaintext, key, iv)
+        decrypt_and_compare(ciphertext, key, iv, plaintext, flow)
+        vector_set.append((flow, key, iv, plaintext, ciphertext))
+    return vector_set
+
+def format_vector_set(vector_set):
+    #key, IV, plaintext, ciphertext per flow, one hex value per line (read by caliptra_top_tb_services)
+    return "".join(key.hex()+'\n'+iv.hex()+'\n'+plaintext.hex()+'\n'+ciphertext.hex()+'\n'
+                   for _, key, iv, plaintext, ciphertext in vector_set)
+
+def format_log(vector_set):
+    text = "".join("OBF "+flow+" key: "+key.hex()+'\n'+"IV: "+iv.hex()+'\n'+
+                   flow+" plaintext: "+plaintext.hex()+'\n'+flow+" ciphertext: "+ciphertext.hex()+'\n'
+                   for flow, key, iv, plaintext, ciphertext in vector_set)
+    return text + '---------------------------------\n'
+
+def generate_doe_testvector(num_sets=1, out_path="doe_test_vector.txt", log_path="doe_test_vectors_all.txt",
+                            seed=None):
+    if seed is None:
+        vector_sets = [generate_doe_vector_set() for _ in range(num_sets)]
+    else:
+        vector_sets = [generate_doe_vector_set(seeded_rand_bytes(seed, set_id)) for set_id in range(num_sets)]
 
     #Write all values to a file to be used in test
-    f.write(key_str+'\n'+iv_str+'\n'+plain_str+'\n'+cipher_str+'\n')
-    g.write("OBF FE key: "+key_str+'\n'+"IV: "+iv_str+'\n'+"FE plaintext: "+plain_str+'\n'+"FE ciphertext: "+cipher_str+'\n')
-
-    #-------------------------------------
-    #HEK
-    #-------------------------------------
-    p = open("hek", "w")
-    c = open("ciphertext", "w")
-    
-    plain_str = "" #Clear out plain str
-    #iv_str, plain_str = generate_rand_bytes(16, 32) #Use same key as UDS
-    iv_str      = generate_rand_bytes(16)
-    plain_str   = generate_rand_bytes(32)
-    p.write(plain_str)
-    p.close()
-
-    #Encrypt plaintext
-    cipher_str = encrypt("hek", key_str, iv_str)
-    c.write(cipher_str)
-    c.close()
-
-    #Decrypt ciphertext and make sure it matches with generated plaintext
-    decrypt_and_compare("ciphertext", key_str, iv_str, plain_str, "HEK")
-    
-
-    #Write all values to a file to be used in test
-    f.write(key_str+'\n'+iv_str+'\n'+plain_str+'\n'+cipher_str+'\n')
-    g.write("OBF HEK key: "+key_str+'\n'+"IV: "+iv_str+'\n'+"HEK plaintext: "+plain_str+'\n'+"HEK ciphertext: "+cipher_str+'\n')
-
-    g.write('---------------------------------\n')
-    f.close()
-    g.close()
-
-    #Temp file clean up
-    os.remove("uds")
-    os.remove("fe")
-    os.remove("hek")
-    os.remove("ciphertext")
-    os.remove("temp")
+    write_atomic(out_path, "".join(format_vector_set(vector_set) for vector_set in vector_sets))
+    if log_path:
+        #One write per run keeps appends from concurrent generators whole
+        with open(log_path, "a") as g:
+            g.write("".join(format_log(vector_set) for vector_set in vector_sets))
+
+def generate_bulk_chunk(args):
+    #Worker: the packed sets [first, last) of a seed
+    seed, first, last, binary = args
+    records = []
+    for set_id in range(first, last):
+        vector_set = generate_doe_vector_set(seeded_rand_bytes(seed, set_id))
+        if binary:
+            records.append(b"".join(key + iv + plaintext + ciphertext for _, key, iv, plaintext, ciphertext in vector_set))
+        else:
+            records.append(format_vector_set(vector_set))
+    return records
+
+def write_bulk_vectors(path, num_sets, seed, binary=False, jobs=None, chunk_sets=1024):
+    """
+    Writes num_sets seeded vector sets to path and an index to path.idx.
+
+    Hex files start with the number of sets (8 hex digits) followed by the 12
+    lines of every set in doe_test_vector.txt order; binary files start with
+    DOE_BIN_HEADER followed by DOE_SET_BYTES raw bytes per set. Every set has
+    the same size, and path.idx lists the byte offset of each set so a
+    testbench can seek straight to set n. Sets are generated in parallel, in
+    chunks of chunk_sets, and written in order.
+    """
+    work = [(seed, first, min(first + chunk_sets, num_sets), binary) for first in range(0, num_sets, chunk_sets)]
+    offsets = []
+    with atomic_open(path, "wb" if binary else "w") as f, multiprocessing.Pool(jobs) as pool:
+        if binary:
+            f.write(DOE_BIN_HEADER.pack(DOE_BIN_MAGIC, 1, num_sets, DOE_SET_BYTES))
+        else:
+            f.write("%08X\n" % num_sets)
+        for records in pool.imap(generate_bulk_chunk, work):
+            for record in records:
+                offsets.append(f.tell())
+                f.write(record)
+    write_atomic(path + ".idx", "# seed %d, %d sets, set id and byte offset\n" % (seed, num_sets) +
+                 "".join("%d %d\n" % (set_id, offset) for set_id, offset in enumerate(offsets)))
 
 def main():
-    generate_doe_testvector()
-
-main()
-    
+    parser = argparse.ArgumentParser(description="Generate DOE UDS/FE/HEK AES-256-CBC test vectors")
+    parser.add_argument("-n", "--num-sets", type=int, default=1, help="number of UDS/FE/HEK vector sets")
+    parser.add_argument("-o", "--out", default="doe_test_vector.txt",
+                        help="vector file, 12 lines per set (key, IV, plaintext, ciphertext per flow)")
+    parser.add_argument("--log", default="doe_test_vectors_all.txt",
+                        help="human-readable log appended on every run, empty to skip")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="derive every set from this seed instead of secrets (set n is reproducible on its own)")
+    parser.add_argument("--bulk", default=None, metavar="PATH",
+                        help="write -n seeded sets to an indexed bulk file (PATH and PATH.idx) instead")
+    parser.add_argument("--binary", action="store_true", help="bulk file holds raw bytes instead of hex lines")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes for --bulk (default: all cores)")
+    args = parser.parse_args()
+    if args.bulk:
+        write_bulk_vectors(args.bulk, args.num_sets, args.seed or 0, args.binary, args.jobs)
+    else:
+        generate_doe_testvector(args.num_sets, args.out, args.log, args.seed)
+
+if __name__ == "__main__":
+    main()
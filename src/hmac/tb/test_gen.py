@@ -13,83 +13,103 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import argparse
+import hmac
+import multiprocessing
 import os
-import subprocess
-import random
+import sys
 
-def generate_expected_hmac384_tag():
-    f = open("hmac384_uvm_test_vector.txt", "r")
-    g = open("expected_hmac384_tag.txt", "w")
-    h = open("expected_hmac384_tags_all.txt", "a")
-    msg_str = ""
-    key_str = ""
-    seed_str = ""
-    tag_str = ""
-
-    for line in f:
-        if(line[0:6] == "KEY = "):
-            key_str = line.strip()[6:]  
-        elif(line[0:7] == "SEED = "):
-            seed_str = line.strip()[7:]   
-        else:
-            msg_str = msg_str + line.strip()[8:]
+# Batch output: one fixed-width "TAG = <512-bit hex>" line per record, in input
+# order, so record n starts at byte n * TAG_LINE_BYTES. 384-bit tags are
+# zero-extended, which $sscanf("%h") into the 384-bit tag reads unchanged.
+TAG_LINE_BYTES = len("TAG = ") + 128 + 1
 
-    #Generate digest using OpenSSL HMAC SHA384
-    command = 'echo '+msg_str+' | xxd -r -p | openssl dgst -sha384 -mac hmac -macopt hexkey:'+key_str+' -hex'
-    tag = subprocess.check_output(command, shell=True)
-    tag_str = str(tag)
+def unpad_message(data):
+    # Returns the message if data ends in SHA-384/512 padding of the inner hash
+    # (K^ipad block + message), else None
+    if len(data) < 128 or len(data) % 128:
+        return None
+    msg_bits = int.from_bytes(data[-16:], "big") - 1024
+    if msg_bits < 0 or msg_bits % 8 or msg_bits // 8 >= len(data) - 16:
+        return None
+    msg_len = msg_bits // 8
+    if len(data) - msg_len - 17 >= 128 or data[msg_len] != 0x80 or any(data[msg_len+1:-16]):
+        return None
+    return data[:msg_len]
 
-    #Chomp extra chars at beginning and end if python 3.6.8 is loaded
-    if tag_str[1] == "'":
-        tag_str = tag_str[11:-3]
-    else:
-        tag_str = tag_str.rstrip()
-        tag_str = tag_str[9:]
-    g.write('TAG = '+tag_str+'\n')
-    h.write('TAG = '+tag_str+'\n')
-    h.write("------------------------\n")
+def parse_hmac_records(path):
+    """
+    Yields (key, seed, message, expected tag or None) for every KEY record of
+    an HMAC vector file: hmac*_uvm_test_vector.txt, hmac*_uvm_test_vectors_all.txt
+    or hmac_vectors_{single,multi}blk.txt. Blocks that end in padding
+    (the _all files and the NIST files) are unpadded.
+    """
+    def record(key, seed, blocks, tag):
+        data = bytes.fromhex("".join(blocks))
+        msg = unpad_message(data)
+        return key, seed, data if msg is None else msg, tag
 
+    key = None
+    with open(path, "r") as f:
+        for line in f:
+            field, _, value = line.strip().partition(" = ")
+            if field == "KEY":
+                if key is not None:
+                    yield record(key, seed, blocks, tag)
+                key, seed, blocks, tag = bytes.fromhex(value), None, [], None
+            elif key is None:
+                continue
+            elif field == "SEED":
+                seed = value
+            elif field == "BLOCK":
+                blocks.append(value)
+            elif field == "TAG":
+                tag = bytes.fromhex(value)
+    if key is not None:
+        yield record(key, seed, blocks, tag)
 
-    f.close()
-    g.close()
-    h.close()
-
-def generate_expected_hmac512_tag():
-    f = open("hmac512_uvm_test_vector.txt", "r")
-    g = open("expected_hmac512_tag.txt", "w")
-    h = open("expected_hmac512_tags_all.txt", "a")
-    msg_str = ""
-    key_str = ""
-    seed_str = ""
-    tag_str = ""
+def hash_for(key, tag, default):
+    # the expected tag length, else the key length picks SHA-384 or SHA-512
+    size = len(tag) if tag is not None else len(key)
+    return {48: "sha384", 64: "sha512"}.get(size, default)
 
-    for line in f:
-        if(line[0:6] == "KEY = "):
-            key_str = line.strip()[6:]  
-        elif(line[0:7] == "SEED = "):
-            seed_str = line.strip()[7:]   
-        else:
-            msg_str = msg_str + line.strip()[8:]
+def compute_tag(args):
+    """Worker: (hash name, key, message) -> tag"""
+    hash_name, key, msg = args
+    return hmac.digest(key, msg, hash_name)
 
-    #Generate digest using OpenSSL HMAC SHA384
-    command = 'echo '+msg_str+' | xxd -r -p | openssl dgst -sha512 -mac hmac -macopt hexkey:'+key_str+' -hex'
-    tag = subprocess.check_output(command, shell=True)
-    tag_str = str(tag)
+def generate_batch_tags(paths, out_path, hash_name=None, jobs=None):
+    """
+    Computes the tag of every record of paths in a process pool and writes them
+    to out_path, one TAG_LINE_BYTES line per record. Returns (records, mismatches)
+    against the TAG lines of the inputs.
+    """
+    records = [r for path in paths for r in parse_hmac_records(path)]
+    work = [(hash_name or hash_for(key, tag, "sha384"), key, msg) for key, _, msg, tag in records]
+    mismatches = 0
+    with multiprocessing.Pool(jobs) as pool, open(out_path, "w") as g:
+        for count, ((_, _, _, expected), tag) in enumerate(zip(records, pool.imap(compute_tag, work, chunksize=256))):
+            if expected is not None and expected != tag:
+                print("COUNT = %d: TAG mismatch, expected %s got %s" % (count, expected.hex(), tag.hex()))
+                mismatches += 1
+            g.write("TAG = %0128x\n" % int.from_bytes(tag, "big"))
+    return len(records), mismatches
 
-    #Chomp extra chars at beginning and end if python 3.6.8 is loaded
-    if tag_str[1] == "'":
-        tag_str = tag_str[11:-3]
-    else:
-        tag_str = tag_str.rstrip()
-        tag_str = tag_str[9:]
-    g.write('TAG = '+tag_str+'\n')
-    h.write('TAG = '+tag_str+'\n')
-    h.write("------------------------\n")
+def generate_expected_tag(hash_name):
+    # Single vector of hmac*_uvm_test_vector.txt, as the HMAC UVM predictor expects
+    key, _, msg, _ = next(parse_hmac_records(hash_name + "_uvm_test_vector.txt"))
+    tag_str = hmac.digest(key, msg, "sha" + hash_name[4:]).hex()
+    with open("expected_" + hash_name + "_tag.txt", "w") as g:
+        g.write('TAG = '+tag_str+'\n')
+    with open("expected_" + hash_name + "_tags_all.txt", "a") as h:
+        h.write('TAG = '+tag_str+'\n')
+        h.write("------------------------\n")
 
+def generate_expected_hmac384_tag():
+    generate_expected_tag("hmac384")
 
-    f.close()
-    g.close()
-    h.close()
+def generate_expected_hmac512_tag():
+    generate_expected_tag("hmac512")
 
 
 def main():
@@ -99,6 +119,21 @@ def main():
         generate_expected_hmac384_tag()
     if os.path.exists(hmac512_file):
         generate_expected_hmac512_tag()
-    #generate_test()g
 
-main()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="HMAC expected tag generator (default: the single UVM test vector)")
+    parser.add_argument("--batch", nargs="+", metavar="VECTOR_FILE",
+                        help="compute the tags of every KEY record of these files")
+    parser.add_argument("-o", "--out", default="expected_hmac_tags_batch.txt", help="batch output file")
+    parser.add_argument("--hash", choices=["sha384", "sha512"], default=None,
+                        help="batch hash (default: from the TAG or KEY length)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    if args.batch:
+        count, mismatches = generate_batch_tags(args.batch, args.out, args.hash, args.jobs)
+        print("HMAC batch: %d tags -> %s, %d mismatches against input TAGs" % (count, args.out, mismatches))
+        if mismatches:
+            sys.exit(1)
+    else:
+        main()
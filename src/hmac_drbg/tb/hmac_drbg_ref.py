@@ -12,19 +12,29 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
+import functools
+import glob
 import hmac
 import hashlib
+import json
+import multiprocessing
 import os
+import random
+import socket
+import sys
+import time
 
 HMAC_DRBG_PRIME = int("FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFC7634D81F4372DDF581A0DB248B0A77AECEC196ACCC52973", 16)
 
 
 class HMAC_DRBG:
-   def __init__(self, entropy, nonce=b"", personalization=b""):
+   def __init__(self, entropy, nonce=b"", personalization=b"", hash_name="sha384"):
        """
        Instantiates HMAC-DRBG with entropy, nonce, and optional personalization string.
        """
-       self.hash_function = hashlib.sha384
+       self.hash_function = functools.partial(hashlib.new, hash_name)
+       self.hash_name = hash_name
        self.seed_length = self.hash_function().digest_size 
        self.K = b"\x00" * self.seed_length
        self.V = b"\x01" * self.seed_length
@@ -35,16 +45,26 @@ class HMAC_DRBG:
     #    print("key=", key.hex())
     #    print("val=", data.hex())
     #    print("dig=", hmac.new(key, data, self.hash_function).digest().hex(),'\n')
-       return hmac.new(key, data, self.hash_function).digest()
+       return hmac.digest(key, data, self.hash_name)
+   def _set_key(self, key):
+       """ Sets K and keeps a keyed HMAC state so V updates skip the key schedule. """
+       self.K = key
+       self._keyed = hmac.new(key, digestmod=self.hash_name)
+   def _hmac_v(self):
+       """ V = HMAC(K, V) using the keyed state of the current K. """
+       h = self._keyed.copy()
+       h.update(self.V)
+       self.V = h.digest()
+       return self.V
    def update(self, seed_material=b""):
        """
        Updates the internal state with new seed material.
        """
-       self.K = self._hmac(self.K, self.V + b"\x00" + seed_material)
-       self.V = self._hmac(self.K, self.V)
+       self._set_key(self._hmac(self.K, self.V + b"\x00" + seed_material))
+       self._hmac_v()
        if seed_material:
-           self.K = self._hmac(self.K, self.V + b"\x01" + seed_material)
-           self.V = self._hmac(self.K, self.V)
+           self._set_key(self._hmac(self.K, self.V + b"\x01" + seed_material))
+           self._hmac_v()
    def reseed(self, additional_entropy):
        """ Reseeds the DRBG with new entropy. """
        self.update(additional_entropy)
@@ -54,265 +74,345 @@ class HMAC_DRBG:
        """
        if additional_input:
            self.update(additional_input)
-       output = b""
-       while len(output) < num_bytes:
-           self.V = self._hmac(self.K, self.V)
-           output += self.V
+       output = bytearray(-(-num_bytes // self.seed_length) * self.seed_length)
+       for offset in range(0, len(output), self.seed_length):
+           output[offset:offset + self.seed_length] = self._hmac_v()
        self.update(additional_input)
-       return output[:num_bytes]
+       return bytes(output[:num_bytes])
    
-def cavp_no_reseed_test(COUNT, entropy, nonce, personalization, additional_input0, additional_input1, returnedbits_len, expected):
-    returnedbits_len_inbyte = int(returnedbits_len / 8)
-    drbg = HMAC_DRBG(entropy, nonce, personalization)
-    # print("INSTANTIATED V=", drbg.V.hex())
-    # print("INSTANTIATED K=", drbg.K.hex())
-    random_bytes = drbg.generate(returnedbits_len_inbyte, additional_input0)
-    # print("FIRST CALL V=", drbg.V.hex())
-    # print("FIRST CALL K=", drbg.K.hex())
-    # print("first output=",random_bytes.hex())  # Output random data in hex
-    random_bytes = drbg.generate(returnedbits_len_inbyte, additional_input1)
-    # print("Second CALL V=", drbg.V.hex())
-    # print("Second CALL K=", drbg.K.hex())
-    # print("second output=",random_bytes.hex())  # Output random data in hex
-    result = (random_bytes == expected)
-    print("CAVP test number", COUNT,"=", result)
-    return result
+def cavp_hash_name(section):
+    """ Maps a CAVP section name such as SHA-512/224 to its hashlib name. """
+    return section.lower().replace("-", "").replace("/", "_")
 
-def caliptra_test(COUNT, entropy, nonce, expected0, expected1=b"", expected2=b""):
-    returnedbits_len_inbyte = int(384 / 8)
-    drbg = HMAC_DRBG(entropy, nonce)
-    # print("INSTANTIATED V=", drbg.V.hex())
-    # print("INSTANTIATED K=", drbg.K.hex())
-    random_bytes = drbg.generate(returnedbits_len_inbyte)
-    # print("FIRST CALL V=", drbg.V.hex())
-    # print("FIRST CALL K=", drbg.K.hex())
-    # print("first output=",random_bytes.hex())  # Output random data in hex
-    result = (random_bytes == expected0)
-    print("Caliptra INIT test number", COUNT,"=", result)
-    if (expected1):
-        random_bytes = drbg.generate(returnedbits_len_inbyte)
-        # print("Second CALL V=", drbg.V.hex())
-        # print("Second CALL K=", drbg.K.hex())
-        # print("second output=",random_bytes.hex())  # Output random data in hex
-        result = (random_bytes == expected1)
-        print("Caliptra NEXT test number", COUNT,"=", result)
-        if (expected2):
-            random_bytes = drbg.generate(returnedbits_len_inbyte)
-            # print("Third CALL V=", drbg.V.hex())
-            # print("Third CALL K=", drbg.K.hex())
-            # print("Third output=",random_bytes.hex())  # Output random data in hex
-            result = (random_bytes == expected2)
-            print("Caliptra NEXT test number", COUNT,"=", result)
-    return result
-
-def cavp_test_vectors():
+def parse_drbg_rsp(lines, source=""):
     """
-       from: https://csrc.nist.gov/projects/cryptographic-algorithm-validation-program/random-number-generators#DRBG
+    Yields every vector of a NIST CAVP HMAC_DRBG.rsp file (no_reseed, pr_false
+    or pr_true) as a dict. Repeated fields (AdditionalInput, EntropyInputPR)
+    are collected into lists in file order.
     """
+    params = {}
+    vector = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("["):
+            if vector is not None:
+                yield vector
+                vector = None
+            key, _, value = line[1:-1].partition(" = ")
+            if value:
+                params[key] = value
+            else:
+                params = {"hash": cavp_hash_name(key)}
+        elif " = " in line or line.endswith(" ="):
+            key, _, value = line.partition(" =")
+            value = value.strip()
+            if key == "COUNT":
+                if vector is not None:
+                    yield vector
+                vector = {"source": source, "hash": params.get("hash", "sha384"),
+                          "pr": params.get("PredictionResistance") == "True",
+                          "returned_bits_len": int(params.get("ReturnedBitsLen", 0)), "count": int(value),
+                          "AdditionalInput": [], "EntropyInputPR": []}
+            elif vector is not None:
+                if key in ("AdditionalInput", "EntropyInputPR"):
+                    vector[key].append(bytes.fromhex(value))
+                else:
+                    vector[key] = bytes.fromhex(value)
+    if vector is not None:
+        yield vector
+
+def parse_tb_hex(lines, source=""):
+    """ Reads a hmac_drbg_tb.hex style vector: rounds (hex), entropy, nonce, one output per round. """
+    values = [line.strip() for line in lines if line.strip()]
+    yield {"source": source, "hash": "sha384", "count": 0, "rounds": int(values[0], 16),
+           "EntropyInput": bytes.fromhex(values[1]), "Nonce": bytes.fromhex(values[2]),
+           "outputs": [bytes.fromhex(value) for value in values[3:]]}
+
+def load_vectors(paths):
+    """ Parses .rsp (CAVP) and .hex (testbench format) vector files. """
+    vectors = []
+    for path in paths:
+        parse = parse_tb_hex if path.endswith(".hex") else parse_drbg_rsp
+        with open(path, "r") as f:
+            vectors.extend(parse(f, os.path.basename(path)))
+    return vectors
+
+def vector_name(vector):
+    if "outputs" in vector:
+        return vector["source"]
+    return f"{vector['source']}:{vector['hash']}:{'pr' if vector['pr'] else 'nopr'}:{vector['count']}"
+
+def run_vector(vector):
+    """
+    Runs one vector through HMAC_DRBG as the CAVP harness does: instantiate,
+    optional reseed, two generate calls, compare the second output.
+    Returns (name, passed).
+    """
+    if "outputs" in vector:
+        outputs = list(drbg_rounds(vector["EntropyInput"], vector["Nonce"], vector["rounds"]))
+        return vector_name(vector), outputs == vector["outputs"]
+    num_bytes = vector["returned_bits_len"] // 8
+    drbg = HMAC_DRBG(vector["EntropyInput"], vector["Nonce"], vector.get("PersonalizationString", b""),
+                     vector["hash"])
+    if "EntropyInputReseed" in vector:
+        drbg.reseed(vector["EntropyInputReseed"] + vector.get("AdditionalInputReseed", b""))
+    additional_inputs = vector["AdditionalInput"] or [b"", b""]
+    for n, additional_input in enumerate(additional_inputs):
+        if vector["pr"]:
+            # prediction resistance reseeds with fresh entropy before every generate
+            drbg.reseed(vector["EntropyInputPR"][n] + additional_input)
+            random_bytes = drbg.generate(num_bytes)
+        else:
+            random_bytes = drbg.generate(num_bytes, additional_input)
+    return vector_name(vector), random_bytes == vector["ReturnedBits"]
+
+# hmac_drbg_tb limits: 384-bit entropy and nonce inputs, at most MAX_ROUND rounds per vector
+TB_INPUT_BYTES = 48
+TB_MAX_ROUNDS = 15
+
+def tb_compatible(vector):
+    """
+    True if hmac_drbg_tb can drive the vector's inputs: SHA-384, entropy and
+    nonce of at most 384 bits, no personalization, additional input or reseed.
+    """
+    return (vector["hash"] == "sha384" and len(vector["EntropyInput"]) <= TB_INPUT_BYTES
+            and len(vector["Nonce"]) <= TB_INPUT_BYTES
+            and not vector.get("PersonalizationString") and not any(vector.get("AdditionalInput", []))
+            and not vector.get("pr") and "EntropyInputReseed" not in vector)
 
-    ReturnedBitsLen = 1536
-
-    COUNT = 0
-    EntropyInput = bytes.fromhex("a1dc2dfeda4f3a1124e0e75ebfbe5f98cac11018221dda3fdcf8f9125d68447a")
-    Nonce =  bytes.fromhex("bae5ea27166540515268a493a96b5187")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("228293e59b1e4545a4ff9f232616fc5108a1128debd0f7c20ace837ca105cbf24c0dac1f9847dafd0d0500721ffad3c684a992d110a549a264d14a8911c50be8cd6a7e8fac783ad95b24f64fd8cc4c8b649eac2b15b363e30df79541a6b8a1caac238949b46643694c85e1d5fcbcd9aaae6260acee660b8a79bea48e079ceb6a5eaf4993a82c3f1b758d7c53e3094eeac63dc255be6dcdcc2b51e5ca45d2b20684a5a8fa5806b96f8461ebf51bc515a7dd8c5475c0e70f2fd0faf7869a99ab6c")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 1
-    EntropyInput = bytes.fromhex("067fa0e25d71ea392671c24f38ef782ab3587a7b3c77ea756f7bd496b445b7a3")
-    Nonce = bytes.fromhex("ce6acc722768ca0e03784b2217bc60e4")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("16eaa49510ffad8cc21ec32858640a0d6f34cb03e8649022aa5c3f566b44e8ace7c3b056cf2a44b242de09ae21dba4275418933611875841b4f0944a8272848c5dc1aad685935e12511d5ee27e9162d4bb968afab53c4b338269c1c77da9d78617911ed4390cb20e88bf30b74fda66fe05df5537a759061d3ffd9231d811e8b34213f22ab0b0ddafff7749a40243a901c310776e09d2e529806d4d6f0655178953c16707519c3c19b9aaa0d09fb676a9d23525c8bc388053bfccfbc368e3eb04")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 2
-    EntropyInput = bytes.fromhex("9f76503e84727297bc7056c7af917a1c98baa725295457db4fcf54ed09af7f15")
-    Nonce = bytes.fromhex("f39c46142b85a67b4b323594b7e97bde")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("7d6a8bc5a7f057ceed6109bfac2486f80f81373b6b31d062aa1fad6d9eda5874867b9ef007ba5a92ba8f3fca624bfd9f7ee5770bbeb0391394fef783c16a7f003c06e5469bab03445bb28a2111def415d162e40472d3e5ae628c5c63170bb19f741c79a5331c883c12bca429f518bf71b14683a071b6c6e1e55d8c7a0f3942bc12a103556c49ca173e498b3b4a15027145cdaeb195bc8a7e1aa82ebdf6ecd516481a4d21f400d0d71b5894545888fee8beed80d3251647947f5abc4735b47fd0")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 3
-    EntropyInput = bytes.fromhex("e242e5b3b49d87289fe02840dc742a2a6cd9490fe2cce581833dddb1edc0d103")
-    Nonce = bytes.fromhex("f987f5de5c68cd345c81b032ea55f36d")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("3a858345dfaf00defdf6c83114b760ef53b131fbf14bcc4052cd948820eee78a11cbbd8f4baa308e1d187fced74cbf019c1080d9efffd93fda07df051433876d9900c1f9ad36ea1cb04989bb0c55fd6d01e46923f3bc8887ac00ebd4710212114165355361e240b04232df55a81add3fb363f0d4c9c5e3d313bc7caac7d49dca8517cedacf571fde9686ae93d901fb9b17097a638bb9899cfab0ebc9d1f8a43c2eed7c9f326a711d0f5b9cfc5166c9b561824cbd7775ec601ca712b3ddaaa05b")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 4
-    EntropyInput = bytes.fromhex("42cc17365f5ea5fd22bdc4ade715e293064d6794d82bed5b77c4c107a73de1f7")
-    Nonce = bytes.fromhex("6d759e4b191ba01e0ed5dea788ab018d")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("de06dee8c8fe453aa03ac2546c39f5cda12412864d52ed5cbd0d4905dd226746d50d1af9fd3e1d90de0f16295cb7f6f4d3271ef00564709df4b05eb9f8adc0f8e8522b05b9f32c37d8526813898b9f71db57fc8328e3b79144482e8aa55c83934d6e097e43ec6d0bc32edaf8c0e6ca449b2e8388b32b286e2d4f85266b0605fb99d1a647565c95ff7857bcab73662b7218719189d792514edca2b1d0cdcd9b6347e132ef4c323da24ad5afd5ed6f96d27b0f879288e962fa0baca3d5b72b5c70")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 5
-    EntropyInput = bytes.fromhex("d57024a230b825b241c206f7b55e2114461ecc9b75353f12ac1d9ad7e7871481")
-    Nonce = bytes.fromhex("fe401c320f74afdb07f566ea500b0628")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("e8930bd55a0a5a6d83a9b3b2cde7085c2ae467ea4a2e65ca303697d492ca878bcb801769eb1b7ec564586ec8b36d350e192c4fbf03a98be0ddecf56d465914ba353ed7734d19a680fc4593d9234c4ac8c23b7dfa1e26b013f590cca43b9fef126121b4842496b11dea3ef5e981cb357341f03f92a546a62609236ded6f7d814456acc0596d555cbdc02cbd47dae2caa1897831ea464225922c6600a8bb92e711653067f83b21e1df054309858948c11a1399736fc8391c5b0fc35629abfa5650")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 6
-    EntropyInput = bytes.fromhex("059ded79125b2d56d9d52bcc950bf608d1a2373515dafcc81efb6588005a5722")
-    Nonce = bytes.fromhex("d8f5f4181f9f2a316c93fdfbadf50e75")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("db65d2000632c3d7009c227e99c210e5897f4d7edae608a242b5a4f17708613f8c19a4dd65d6bc3ca57737c9bfdcca068288eea49440af768d1fc977c32b065bb71aa3d8c4d77c9e8e8a6166f332a247978a6c41ed253a1b68ad934a3416b40344a681de28638f00b0a0ffb75514c3f62253372f809906043de35e4805b8e962e5eb957f04212835f802b2c0b3e76c7cf239c89adf31909cd6224d542d929f9b20a10ab99a7c631e4e6188fe2ba8f552c9c88fdadb528679fe950431641b8f37")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 7
-    EntropyInput = bytes.fromhex("4630406b475b1263b6078e93e5d4282205958d94eb97d1e66b429fb69ec9fccd")
-    Nonce = bytes.fromhex("0dd9982c338df935e929c42fab66adaf")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("5d80ec072f550981bcaac6787c0488cc470406249ec80f4bf11050630227f8b5ac6b3b369db237d7c24a0980dffe8d3abd9b64fd4efa492349bd4eb6902edb94553546110227d7de5a864ddae8b9fed8de9f0df9c596e39de903fda323ee6f788831452eb9e49c5eef3e058b5bf84f61f735a93e042bb9e458df6b25f42a6eb8fb03d437cfab757fab4990c721a757eaa5e9048208abbcce6e52f177b20dcf52f1fa551a92b68bcdb01680855b8f79131266378cd1f0c2a4141c9675f01d1e48")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 8
-    EntropyInput = bytes.fromhex("6ea9c6f784f12a9707ceac8a7162ee5381dc893ee139f8f4b4d93db266829db4")
-    Nonce =  bytes.fromhex("ae92bc52ff860d8ecdc9fc16bd070130")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("234366f1591cfe244956f9496cdf446e0d390ba64beaa066945b1b4c5337dded2619dd2bd0133a5d612bab7c251ab79e3951cb134894c422553fc8cc7b3ccb29c20adbf52dda35af779142d7efc735342db2ee067649fda25f3e8a74f8e4f6620cf5a17cb943602609cafb85bdf482873efa4c74928cc0d69444b72aa6bc72694a3a21c6a721aa4e0fccab0a98aef375a37a3e8a15dccad13b6d70b3483581004642d879804aa00cba207b51affca43490bb98f67953265574366ec3829e67aa")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 9
-    EntropyInput = bytes.fromhex("5c13056be92a7f71236fcfef460298acc8595dd474310727f5ccb9a7acb2254a")
-    Nonce = bytes.fromhex("c7226f86349e20e2aca737068ab0f2ce")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("16d415eddefa4dc295a64adcbbcb8c6fe8c8f123c6b09dc08a56d723cff5978cc120fd0a68a2f4c202c220db372d3128ef52385d5786c12dfc6e60ecfc3461a09fa80453e2b1b6365eaeb4df602d192aacb25ab6b4a59689d4bf8d1c4c42a32779f62b06baca6461f154cf40901f5787c1aa2bf67cbfe7546ef5b2bdff20790d8c72d077d48c59c92d1af90a90ccfcdf643dd9d6cee0b1faf5f2f35cfd01d2077ced5e2d013ec1e09336dfab9d9e51ba9a3a2837306213bca2d79abf8dc3282c")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 10
-    EntropyInput = bytes.fromhex("38f08a099fc2d405c32d1e0f867e5450d5ee0d53783c31de9ddeae46d962999d")
-    Nonce = bytes.fromhex("a01f13a43320c715612cedb920cf12eb")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("079ce7a5b540cae96c2883e95acde3039048a6c45a2d259cc648639e7205392d91fa3ee080e615f1e0741a0e536c9e05844651b93461bfc547fb452fec61f853e1bd6e08eabd0cf1c5f84f85eca9d42b53d1e5bae51be5fd35189e4f1c02b843c6361fccf4ca6648bf30a23ccb8ebc16fcf158746eb39cd96f19d46707c001e11c4e0e8ccbc89fec66c69fc92843b6bb2ee1cc7595b65ba89ccaccd6130a8417faf705e8e203e90ee64ae970c409389b5cd0ca80a4e40b642689741691b20621")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 11
-    EntropyInput = bytes.fromhex("0863c868c32442a1a64095a71ab6ae2f9e61c119b58dfa4f34efd26593bbbf68")
-    Nonce = bytes.fromhex("bc407904c43300452dd4e61df47fa98f")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("585334828cf531828fc7127fee0c926f85b8e71e8522ea921296dc62b83a09a00397cd45e0664d0f26fa24edd3e3d8ecef8fdd77ab22431d4066f0efaf3882c97f179a7060efe9e8cba5d8145bebd502c0e09ee791231d539983c08860d7783edb58440d193ed82bc77c27723381a0da45bb1fc2a609f8b73b90446e39869a5af5038aff603b44db9771113927a5297fdc3450eaa228e313afe43c31b0a95b476c5ca312b4f589f809749481722cea9990c02b647976aa6c6f02ce1e5e6ea6df")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 12
-    EntropyInput = bytes.fromhex("a41ad223e41e2bb9c131ec945ca310600ab00c51f6e4fcddd803bd9ab9be8af5")
-    Nonce = bytes.fromhex("483373838894d32745a81ba9d6967751")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("95ca31a7eeebdd2348cf1d43411d2c35faffdbcaed4052d50cf92f0e9d2e757686b72d631a56ca98b68215e7014cfed943abc1e13441c1d660f13adf2188d0975154e1b42a592a62a43b57f82cc21a428873a92fda83abe420efb5233140e4d6c7852cf81e85961fa5c606c5f33e06077f414b0f814cbbe50cc606bffbd474364e608825fdaaf5e74d862795539be8697e2ce05d71446881e3f65bb54ed95e941586988f6e0c34e1beef426696e9dbd9a214013d826a8c99a2a686d8402c583f")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 13
-    EntropyInput = bytes.fromhex("62a26c1327c0ebf8b40691fb4c8f812e81f5474b0c7db70aa9424110fee3a05e")
-    Nonce = bytes.fromhex("41c0cf2e87210e34d0c6bffc269bf2ba")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("6e20a00df1af37e6cc55e580ba21335111eb375395343618df7d630b9dc234496e3964cd45c5de34bda46a28964f6148704c30925feeaecae0574038434cd33c1dd943207a8dbdcd72dc9ecb76a25728b3c2a8ac13c1de3a126d7d43a46e12e0d0ca8991469e582b78ef6aa691b5a0e3e85cba7d7aea3c1e8e031674e85f5af36546eb2a0a28d4ffbaa316a9a6c944fce291cc0c235e8499882eb62b22b548ae07cf9430329e009f4443cb94f7a14e8661166b0d681dcec867205abed48145e9")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 14
-    EntropyInput = bytes.fromhex("fd54cf77ed35022a3fd0dec88e58a207c8c069250066481388f12841d38ad985")
-    Nonce = bytes.fromhex("91f9c02a1d205cdbcdf4d93054fde5f5")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("")
-    AdditionalInput1 = bytes.fromhex("")
-    ReturnedBits = bytes.fromhex("f6d5bf594f44a1c7c9954ae498fe993f67f4e67ef4e349509719b7fd597311f2c123889203d90f147a242cfa863c691dc74cfe7027de25860c67d8ecd06bcd22dfec34f6b6c838e5aab34d89624378fb5598b9f30add2e10bdc439dcb1535878cec90a7cf7251675ccfb9ee37932b1a07cd9b523c07eff45a5e14d888be830c5ab06dcd5032278bf9627ff20dbec322e84038bac3b46229425e954283c4e061383ffe9b0558c59b1ece2a167a4ee27dd59afeeb16b38fbdb3c415f34b1c83a75")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-    COUNT = 15
-    EntropyInput = bytes.fromhex("5e919d353357671566d2c6ab6e1acd46f47d0c878fe36114d7fea9fecb88a3a2")
-    Nonce = bytes.fromhex("7efca9e3d1e1b09d7f16832f3af75141")
-    PersonalizationString = bytes.fromhex("")
-    AdditionalInput0 = bytes.fromhex("442f17cb3cb1482a19729bfd58f46f6ef16285554892c01b0718968d6e011082")
-    AdditionalInput1 = bytes.fromhex("f9557c93eb841bfd7b5d4b71da928efcbe3f55e1870493ef90d16eb238380d65")
-    ReturnedBits = bytes.fromhex("36902134f1989cfe7eb518a56c06aada98997d9bacd04aee21f879a57b515ca3b5e0c2d5fed05ca1a8b054e8c46b389d9d9186feb0abe8e2e60b3a267281cc5b4b7341116ced35a0e07bc2b0330bbfd8b07f07248fa6d8fc5c9df13445324162bdfa22a91ba71453ab123c92f91c70b8bd540b3b180b11ab45ae2c59e57c7c43dab7576594959a96eb502d182267c86576b1846ccee1a694cabdfb42e0c8214192efb502926fa3c27eed020b7cc8866a5af9d838a57e78bf7acd230e1f4d8361")
-    cavp_no_reseed_test(COUNT, EntropyInput, Nonce, PersonalizationString, AdditionalInput0, AdditionalInput1, ReturnedBitsLen, ReturnedBits)
-
-def caliptra_test_vectors():
-    COUNT = 0
-    entropy = bytes.fromhex("000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000")
-    nonce = bytes.fromhex("000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000")
-    expected0 = bytes.fromhex("FEEEF5544A76564990128AD189E873F21F0DFD5AD7E2FA861127EE6E394CA784871C1AEC032C7A8B10B93E0EAB8946D6")
-    expected1 = bytes.fromhex("d7f1b8ee5fc4eca7b022ccbdc2b03bee146c8985ea52ae400b9e23ce3cb3a95849ef93140c8a519ed8f817e66e6f0de4")
-    caliptra_test(COUNT, entropy, nonce, expected0, expected1)
-
-    COUNT = 1
-    entropy = bytes.fromhex("FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF")
-    nonce = bytes.fromhex("FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF")
-    expected0 = bytes.fromhex("7F68A6D896EA5DA62E78DEDB46F6662BC141F2F0B9E641ACC7342663FD51444E380FEA1DABBCA55F18987C0CFC10DF77")
-    expected1 = bytes.fromhex("b52178b3c26aeff4a9f2704664c091d8cf57b45d05c2bb8c7bfcf56963fbe7674908ae830bfe10e0de2eccf48fa7b050")
-    caliptra_test(COUNT, entropy, nonce, expected0, expected1)
+def tb_inputs(vector):
+    """ The vector's entropy and nonce as the testbench's 384-bit registers hold them (zero-extended). """
+    return (vector["EntropyInput"].rjust(TB_INPUT_BYTES, b"\x00"),
+            vector["Nonce"].rjust(TB_INPUT_BYTES, b"\x00"))
 
-    COUNT = 2
-    entropy = bytes.fromhex("F71EE80F1D123DC3F70EAA1FB3272714858EA555BC496BF39ADB107B192BF0BCBA9BB5B5799CFF8E12A1154F37CA7BBD")
-    nonce = bytes.fromhex("DE2B2A66EE13797C69438A9BF6F8514C0A8ABEFD3E5533E1119AE88E8D641771E9BCE4CBE44430A0ADAAAB4103095FC4")
-    expected0 = bytes.fromhex("316f0937ff54b3d16398d5d07799ab59d0e1f3962831101f1eca892f0f1567df2f964c19b8690761d188d2100403eea6")
-    expected1 = bytes.fromhex("9a42b5046712b4e32c1f9db62a7900d2e0d4e051580b5dc2cbc8498a04df6676ff80b4e6e2b34b29152bd96e5b4eefed")
-    expected2 = bytes.fromhex("28ff268d4fea88d4bc28a712feb777bb72dace10e9886eefd226615f5f9d508aa8f59d4b087b65d54223a2186f53031b")
-    caliptra_test(COUNT, entropy, nonce, expected0, expected1, expected2)
+def run_vectors(paths, jobs=None, json_path=None):
+    """
+    Checks every vector in paths across a process pool, prints a summary with
+    timing and optionally writes per-vector results as JSON. Returns the results.
+    """
+    start = time.perf_counter()
+    vectors = load_vectors(paths)
+    with multiprocessing.Pool(jobs) as pool:
+        results = pool.map(run_vector, vectors, chunksize=max(1, len(vectors) // 64))
+    elapsed = time.perf_counter() - start
+    failed = [name for name, passed in results if not passed]
+    for name in failed:
+        print("REF MODEL: FAILED", name)
+    print(f"REF MODEL: {len(results) - len(failed)}/{len(results)} vectors passed "
+          f"from {len(paths)} file(s) in {elapsed:.3f} s")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"passed": len(results) - len(failed), "failed": len(failed), "seconds": elapsed,
+                       "results": [{"vector": name, "passed": passed} for name, passed in results]}, f, indent=2)
+    return results, vectors
+
+def emit_tb_vectors(vectors, results, out_dir):
+    """
+    Writes a hmac_drbg_model_<n>.hex file in out_dir for every passing CAVP
+    vector whose inputs hmac_drbg_tb can drive. These are model-derived, not
+    CAVP known-answer tests: the RTL seeds from full 384-bit entropy and nonce
+    registers, so the CAVP inputs are zero-extended and the expected outputs
+    are this model's rounds for them (the model itself is checked against the
+    CAVP ReturnedBits by run_vectors), one per 384 bits of ReturnedBitsLen, at
+    most TB_MAX_ROUNDS.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    emitted = 0
+    for vector, (name, passed) in zip(vectors, results):
+        if "outputs" in vector or not passed or not tb_compatible(vector):
+            continue
+        num_rounds = min(max(1, vector["returned_bits_len"] // 384), TB_MAX_ROUNDS)
+        with open(os.path.join(out_dir, f"hmac_drbg_model_{emitted}.hex"), "w") as f:
+            write_test_vector(f, *tb_inputs(vector), num_rounds)
+        emitted += 1
+    print(f"REF MODEL: emitted {emitted} model-derived testbench vector file(s) to {out_dir}, "
+          f"{sum('outputs' not in vector for vector in vectors) - emitted} CAVP vector(s) not runnable on hmac_drbg_tb")
+
+def default_vector_files():
+    """
+    The checked-in test_vectors, next to this script or under $CALIPTRA_ROOT.
+    Only the CAVP no_reseed set is checked in; the HMAC_DRBG_pr_false.rsp and
+    HMAC_DRBG_pr_true.rsp sets from the NIST drbgtestvectors archive are
+    picked up the same way once copied next to it.
+    """
+    for vector_dir in (os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_vectors"),
+                       os.path.join(os.environ.get("CALIPTRA_ROOT", ""), "src/hmac_drbg/tb/test_vectors")):
+        paths = sorted(glob.glob(os.path.join(vector_dir, "*.rsp")) + glob.glob(os.path.join(vector_dir, "*.hex")))
+        if paths:
+            return paths
+    return []
+
+def drbg_rounds(entropy, nonce, num_rounds):
+    """
+    Yields the DRBG output of every round as the testbench sees it: one 384-bit
+    generate per round, retried until the value lies in (0, HMAC_DRBG_PRIME).
+    """
+    drbg = HMAC_DRBG(entropy, nonce)
+    for _ in range(num_rounds):
+        yield next_round_output(drbg)
 
-def gen_expected_outputs():
+def next_round_output(drbg):
+    """ One testbench round: 384-bit generates until the value lies in (0, HMAC_DRBG_PRIME). """
+    returnedbits_len_inbyte = 384 // 8
+    while True:
+        output = drbg.generate(returnedbits_len_inbyte)
+        if 0 < int.from_bytes(output, 'big') < HMAC_DRBG_PRIME:
+            return output
+
+def write_test_vector(f, entropy, nonce, num_rounds, chunk_rounds=4096):
+    """ Writes the hmac_drbg_test_vector.hex contents, flushing every chunk_rounds rounds. """
+    f.write(f"{num_rounds:1X}\n")
+    f.write(f"{entropy.hex()}\n")
+    f.write(f"{nonce.hex()}\n")
+    chunk = []
+    for output in drbg_rounds(entropy, nonce, num_rounds):
+        chunk.append(output.hex())
+        if len(chunk) == chunk_rounds:
+            f.write("\n".join(chunk) + "\n")
+            chunk = []
+    if chunk:
+        f.write("\n".join(chunk) + "\n")
+
+def lockstep(fin, fout):
+    """
+    Serves the lockstep protocol, one request line in and one reply line out:
+      INIT <entropy> <nonce>  -> <output> <K> <V>   instantiate and run the first round
+      NEXT                    -> <output> <K> <V>   run the next round
+      CHECK <rtl output>      -> OK <round> | MISMATCH <round> <expected>
+      QUIT
+    Values are hex; a malformed or out-of-order request gets ERROR <reason>.
+    Serving continues after a mismatch so the testbench can still send QUIT.
+    Returns False if any round mismatched, True otherwise, on QUIT or EOF.
+    """
+    drbg = None
+    expected = b""
+    round_cnt = 0
+    passed = True
+    for line in fin:
+        cmd, *fields = line.split() or [""]
+        if cmd == "QUIT":
+            break
+        try:
+            if cmd == "INIT":
+                drbg = HMAC_DRBG(bytes.fromhex(fields[0]), bytes.fromhex(fields[1]))
+                round_cnt = 0
+            if cmd not in ("INIT", "NEXT", "CHECK"):
+                reply = f"ERROR unknown command {cmd}" if cmd else "ERROR empty request"
+            elif drbg is None:
+                reply = f"ERROR {cmd} before INIT"
+            elif cmd == "CHECK":
+                if int(fields[0], 16) != int.from_bytes(expected, 'big'):
+                    print(f"REF MODEL: MISMATCH in round {round_cnt}: expected {expected.hex()}, got {fields[0]}")
+                    passed = False
+                    reply = f"MISMATCH {round_cnt} {expected.hex()}"
+                else:
+                    reply = f"OK {round_cnt}"
+            else:
+                expected = next_round_output(drbg)
+                round_cnt += 1
+                reply = f"{expected.hex()} {drbg.K.hex()} {drbg.V.hex()}"
+        except (IndexError, ValueError):
+            reply = f"ERROR bad arguments to {cmd}"
+        fout.write(reply + "\n")
+        fout.flush()
+    return passed
+
+def serve_lockstep_pipes(request_path, response_path):
+    """ Runs lockstep over two named pipes, creating them if needed. """
+    for path in (request_path, response_path):
+        if not os.path.exists(path):
+            os.mkfifo(path)
+    # same open order as the testbench (request first) so neither side deadlocks
+    with open(request_path, "r") as fin, open(response_path, "w") as fout:
+        return lockstep(fin, fout)
+
+def serve_lockstep_socket(socket_path):
+    """ Runs lockstep for the first client connecting to a Unix socket. """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(socket_path)
+        server.listen(1)
+        conn, _ = server.accept()
+        with conn, conn.makefile("r") as fin, conn.makefile("w") as fout:
+            return lockstep(fin, fout)
+
+def gen_expected_outputs(inputs="tb_inputs.hex", output="hmac_drbg_test_vector.hex"):
     # Read testbench outputs
-    with open("tb_inputs.hex", "r") as f:
+    with open(inputs, "r") as f:
         lines = f.readlines()
 
     num_rounds = int(lines[0].strip())  # Read number of rounds
     entropy = bytes.fromhex(lines[1].strip())  # Read entropy as bytes
     nonce = bytes.fromhex(lines[2].strip())  # Read nonce as bytes
 
-    returnedbits_len_inbyte = 384 // 8
-    drbg = HMAC_DRBG(entropy, nonce)
-    outputs = []
-    
-    for _ in range(num_rounds):
-        while True:
-            output = drbg.generate(returnedbits_len_inbyte)
-            if 0 < int.from_bytes(output, 'big') < HMAC_DRBG_PRIME:
-                outputs.append(output.hex())
-                break
-            
     # Write expected results to a file
-    with open("hmac_drbg_test_vector.hex", "w") as f:
-        f.write(f"{num_rounds:1X}\n")
-        f.write(f"{entropy.hex()}\n")
-        f.write(f"{nonce.hex()}\n")
-        for output in outputs:
-            f.write(f"{output}\n")
+    with open(output, "w") as f:
+        write_test_vector(f, entropy, nonce, num_rounds)
+
+def gen_stream(args):
+    """ Writes tb_inputs.hex and the expected outputs of one independent stream. """
+    stream_dir, seed, num_rounds = args
+    rng = random.Random(seed)
+    entropy = rng.getrandbits(384).to_bytes(48, 'big')
+    nonce = rng.getrandbits(384).to_bytes(48, 'big')
+    os.makedirs(stream_dir, exist_ok=True)
+    with open(os.path.join(stream_dir, "tb_inputs.hex"), "w") as f:
+        f.write(f"{num_rounds}\n{entropy.hex()}\n{nonce.hex()}\n")
+    with open(os.path.join(stream_dir, "hmac_drbg_test_vector.hex"), "w") as f:
+        write_test_vector(f, entropy, nonce, num_rounds)
+    return stream_dir
+
+def gen_streams(out_dir, num_streams, num_rounds, seed=0, jobs=None):
+    """
+    Generates num_streams independent stream_<n>/ directories under out_dir in
+    parallel. Stream n is seeded with seed + n, so any single stream can be
+    regenerated on its own. Each stream_<n>/hmac_drbg_test_vector.hex runs in
+    hmac_drbg_directed_test via +HMAC_DRBG_TEST_VECTOR_FILE=, which caps
+    num_rounds at TB_MAX_ROUNDS.
+    """
+    if not 1 <= num_rounds <= TB_MAX_ROUNDS:
+        raise ValueError(f"hmac_drbg_tb runs 1 to {TB_MAX_ROUNDS} rounds per vector, not {num_rounds}")
+    work = [(os.path.join(out_dir, f"stream_{n}"), seed + n, num_rounds) for n in range(num_streams)]
+    with multiprocessing.Pool(jobs) as pool:
+        for stream_dir in pool.imap_unordered(gen_stream, work):
+            print("REF MODEL: wrote", stream_dir)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HMAC_DRBG (SHA-384) reference model for hmac_drbg_tb")
+    parser.add_argument("--lockstep", nargs=2, metavar=("REQUEST_FIFO", "RESPONSE_FIFO"),
+                        help="serve testbench transactions over two named pipes, stop at the first mismatch")
+    parser.add_argument("--socket", default=None, help="serve the lockstep protocol on this Unix socket instead")
+    parser.add_argument("--streams", type=int, default=0,
+                        help="generate this many independent tb_inputs.hex streams instead")
+    parser.add_argument("--rounds", type=int, default=TB_MAX_ROUNDS,
+                        help=f"rounds per stream, at most {TB_MAX_ROUNDS} (hmac_drbg_tb MAX_ROUND)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first stream")
+    parser.add_argument("--out-dir", default="drbg_streams", help="directory of the stream_<n>/ outputs")
+    parser.add_argument("--vectors", nargs="*", default=[],
+                        help="CAVP HMAC_DRBG .rsp or testbench .hex files to check (default: test_vectors/)")
+    parser.add_argument("--json", default=None, help="write machine-readable per-vector results here")
+    parser.add_argument("--emit-tb-hex", default=None, metavar="DIR",
+                        help="write model-derived hmac_drbg_tb vectors from the CAVP inputs it can drive, "
+                             "as hmac_drbg_model_<n>.hex files (not known-answer tests)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+    if args.streams and not 1 <= args.rounds <= TB_MAX_ROUNDS:
+        parser.error(f"--rounds must be 1 to {TB_MAX_ROUNDS}, the most hmac_drbg_tb reads from a vector file")
+
+    if args.lockstep:
+        sys.exit(0 if serve_lockstep_pipes(*args.lockstep) else 1)
+    elif args.socket:
+        sys.exit(0 if serve_lockstep_socket(args.socket) else 1)
+    elif args.streams:
+        gen_streams(args.out_dir, args.streams, args.rounds, args.seed, args.jobs)
    # Check if tb_inputs.hex exists
-    if os.path.exists("tb_inputs.hex"):
+    elif os.path.exists("tb_inputs.hex"):
         print("REF MODEL: Found tb_inputs.hex. Generating the expected outputs...")
         gen_expected_outputs()
     else:
-        print("REF MODEL: No tb_inputs.hex found. Running fixed test vectors.")
-        cavp_test_vectors()
-        caliptra_test_vectors()
+        paths = args.vectors or default_vector_files()
+        print("REF MODEL: No tb_inputs.hex found. Running test vectors.")
+        results, vectors = run_vectors(paths, args.jobs, args.json)
+        if args.emit_tb_hex:
+            emit_tb_vectors(vectors, results, args.emit_tb_hex)
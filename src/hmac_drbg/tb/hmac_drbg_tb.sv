@@ -486,6 +486,94 @@ module hmac_drbg_tb();
     end
   endtask
 
+  //----------------------------------------------------------------
+  // hmac_drbg_lockstep_test()
+  //
+  // Runs the reference model next to the DUT over two named pipes
+  // (hmac_drbg_ref.py --lockstep) and checks every round as it
+  // completes, stopping at the first mismatch.
+  //----------------------------------------------------------------
+  task hmac_drbg_lockstep_test;
+    begin
+      int req_fd, rsp_fd;
+      int num_rounds;
+      int check_round;
+      string line;
+      string status;
+      reg [REG_SIZE-1 : 0] entropy;
+      reg [REG_SIZE-1 : 0] nonce;
+      reg [REG_SIZE-1 : 0] expected;
+
+      if (!$value$plusargs("HMAC_DRBG_LOCKSTEP_ROUNDS=%d", num_rounds))
+        num_rounds = 1000;
+
+      entropy = random_gen();
+      nonce = random_gen();
+
+      $system("rm -f drbg_req.fifo drbg_rsp.fifo && mkfifo drbg_req.fifo drbg_rsp.fifo");
+      $system("python3 hmac_drbg_ref.py --lockstep drbg_req.fifo drbg_rsp.fifo &");
+      req_fd = $fopen("drbg_req.fifo", "w");
+      rsp_fd = $fopen("drbg_rsp.fifo", "r");
+      if (req_fd == 0 || rsp_fd == 0)
+        $fatal(1, "Can't open the lockstep pipes");
+
+      if (!ready_tb)
+        wait(ready_tb);
+
+      entropy_tb = entropy;
+      nonce_tb = nonce;
+      $display("*** lockstep entropy : %096x", entropy_tb);
+      $display("*** lockstep nonce   : %096x", nonce_tb);
+
+      for (int i = 0; i < num_rounds; i++) begin
+        if (i==0)
+          $fdisplay(req_fd, "INIT %096x %096x", entropy, nonce);
+        else
+          $fdisplay(req_fd, "NEXT");
+        $fflush(req_fd);
+
+        lfsr_seed_tb = 192'(random_gen());
+        #(1 * CLK_PERIOD);
+        init_tb = (i == 0);
+        next_tb = (i != 0);
+        #(1 * CLK_PERIOD);
+        init_tb = 1'b0;
+        next_tb = 1'b0;
+        #(2 * CLK_PERIOD);
+        wait(valid_tb);
+
+        void'($fgets(line, rsp_fd)); // <output> <K> <V>
+        if ($sscanf(line, "%h", expected) != 1 || line.substr(0, 4) == "ERROR") begin
+          $error("*** ERROR: TC %0d lockstep round #%0d: reference model replied %s", tc_number, i, line);
+          error_ctr = error_ctr + 1;
+          break;
+        end
+        $fdisplay(req_fd, "CHECK %096x", drbg_tb);
+        $fflush(req_fd);
+        void'($fgets(line, rsp_fd)); // OK <round> | MISMATCH <round> <expected>
+        if ($sscanf(line, "%s %d", status, check_round) != 2 || status != "OK") begin
+          $error("*** ERROR: TC %0d lockstep round #%0d: reference model replied %s", tc_number, i, line);
+          error_ctr = error_ctr + 1;
+          break;
+        end
+
+        if (drbg_tb != expected) begin
+          $display("*** ERROR: TC %0d lockstep round #%0d NOT successful.", tc_number, i);
+          $display("Expected: 0x%096x", expected);
+          $display("Got:      0x%096x", drbg_tb);
+          error_ctr = error_ctr + 1;
+          break;
+        end
+      end
+
+      $fdisplay(req_fd, "QUIT");
+      $fclose(req_fd);
+      $fclose(rsp_fd);
+      $display("*** TC %0d lockstep finished.", tc_number);
+      tc_number = tc_number+1;
+    end
+  endtask
+
   //----------------------------------------------------------------
   // read_test_vectors()
   //
@@ -690,6 +778,9 @@ module hmac_drbg_tb();
         if (hmac_drbg_test_vector_file != "")
           hmac_drbg_multi_rounds_directed_test();
       end
+      else if (hmac_drbg_test_to_run == "HMAC_DRBG_lockstep_test") begin
+        hmac_drbg_lockstep_test();
+      end
       else begin
         hmac_drbg_randomized_test();
       end
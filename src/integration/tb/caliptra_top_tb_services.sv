@@ -280,6 +280,23 @@ module caliptra_top_tb_services
 
     sha256_wntz_test_vector_t sha256_wntz_test_vector;
 
+    typedef struct packed {
+        logic [0:15][31:0] key; //HMAC384 keys and tags are left-aligned
+        logic [0:31][31:0] block;
+        logic [0:15][31:0] tag;
+    } hmac_test_vector_t;
+
+    hmac_test_vector_t hmac384_test_vector;
+    hmac_test_vector_t hmac512_test_vector;
+
+    typedef struct packed {
+        logic [0:11][31:0] entropy;
+        logic [0:11][31:0] nonce;
+        logic [0:1][0:11][31:0] round_out;
+    } drbg_test_vector_t;
+
+    drbg_test_vector_t drbg_test_vector;
+
     typedef struct packed {
         logic [0:SEED_NUM_DWORDS-1][31:0] seed;
         logic [0:PUBKEY_NUM_DWORDS-1][31:0] pubkey;
@@ -1956,16 +1973,90 @@ endgenerate //IV_NO
         end
     endgenerate
 
+    // Picks a $urandom record of a tools/scripts/build_vector_pools.py pool
+    // and logs its id, so the vector can be reproduced
+    task vector_pool_pick(input string fname, input string pool_kind, output string record);
+        int fd_r;
+        string line_read, kind;
+        int count, record_bytes, seed, vector_id, data_start;
+
+        fd_r = $fopen(fname, "r");
+        if (fd_r == 0) $fatal(1, "Cannot open vector pool %s for reading", fname);
+        void'($fgets(line_read, fd_r));
+        if ($sscanf(line_read, "POOL %s %h %h %h", kind, count, record_bytes, seed) != 4 || kind != pool_kind)
+            $fatal(1, "%s is not a %s vector pool: %s", fname, pool_kind, line_read);
+        data_start = $ftell(fd_r);
+        vector_id = $urandom_range(count-1, 0);
+        void'($fseek(fd_r, data_start + vector_id * record_bytes, 0));
+        void'($fgets(record, fd_r));
+        $fclose(fd_r);
+        $display("Vector pool %s (%s, seed %0d): using vector id %0d", fname, kind, seed, vector_id);
+    endtask
+
+    // File-handshake shim to tools/scripts/ref_model_server.py --fifo: one
+    // request line out, one reply line in. The server is started on first use
+    // and told to QUIT when the simulation ends.
+    int ref_model_req_fd;
+    int ref_model_rsp_fd;
+
+    task ref_model_request(input string request, output string reply);
+        if (ref_model_req_fd == 0) begin
+            $system("rm -f ref_model_req.fifo ref_model_rsp.fifo && mkfifo ref_model_req.fifo ref_model_rsp.fifo");
+            $system("python3 $CALIPTRA_ROOT/tools/scripts/ref_model_server.py --fifo ref_model_req.fifo ref_model_rsp.fifo &");
+            ref_model_req_fd = $fopen("ref_model_req.fifo", "w");
+            ref_model_rsp_fd = $fopen("ref_model_rsp.fifo", "r");
+            if (ref_model_req_fd == 0 || ref_model_rsp_fd == 0) $fatal(1, "Cannot open the reference model pipes");
+        end
+        $fdisplay(ref_model_req_fd, "%s", request);
+        $fflush(ref_model_req_fd);
+        if ($fgets(reply, ref_model_rsp_fd) == 0 || reply.substr(0, 4) == "ERROR")
+            $fatal(1, "Reference model request %s failed: %s", request, reply);
+    endtask
+
+    final begin
+        if (ref_model_req_fd != 0) begin
+            $fdisplay(ref_model_req_fd, "QUIT");
+            $fclose(ref_model_req_fd);
+            $fclose(ref_model_rsp_fd);
+        end
+    end
+
     task sha256_wntz_testvector_generator();
         string file_name;
         int fd_r;
         string line_read;
         int w_ln, w, n;
+        logic [255:0] msg;
+        string msg_hex;
+
+        if ($value$plusargs("WNTZ_VECTOR_POOL=%s", file_name)) begin
+            vector_pool_pick(file_name, "wntz", line_read);
+            void'($sscanf(line_read, "%h %h %h %h", w, n, sha256_wntz_test_vector.sha256_wntz_block_tb, sha256_wntz_test_vector.sha256_wntz_digest));
+            sha256_wntz_test_vector.wntz_n = n;
+            sha256_wntz_test_vector.wntz_w = w;
+            return;
+        end
 
         w_ln = $urandom_range(3, 0);
         w = 2**w_ln;
         n = $urandom_range(0, 1);
 
+        if ($test$plusargs("WNTZ_REF_MODEL")) begin
+            // 256-bit (n = 1) or 192-bit (n = 0) message, left-aligned; byte 22 is the
+            // chain start j, kept below the chain length as sha256_wntz_test_gen.py does
+            for (int dword = 0; dword < 8; dword++) msg[dword*32 +: 32] = $urandom();
+            msg[(31-22)*8 +: 8] = $urandom_range((2**w) - 2, 0);
+            msg_hex = $sformatf("%064h", msg);
+            msg_hex = msg_hex.substr(0, (n ? 64 : 48) - 1);
+            ref_model_request($sformatf("WNTZ %0d %0d %s", w, n, msg_hex), line_read);
+            void'($sscanf(line_read, "%h", sha256_wntz_test_vector.sha256_wntz_digest));
+            if (n) sha256_wntz_test_vector.sha256_wntz_block_tb = {msg, 8'h80, 184'h0, 64'd256};
+            else   sha256_wntz_test_vector.sha256_wntz_block_tb = {msg[255:64], 8'h80, 248'h0, 64'd192};
+            sha256_wntz_test_vector.wntz_n = n;
+            sha256_wntz_test_vector.wntz_w = w;
+            return;
+        end
+
         $system($sformatf("python sha256_wntz_test_gen.py %d %d", w, n));
         file_name = "sha256_wntz_test_vector.txt";
 
@@ -1989,6 +2080,39 @@ endgenerate //IV_NO
         int fd_r;
         string line_read;
 
+        if ($value$plusargs("DOE_VECTOR_POOL=%s", file_name)) begin
+            vector_pool_pick(file_name, "doe", line_read);
+            void'($sscanf(line_read, "%h %h %h %h %h %h %h %h %h %h %h %h",
+                          doe_test_vector.obf_key_uds, doe_test_vector.iv_uds, doe_test_vector.uds_plaintext, doe_test_vector.uds_ciphertext,
+                          doe_test_vector.obf_key_fe, doe_test_vector.iv_fe, doe_test_vector.fe_plaintext, doe_test_vector.fe_ciphertext,
+                          doe_test_vector.obf_key_hek, doe_test_vector.iv_hek, doe_test_vector.hek_plaintext, doe_test_vector.hek_ciphertext));
+            return;
+        end
+
+        if ($test$plusargs("DOE_REF_MODEL")) begin
+            // Random key, IVs and plaintexts as doe_test_gen.py draws them (one
+            // key for all flows); the server computes the AES-256-CBC ciphertexts
+            for (int dword = 0; dword < `CLP_OBF_KEY_DWORDS; dword++) doe_test_vector.obf_key_uds[dword] = $urandom();
+            for (int dword = 0; dword < IV_NO; dword++) begin
+                doe_test_vector.iv_uds[dword] = $urandom();
+                doe_test_vector.iv_fe[dword]  = $urandom();
+                doe_test_vector.iv_hek[dword] = $urandom();
+            end
+            for (int dword = 0; dword < `CLP_OBF_UDS_DWORDS; dword++) doe_test_vector.uds_plaintext[dword] = $urandom();
+            for (int dword = 0; dword < `CLP_OBF_FE_DWORDS; dword++) doe_test_vector.fe_plaintext[dword] = $urandom();
+            for (int dword = 0; dword < OCP_LOCK_HEK_NUM_DWORDS; dword++) doe_test_vector.hek_plaintext[dword] = $urandom();
+            doe_test_vector.obf_key_fe  = doe_test_vector.obf_key_uds;
+            doe_test_vector.obf_key_hek = doe_test_vector.obf_key_uds;
+
+            ref_model_request($sformatf("DOE %h %h %h", doe_test_vector.obf_key_uds, doe_test_vector.iv_uds, doe_test_vector.uds_plaintext), line_read);
+            void'($sscanf(line_read, "%h", doe_test_vector.uds_ciphertext));
+            ref_model_request($sformatf("DOE %h %h %h", doe_test_vector.obf_key_fe, doe_test_vector.iv_fe, doe_test_vector.fe_plaintext), line_read);
+            void'($sscanf(line_read, "%h", doe_test_vector.fe_ciphertext));
+            ref_model_request($sformatf("DOE %h %h %h", doe_test_vector.obf_key_hek, doe_test_vector.iv_hek, doe_test_vector.hek_plaintext), line_read);
+            void'($sscanf(line_read, "%h", doe_test_vector.hek_ciphertext));
+            return;
+        end
+
         $system("python doe_test_gen.py");
         file_name = "doe_test_vector.txt";
         if(!UVM_TB) begin
@@ -2028,7 +2152,64 @@ endgenerate //IV_NO
 
     endtask
 
-    
+    // HMAC and DRBG vectors come from build_vector_pools.py pools, or with
+    // +HMAC_REF_MODEL/+DRBG_REF_MODEL from random inputs predicted by
+    // ref_model_server.py. A vector replaces the fixed key vault injection values
+    // (HMAC384/HMAC512 key, ECC seed), so tests run with these plusargs check
+    // against the logged vector.
+    task hmac_drbg_testvector_generator();
+        string file_name;
+        string line_read;
+        logic [383:0] hmac384_key, hmac384_tag;
+
+        if ($value$plusargs("HMAC384_VECTOR_POOL=%s", file_name)) begin
+            vector_pool_pick(file_name, "hmac384", line_read);
+            void'($sscanf(line_read, "%h %h %h", hmac384_key, hmac384_test_vector.block, hmac384_tag));
+        end
+        else if ($test$plusargs("HMAC_REF_MODEL")) begin
+            for (int dword = 0; dword < 12; dword++) hmac384_key[dword*32 +: 32] = $urandom();
+            for (int dword = 0; dword < 32; dword++) hmac384_test_vector.block[dword] = $urandom();
+            ref_model_request($sformatf("HMAC384 %h %h", hmac384_key, hmac384_test_vector.block), line_read);
+            void'($sscanf(line_read, "%h", hmac384_tag));
+        end
+        if ($test$plusargs("HMAC384_VECTOR_POOL") || $test$plusargs("HMAC_REF_MODEL")) begin
+            hmac384_test_vector.key = {hmac384_key, 128'h0};
+            hmac384_test_vector.tag = {hmac384_tag, 128'h0};
+            hmac384_key_tb = hmac384_test_vector.key;
+        end
+
+        if ($value$plusargs("HMAC512_VECTOR_POOL=%s", file_name)) begin
+            vector_pool_pick(file_name, "hmac512", line_read);
+            void'($sscanf(line_read, "%h %h %h", hmac512_test_vector.key, hmac512_test_vector.block, hmac512_test_vector.tag));
+        end
+        else if ($test$plusargs("HMAC_REF_MODEL")) begin
+            for (int dword = 0; dword < 16; dword++) hmac512_test_vector.key[dword] = $urandom();
+            for (int dword = 0; dword < 32; dword++) hmac512_test_vector.block[dword] = $urandom();
+            ref_model_request($sformatf("HMAC512 %h %h", hmac512_test_vector.key, hmac512_test_vector.block), line_read);
+            void'($sscanf(line_read, "%h", hmac512_test_vector.tag));
+        end
+        if ($test$plusargs("HMAC512_VECTOR_POOL") || $test$plusargs("HMAC_REF_MODEL"))
+            hmac512_key_tb = hmac512_test_vector.key;
+
+        if ($value$plusargs("DRBG_VECTOR_POOL=%s", file_name)) begin
+            vector_pool_pick(file_name, "drbg", line_read);
+            void'($sscanf(line_read, "%h %h %h %h", drbg_test_vector.entropy, drbg_test_vector.nonce,
+                          drbg_test_vector.round_out[0], drbg_test_vector.round_out[1]));
+        end
+        else if ($test$plusargs("DRBG_REF_MODEL")) begin
+            for (int dword = 0; dword < 12; dword++) begin
+                drbg_test_vector.entropy[dword] = $urandom();
+                drbg_test_vector.nonce[dword]   = $urandom();
+            end
+            ref_model_request($sformatf("DRBG_INIT tb %h %h", drbg_test_vector.entropy, drbg_test_vector.nonce), line_read);
+            void'($sscanf(line_read, "%h", drbg_test_vector.round_out[0]));
+            ref_model_request("DRBG_NEXT tb", line_read);
+            void'($sscanf(line_read, "%h", drbg_test_vector.round_out[1]));
+        end
+        if ($test$plusargs("DRBG_VECTOR_POOL") || $test$plusargs("DRBG_REF_MODEL"))
+            ecc_seed_tb = {drbg_test_vector.entropy, 128'h0};
+    endtask
+
     task mlkem_testvector_generator();
         int fd, fd_py;
         string input_fname, output_fname, cmd, line;
@@ -2603,6 +2784,7 @@ endgenerate //IV_NO
             else begin
                 $display("* TESTCASE PASSED");
                 $display("\nFinished : minstret = %0d, mcycle = %0d", `DEC.tlu.minstretl[31:0],`DEC.tlu.mcyclel[31:0]);
+                $display("Simulated cycles = %0d", cycleCnt);
                 $display("See \"exec.log\" for execution trace with register updates..\n");
                 dump_memory_contents(MEMTYPE_LMEM, MBOX_DIR_START_ADDR, MBOX_DIR_END_ADDR);
                 dump_memory_contents(MEMTYPE_DCCM, `RV_DCCM_SADR, `RV_DCCM_EADR);
@@ -2619,6 +2801,7 @@ endgenerate //IV_NO
             end
         end
         if (|cycleCntKillReq && (cycleCnt == (cycleCntKillReq + 100))) begin
+                $display("Simulated cycles = %0d", cycleCnt);
                 $error("Dumping memory contents at simulation end due to FAILURE");
                 dump_memory_contents(MEMTYPE_LMEM, MBOX_DIR_START_ADDR, MBOX_DIR_END_ADDR);
                 dump_memory_contents(MEMTYPE_DCCM, `RV_DCCM_SADR, `RV_DCCM_EADR);
@@ -2799,6 +2982,7 @@ endgenerate //IV_NO
             ecc_testvector_generator();
             doe_testvector_generator();
             sha256_wntz_testvector_generator();
+            hmac_drbg_testvector_generator();
             mldsa_input_hex_gen();
             mlkem_testvector_generator();
 
@@ -33,8 +33,21 @@ Requirements:
 Usage:
   python3.12 mlkem_kv_reference.py              # run with default vectors
   python3.12 mlkem_kv_reference.py --update-c    # also emit C defines
+  python3.12 mlkem_kv_reference.py --batch 1000 --seed 7 -o cases.h
+                                                 # 1000 seeded random cases
+                                                 # as per-case C defines
+  python3.12 mlkem_kv_reference.py --batch 1000 --format bin -o cases.bin
+                                                 # same, as a binary table
+  python3.12 mlkem_kv_reference.py --batch 64 --header
+                                                 # default vectors + 64 cases
+                                                 # as mlkem_kv_cases.h
 """
 
+import argparse
+import functools
+import multiprocessing
+import os
+import random
 import sys
 import struct
 import hmac
@@ -42,11 +55,11 @@ import hashlib
 
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
-# Import kyber-py (try installed, then /tmp clone)
+# Import kyber-py (try installed, then a clone at $KYBER_PY_SRC, /tmp by default)
 try:
     from kyber_py.ml_kem import ML_KEM_1024
 except ImportError:
-    sys.path.insert(0, "/tmp/kyber-py/src")
+    sys.path.insert(0, os.environ.get("KYBER_PY_SRC", "/tmp/kyber-py/src"))
     from kyber_py.ml_kem import ML_KEM_1024
 
 # =====================================================================
@@ -73,6 +86,39 @@ EXPECTED_CIPHERTEXT = None  # compute fresh — depends on shared key
 
 # =====================================================================
 
+# Batch binary table: header (magic, version, case count, record bytes),
+# then one record per case with these fields, raw bytes in test-vector
+# (big-endian) order
+MLKV_BIN_HEADER = struct.Struct("<4sIII")
+MLKV_BIN_MAGIC = b"MLKV"
+MLKV_BIN_VERSION = 1
+MLKV_RECORD_FIELDS = (
+    ('hmac_key', 64),
+    ('hmac_msg', 64),
+    ('mlkem_msg', 32),
+    ('plaintext', 64),
+    ('hmac_tag', 64),
+    ('shared_key', 32),
+    ('ciphertext', 64),
+)
+
+
+# --header: one struct per case, every field already in the DWORD order
+# the firmware writes to / reads from the registers
+MLKV_HEADER_NAME = 'mlkem_kv_cases.h'
+MLKV_CASE_FIELDS = (
+    ('hmac_key', 16, 'HMAC key registers'),
+    ('hmac_block', 32, 'HMAC block registers, message + SHA-512 padding'),
+    ('expected_tag', 16, 'HMAC tag registers'),
+    ('seed_d', 8, 'FW ML-KEM seed_d registers: tag DWORDs 7..0'),
+    ('seed_z', 8, 'FW ML-KEM seed_z registers: tag DWORDs 15..8'),
+    ('mlkem_msg', 8, 'ML-KEM msg registers: BSWAP32 of the BE vector'),
+    ('expected_shared_key', 8, 'ML-KEM shared key registers (LE DWORDs)'),
+    ('aes_key', 8, 'FW AES key_share0: BSWAP32(shared_key[7-i])'),
+    ('plaintext', 16, 'AES plaintext, as hex_to_uint32_array'),
+    ('expected_ciphertext', 16, 'AES ciphertext, as hex_to_uint32_array'),
+)
+
 
 def hex_to_c_dwords(hex_str, name, per_line=4):
     """Format a hex string as a C DWORD array #define."""
@@ -104,10 +150,16 @@ def run_hmac512(key_hex, msg_hex):
     return hmac.new(key, msg, hashlib.sha512).digest()
 
 
+@functools.lru_cache(maxsize=256)
+def mlkem_keygen(seed):
+    """ML-KEM-1024 keygen from seed_d || seed_z, memoized by seed."""
+    return ML_KEM_1024.key_derive(seed)
+
+
 def run_mlkem(seed_d, seed_z, msg_hex):
     """Run ML-KEM-1024 keygen + encaps + decaps, return shared key bytes."""
     m = bytes.fromhex(msg_hex)
-    ek, dk = ML_KEM_1024.key_derive(seed_d + seed_z)
+    ek, dk = mlkem_keygen(seed_d + seed_z)
     K_enc, ct = ML_KEM_1024._encaps_internal(ek, m)
     K_dec = ML_KEM_1024.decaps(dk, ct)
     assert K_enc == K_dec, "encaps/decaps shared key mismatch!"
@@ -136,7 +188,179 @@ def check(label, actual_hex, expected_hex):
     return False
 
 
-def main():
+def run_case(case):
+    """Run the full chain for one case (dict of hex inputs), return it with the outputs added."""
+    tag = run_hmac512(case['hmac_key'], case['hmac_msg'])
+    # same full byte reversals as the KV path, see main()
+    seed_d = tag[:32][::-1]
+    seed_z = tag[32:][::-1]
+    shared_key = run_mlkem(seed_d, seed_z, case['mlkem_msg'])
+    ct = run_aes_ecb(shared_key[::-1], case['plaintext'])
+    return dict(case, hmac_tag=tag.hex(), seed_d=seed_d.hex(), seed_z=seed_z.hex(),
+                shared_key=shared_key.hex(), ciphertext=ct.hex())
+
+
+def random_cases(count, seed, msgs_per_key=1):
+    """
+    Seeded random cases. Every msgs_per_key consecutive cases share one HMAC
+    key/message, hence one ML-KEM keygen. Case n only depends on
+    (seed, msgs_per_key, n).
+    """
+    for case_id in range(count):
+        key_id, msg_id = divmod(case_id, msgs_per_key)
+        key_rng = random.Random(f'mlkem_kv:{seed}:{key_id}')
+        rng = random.Random(f'mlkem_kv:{seed}:{key_id}:{msg_id}')
+        yield {
+            'hmac_key': key_rng.randbytes(64).hex(),
+            'hmac_msg': key_rng.randbytes(64).hex(),
+            'mlkem_msg': rng.randbytes(32).hex(),
+            'plaintext': rng.randbytes(64).hex(),
+        }
+
+
+def run_case_group(group):
+    """Worker: the cases of one HMAC key/message, so their keygen runs once."""
+    return [run_case(case) for case in group]
+
+
+def run_batch(cases, jobs=None):
+    """
+    Run cases across a process pool, results in case order. Cases sharing an
+    HMAC key/message (hence a keygen) go to a worker as one group, wherever
+    they are in the list, so its memoized keygen is reused.
+    """
+    groups = {}
+    for n, case in enumerate(cases):
+        groups.setdefault((case['hmac_key'], case['hmac_msg']), []).append(n)
+    work = [[cases[n] for n in indices] for indices in groups.values()]
+    results = [None] * len(cases)
+    with multiprocessing.Pool(jobs) as pool:
+        for indices, group_results in zip(groups.values(),
+                                          pool.imap(run_case_group, work, chunksize=max(1, len(work) // 64))):
+            for n, result in zip(indices, group_results):
+                results[n] = result
+    return results
+
+
+def format_case_defines(n, case):
+    """Per-case C defines, as --update-c prints them, prefixed CASE<n>_."""
+    prefix = f'CASE{n}_'
+    return '\n\n'.join([
+        hex_to_c_dwords(case['hmac_key'], prefix + 'HMAC_KEY', per_line=8),
+        hex_to_c_dwords(case['hmac_msg'], prefix + 'HMAC_DATA', per_line=8),
+        hex_to_c_string(case['hmac_tag'], prefix + 'EXPECTED_HMAC_TAG'),
+        hex_to_c_dwords(case['seed_d'], prefix + 'SEED_D'),
+        hex_to_c_dwords(case['seed_z'], prefix + 'SEED_Z'),
+        hex_to_c_dwords(case['mlkem_msg'], prefix + 'MLKEM_MSG'),
+        hex_to_c_string(case['plaintext'], prefix + 'AES_PLAINTEXT'),
+        hex_to_c_string(case['shared_key'], prefix + 'EXPECTED_SHARED_KEY'),
+        hex_to_c_string(case['ciphertext'], prefix + 'EXPECTED_CIPHERTEXT'),
+    ]) + '\n'
+
+
+def hmac512_block(msg_hex):
+    """Single HMAC-512 block: message, 0x80, zeros, inner-hash bit length (K^ipad block + message)."""
+    msg = bytes.fromhex(msg_hex)
+    assert len(msg) <= 111, 'message does not fit one HMAC-512 block'
+    return msg + b'\x80' + bytes(111 - len(msg)) + ((128 + len(msg)) * 8).to_bytes(16, 'big')
+
+
+def case_register_dwords(case):
+    """DWORD arrays of one case in register order, keyed by MLKV_CASE_FIELDS names."""
+    be = lambda b: list(struct.unpack(f'>{len(b) // 4}I', b))
+    le = lambda b: list(struct.unpack(f'<{len(b) // 4}I', b))
+    tag = be(bytes.fromhex(case['hmac_tag']))
+    shared_key = le(bytes.fromhex(case['shared_key']))
+    return {
+        'hmac_key': be(bytes.fromhex(case['hmac_key'])),
+        'hmac_block': be(hmac512_block(case['hmac_msg'])),
+        'expected_tag': tag,
+        'seed_d': tag[7::-1],
+        'seed_z': tag[15:7:-1],
+        'mlkem_msg': le(bytes.fromhex(case['mlkem_msg'])),
+        'expected_shared_key': shared_key,
+        'aes_key': le(bytes.fromhex(case['shared_key'])[::-1]),
+        'plaintext': le(bytes.fromhex(case['plaintext'])),
+        'expected_ciphertext': le(bytes.fromhex(case['ciphertext'])),
+    }
+
+
+def dedup_cases(cases):
+    """Drop cases whose inputs repeat an earlier case."""
+    seen = set()
+    unique = []
+    for case in cases:
+        key = (case['hmac_key'], case['hmac_msg'], case['mlkem_msg'], case['plaintext'])
+        if key not in seen:
+            seen.add(key)
+            unique.append(case)
+    return unique
+
+
+def format_cases_header(results):
+    """C header with the mlkem_kv_case_t table of all results."""
+    lines = [
+        '// SPDX-License-Identifier: Apache-2.0',
+        '// Generated by mlkem_kv_reference.py --header, do not edit.',
+        '// HMAC-512 -> ML-KEM-1024 -> AES-256-ECB cases for smoke_test_mlkem_kv_endian.',
+        '',
+        '#ifndef MLKEM_KV_CASES_H',
+        '#define MLKEM_KV_CASES_H',
+        '',
+        '#include <stdint.h>',
+        '',
+        f'#define MLKEM_KV_NUM_CASES {len(results)}',
+        '',
+        'typedef struct {',
+    ]
+    for name, dwords, comment in MLKV_CASE_FIELDS:
+        lines.append(f'    uint32_t {name}[{dwords}];  // {comment}')
+    lines += ['} mlkem_kv_case_t;', '',
+              'static const mlkem_kv_case_t mlkem_kv_cases[MLKEM_KV_NUM_CASES] = {']
+    for n, case in enumerate(results):
+        regs = case_register_dwords(case)
+        lines.append(f'    {{ // case {n}')
+        for name, _, _ in MLKV_CASE_FIELDS:
+            vals = regs[name]
+            lines.append(f'        .{name} = {{')
+            for i in range(0, len(vals), 8):
+                lines.append('            ' + ', '.join(f'0x{d:08X}' for d in vals[i:i + 8]) + ',')
+            lines.append('        },')
+        lines.append('    },')
+    lines += ['};', '', '#endif // MLKEM_KV_CASES_H', '']
+    return '\n'.join(lines)
+
+
+def write_if_changed(path, content):
+    """Write content to path unless it already holds exactly that. Returns True if written."""
+    try:
+        with open(path, 'r') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'w') as f:
+        f.write(content)
+    return True
+
+
+def write_batch(results, path, fmt):
+    """Write batch results as per-case C defines or as the MLKV binary table."""
+    if fmt == 'bin':
+        record_bytes = sum(size for _, size in MLKV_RECORD_FIELDS)
+        with open(path, 'wb') as f:
+            f.write(MLKV_BIN_HEADER.pack(MLKV_BIN_MAGIC, MLKV_BIN_VERSION, len(results), record_bytes))
+            for case in results:
+                f.write(b''.join(bytes.fromhex(case[name]) for name, _ in MLKV_RECORD_FIELDS))
+    else:
+        with open(path, 'w') as f:
+            f.write(f'// {len(results)} HMAC-512 -> ML-KEM-1024 -> AES-256-ECB cases, generated by mlkem_kv_reference.py\n')
+            f.write(f'#define NUM_CASES {len(results)}\n\n')
+            for n, case in enumerate(results):
+                f.write(format_case_defines(n, case) + '\n')
+
+
+def main(update_c=False):
     print('=' * 72)
     print(' HMAC-512 → ML-KEM-1024 → AES-256-ECB  Reference Vector Generator')
     print('=' * 72)
@@ -193,7 +417,7 @@ def main():
     print()
 
     # --- C code generation ---
-    if '--update-c' in sys.argv:
+    if update_c:
         print('-' * 72)
         print('C defines for smoke_test_mlkem_kv_endian.c:')
         print('-' * 72)
@@ -226,4 +450,33 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='HMAC-512 -> ML-KEM-1024 -> AES-256-ECB reference vector generator')
+    parser.add_argument('--update-c', action='store_true', help='also emit C defines for the default vectors')
+    parser.add_argument('--batch', type=int, metavar='N', help='run N seeded random cases instead of the default vectors')
+    parser.add_argument('--seed', type=int, default=0, help='batch seed')
+    parser.add_argument('--msgs-per-key', type=int, default=1,
+                        help='encaps messages per HMAC key/message, i.e. per keygen')
+    parser.add_argument('--format', choices=['defines', 'bin'], default='defines', help='batch output format')
+    parser.add_argument('-o', '--out', default='mlkem_kv_cases.h', help='batch output file')
+    parser.add_argument('--header', nargs='?', metavar='PATH',
+                        const=os.path.join(os.path.dirname(os.path.abspath(__file__)), MLKV_HEADER_NAME),
+                        help='write the default vectors and the --batch cases as a mlkem_kv_case_t table '
+                             f'(default: {MLKV_HEADER_NAME} next to this script), only if it changed')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: all cores)')
+    args = parser.parse_args()
+
+    if args.header:
+        cases = [{'hmac_key': HMAC_KEY, 'hmac_msg': HMAC_MSG, 'mlkem_msg': MLKEM_MSG, 'plaintext': PLAINTEXT}]
+        cases += random_cases(args.batch or 0, args.seed, args.msgs_per_key)
+        cases = dedup_cases(cases)
+        results = run_batch(cases, args.jobs)
+        if write_if_changed(args.header, format_cases_header(results)):
+            print(f'{len(results)} cases -> {args.header}')
+        else:
+            print(f'{len(results)} cases, {args.header} unchanged')
+    elif args.batch:
+        results = run_batch(list(random_cases(args.batch, args.seed, args.msgs_per_key)), args.jobs)
+        write_batch(results, args.out, args.format)
+        print(f'{len(results)} cases (seed {args.seed}) -> {args.out}')
+    else:
+        main(args.update_c)
@@ -72,6 +72,10 @@ module sha256_random_test();
   reg [255 : 0] digest_data;
   reg [255 : 0] expected;
 
+  // Streaming predictor pipes (sha256_test_gen.py --stream), 0 when unused
+  int pred_req_fd;
+  int pred_rsp_fd;
+
   //bind coverage file
   sha256_ctrl_cov_bind i_sha256_ctrl_cov_bind();
   
@@ -425,6 +429,34 @@ module sha256_random_test();
     end
   endtask // single_block_test
 
+  //----------------------------------------------------------------
+  // start_predictor_stream()
+  //
+  // Starts sha256_test_gen.py --stream in the background, so every
+  // block is predicted over two named pipes instead of one Python
+  // run per block.
+  //----------------------------------------------------------------
+  task start_predictor_stream;
+    begin
+      $system("rm -f sha256_req.fifo sha256_rsp.fifo && mkfifo sha256_req.fifo sha256_rsp.fifo");
+      $system("python3 ./sha256_test_gen.py --stream sha256_req.fifo sha256_rsp.fifo &");
+      pred_req_fd = $fopen("sha256_req.fifo", "w");
+      pred_rsp_fd = $fopen("sha256_rsp.fifo", "r");
+      if (pred_req_fd == 0 || pred_rsp_fd == 0)
+        $error("Can't open the SHA256 predictor pipes");
+    end
+  endtask // start_predictor_stream
+
+  task stop_predictor_stream;
+    begin
+      $fdisplay(pred_req_fd, "QUIT");
+      $fclose(pred_req_fd);
+      $fclose(pred_rsp_fd);
+      pred_req_fd = 0;
+      pred_rsp_fd = 0;
+    end
+  endtask // stop_predictor_stream
+
   //----------------------------------------------------------------
   // sha256_predictor()
   //
@@ -441,7 +473,14 @@ module sha256_random_test();
         int    fd_r;
         
         reg [255:0] tmp;
-    begin
+    if (pred_req_fd != 0) begin
+        $fdisplay(pred_req_fd, "BLOCK = %h", block);
+        $fflush(pred_req_fd);
+        void'($fgets(line_read, pred_rsp_fd));
+        void'($sscanf(line_read, "%s %s %h", tmp_str1, tmp_str2, tmp));
+        expected = tmp;
+    end
+    else begin
         //Write block to file
         file_name = "sha256_test_vector.txt";
         file_name_bak = "sha256_test_vectors_all.txt"; 
@@ -489,17 +528,21 @@ module sha256_random_test();
     begin : sha256_tests_block
       reg [511 : 0] tc0;
       reg [255 : 0] res0;
+      int num_blocks;
+
+      if (!$value$plusargs("SHA256_RANDOM_BLOCKS=%d", num_blocks))
+        num_blocks = 1;
 
       $display("*** Testcases for sha256 functionality started.");
 
-      //for (int i = 0; i < 10; i++) begin: test_vector_loop
+      for (int i = 0; i < num_blocks; i++) begin: test_vector_loop
         tc0 = {$urandom(), $urandom(), $urandom(), $urandom(), $urandom(), $urandom(), $urandom(), $urandom(),
                $urandom(), $urandom(), $urandom(), $urandom(), $urandom(), 32'h80000000, 64'h00000000_000001A0};
         
         sha256_predictor(tc0[511 : 96]);
         res0 = expected;
         single_block_test(SHA256_MODE, tc0, res0);
-      //end
+      end
 
       $display("*** Testcases for sha256 functionality completed.");
     end
@@ -518,8 +561,14 @@ module sha256_random_test();
       init_sim();
       reset_dut();
 
+      if ($test$plusargs("SHA256_PREDICTOR_STREAM"))
+        start_predictor_stream();
+
       sha256_tests();
 
+      if (pred_req_fd != 0)
+        stop_predictor_stream();
+
       display_test_result();
 
       $display("   -- Testbench for randomized sha256 done. --");
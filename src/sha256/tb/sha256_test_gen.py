@@ -13,42 +13,69 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import argparse
+import hashlib
 import os
-import subprocess
-import random
+import sys
+
+def sha256_digest(block_str):
+    return hashlib.sha256(bytes.fromhex(block_str)).hexdigest()
 
 def generate_expected_digest():
-    f = open("sha256_test_vector.txt", "r")
-    g = open("expected_digest.txt", "w")
-    h = open("expected_digests_all.txt", "a")
     block_str = ""
-    digest_str = ""
-
-    for line in f:
-        if(line[0:8] == "BLOCK = "):
-            block_str = line.strip()[8:]    
-
-    #Generate digest using OpenSSL HMAC SHA384
-    command = 'echo '+block_str+' | xxd -r -p | openssl dgst -sha256'
-    digest = subprocess.check_output(command, shell=True)
-    digest_str = str(digest)
+    with open("sha256_test_vector.txt", "r") as f:
+        for line in f:
+            if(line[0:8] == "BLOCK = "):
+                block_str = line.strip()[8:]
 
-    #Chomp extra chars at beginning and end if python 3.6.8 is loaded
-    if digest_str[1] == "'":
-        digest_str = digest_str[11:-3]
-    else:
-        digest_str = digest_str.rstrip()
-        digest_str = digest_str[9:]
-    g.write('DIGEST = '+digest_str+'\n')
-    h.write('DIGEST = '+digest_str+'\n')
-    h.write("------------------------\n")
+    digest_str = sha256_digest(block_str)
+    with open("expected_digest.txt", "w") as g:
+        g.write('DIGEST = '+digest_str+'\n')
+    with open("expected_digests_all.txt", "a") as h:
+        h.write('DIGEST = '+digest_str+'\n')
+        h.write("------------------------\n")
 
+def stream_digests(fin, fout):
+    """
+    Streaming predictor: one "BLOCK = <hex>" (or bare hex) line in, one
+    "DIGEST = <hex>" line out, until QUIT or EOF. Returns the number of digests.
+    """
+    count = 0
+    for line in fin:
+        line = line.strip()
+        if not line:
+            continue
+        if line == "QUIT":
+            break
+        block_str = line[8:] if line[0:8] == "BLOCK = " else line
+        fout.write('DIGEST = '+sha256_digest(block_str)+'\n')
+        fout.flush()
+        count += 1
+    return count
 
-    f.close()
-    g.close()
-    h.close()
+def serve_stream_pipes(request_path, response_path):
+    """ Runs the streaming predictor over two named pipes, creating them if needed. """
+    for path in (request_path, response_path):
+        if not os.path.exists(path):
+            os.mkfifo(path)
+    # same open order as the testbench (request first) so neither side deadlocks
+    with open(request_path, "r") as fin, open(response_path, "w") as fout:
+        return stream_digests(fin, fout)
 
 def main():
     generate_expected_digest()
 
-main()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="SHA256 expected digest generator (default: one block of sha256_test_vector.txt)")
+    parser.add_argument("--stream", nargs="*", metavar=("REQUEST_FIFO", "RESPONSE_FIFO"),
+                        help="keep running and answer one block per line, over two named pipes or stdin/stdout")
+    args = parser.parse_args()
+
+    if args.stream is None:
+        main()
+    elif len(args.stream) == 2:
+        print("SHA256 predictor: %d digests" % serve_stream_pipes(*args.stream))
+    elif not args.stream:
+        stream_digests(sys.stdin, sys.stdout)
+    else:
+        parser.error("--stream takes two named pipes, or none for stdin/stdout")
@@ -13,138 +13,94 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import os
-import subprocess
+import argparse
+import hashlib
 import random
-import sys
 import secrets
 
-def generate_expected_wntz_digest(w, n):
-    print("w = ", w, "n = ", n)
-    g = open("sha256_wntz_test_vector.txt", "w")
-    h = open("sha256_wntz_test_vectors_all.txt", "a")
-    h.write('w = '+str(w)+' n = '+str(n)+'\n')
-    
-    msg = ""
-    msg_str = ""
-    digest_str = ""
-    msg_str_for_chain = ""  
-
-    #------------------------------------------------------------------------
-    #Generate random message of 256-bit or 192-bit length (based on n)
+def wntz_chain(w, n, msg):
+    #Winternitz chain: msg[22] is the start index j, msg[0:22] the prefix of every step
+    #n = 0 truncates every digest to 192 bits, the final one is zero-filled back to 256
+    digest_bytes = 32 if n == 1 else 24
+    if len(msg) > 23:
+        j_init = msg[22]
+    else:
+        j_init = 0
+    prefix_state = hashlib.sha256(msg[0:22])
+
+    digest = hashlib.sha256(msg).digest()[0:digest_bytes]
+    for j in range(j_init, (2**w) - 2):
+        h = prefix_state.copy()
+        h.update(bytes([j + 1]))
+        h.update(digest)
+        digest = h.digest()[0:digest_bytes]
+    return hashlib.sha256(msg).digest(), digest + bytes(32 - digest_bytes)
+
+def random_wntz_msg(w, n, rand_bytes=secrets.token_bytes, randint=random.randint):
+    #Random message of 256-bit or 192-bit length (based on n)
     if n == 1:
         num = 32
     else:
         num = 24
-    
+    msg = bytearray(rand_bytes(num))
     #Replace j value with something < upper bound of Winternitz chain so error intr is not asserted - only for tb purposes
-    j_rand = random.randint(0,(2**w)-2)
-    j_rand = format(int(j_rand), '02x')
-    # print(j_rand, type(j_rand))
-    
-    #Generate random message
-    command = 'openssl rand -hex '+ str(num)
-    msg = subprocess.check_output(command, shell=True)
-    # print(msg, type(msg))
-    msg_str_temp = str(msg)
-    # print(msg_str_temp)
-
-    #Replace j value of msg with the generated one that ensures it's within 2**w-2 upper bound
-    msg_str = msg_str_temp[0:46] + j_rand + msg_str_temp[48:]
-    # print(msg_str)
-
-    #Chomp extra chars at beginning and end if python 3.6.8 is loaded
-    if msg_str[1] == "'":
-        msg_str = msg_str[2:-3]
-    else:
-        msg_str = msg_str.rstrip()
-    # print("msg = "+msg_str+'\n'+"msg len = "+str(len(msg_str)*4))
-    h.write("MSG = " + msg_str + '\n')
-
-    #------------------------------------
-    #Create a padded version of msg to write to file. This will be used to drive SHA BLOCK reg in tb
-    if len(msg_str) < 128:
-        pad_len = 128 - len(msg_str) - 2 - 16 #-2 to account for 'h80 to be placed at the end of msg while padding, -16 to account for msg len at the end
-        msg_str_padded = msg_str + '80' + str(0)*pad_len + str(format(len(msg_str)*4, '016x'))
-        # print("msg padded = " + msg_str_padded)
-        if len(msg_str_padded) > 128:
-            print("ERROR! check msg padding\n")
-        g.write(msg_str_padded + '\n')
-        h.write("MSG PADDED = " + msg_str_padded + '\n')
-
-    #------------------------------------
-    #Process msg input for subseq iterations of Wntz chain
-    #This will be msg + j + digest. j and digest are appended later
-    msg_str_for_chain = msg_str[0:44]
-    # print("msg_str_for_chain = "+msg_str_for_chain)
-    # print("j = ", msg_str[45:46], msg_str[44:46])
-    if len(msg_str) > 46:
-        j_init = int(msg_str[44:46], 16)
-    else:
-        j_init = 0
-
-    # print("j_init = ", j_init,"msg_str[45:46] = ", msg_str[45:46])
-    #------------------------------------------------------------------------
-
-    #Generate 1st digest using OpenSSL sha256
-    command = 'echo '+msg_str+' | xxd -r -p | openssl dgst -sha256'
-    digest = subprocess.check_output(command, shell=True)
-    digest_str = str(digest)
+    msg[22] = randint(0, (2**w) - 2)
+    return bytes(msg)
 
-    #Chomp extra chars at beginning and end if python 3.6.8 is loaded
-    if digest_str[1] == "'":
-        digest_str = digest_str[11:-3]
-    else:
-        digest_str = digest_str.rstrip()
-        digest_str = digest_str[9:]
-
-    h.write('DIGEST_0 = '+digest_str+'\n')
-
-    #Truncate digest to 192 bits in n = 0 mode
-    if n == 0:
-        digest_str = digest_str[0:48]
-
-    # print("digest0 = " + digest_str)
-
-    #Calculate chain of hashes for wntz
-    for j in range(j_init,(2**w) - 2):
-        #Generate digest using OpenSSL HMAC SHA384
-        # print(str(j) + ":" + digest_str)
-        digest_str = msg_str_for_chain+str(format(j+1,'02x'))+digest_str #+padding
-        # print(str(j) + ":" +digest_str)
-        command = 'echo '+digest_str+' | xxd -r -p | openssl dgst -sha256'
-        digest = subprocess.check_output(command, shell=True)
-        digest_str = str(digest)
-
-        #Chomp extra chars at beginning and end if python 3.6.8 is loaded
-        if digest_str[1] == "'":
-            digest_str = digest_str[11:-3]
-        else:
-            digest_str = digest_str.rstrip()
-            digest_str = digest_str[9:]
-
-        #Truncate digest to 192 bits in n = 0 mode and feed to next iteration
-        if n == 0:
-            digest_str = digest_str[0:48]
+def pad_block(msg):
+    #Padded version of msg, used to drive the SHA BLOCK reg in tb
+    return msg + b"\x80" + bytes(64 - len(msg) - 1 - 8) + (len(msg) * 8).to_bytes(8, "big")
 
-    #Truncate last digest to 192 bits in n = 0 mode
-    if n == 0:
-        digest_str = digest_str[0:48] + str(0)*16
-
-    g.write(digest_str+'\n')
-    h.write('DIGEST_FINAL = '+digest_str+'\n')
-    h.write("------------------------\n")
-
-    # print("digest_str = "+digest_str)
-
-
-    g.close()
-    h.close()
+def generate_expected_wntz_digest(w, n):
+    print("w = ", w, "n = ", n)
+    msg = random_wntz_msg(w, n)
+    digest_0, digest_final = wntz_chain(w, n, msg)
+    block = pad_block(msg)
+
+    with open("sha256_wntz_test_vector.txt", "w") as g:
+        g.write(block.hex() + '\n' + digest_final.hex() + '\n')
+    with open("sha256_wntz_test_vectors_all.txt", "a") as h:
+        h.write('w = '+str(w)+' n = '+str(n)+'\n' + "MSG = " + msg.hex() + '\n' +
+                "MSG PADDED = " + block.hex() + '\n' + 'DIGEST_0 = ' + digest_0.hex() + '\n' +
+                'DIGEST_FINAL = ' + digest_final.hex() + '\n' + "------------------------\n")
+
+def generate_wntz_batch(path, count, seed=0):
+    """
+    Writes count seeded (w, n, msg) vectors to path: the count (8 hex digits),
+    then per vector a "w n" line, the padded block and the final digest as in
+    sha256_wntz_test_vector.txt. path.idx lists the byte offset of each vector.
+    w and n are drawn as the testbench does (w in 1, 2, 4, 8 and n in 0, 1).
+    """
+    rng = random.Random(seed)
+    offsets = []
+    with open(path, "w") as f:
+        f.write("%08X\n" % count)
+        for _ in range(count):
+            w = 2**rng.randint(0, 3)
+            n = rng.randint(0, 1)
+            msg = random_wntz_msg(w, n, rng.randbytes, rng.randint)
+            _, digest_final = wntz_chain(w, n, msg)
+            offsets.append(f.tell())
+            f.write("%d %d\n" % (w, n) + pad_block(msg).hex() + '\n' + digest_final.hex() + '\n')
+    with open(path + ".idx", "w") as f:
+        f.write("# seed %d, %d vectors, vector id and byte offset\n" % (seed, count))
+        f.writelines("%d %d\n" % (vector_id, offset) for vector_id, offset in enumerate(offsets))
 
 def main():
-    w_main = sys.argv[1];
-    n_main = sys.argv[2];
-    
-    generate_expected_wntz_digest(int(w_main), int(n_main))
+    parser = argparse.ArgumentParser(description="Generate SHA256 Winternitz chain test vectors")
+    parser.add_argument("w", type=int, nargs="?", help="Winternitz parameter w (1, 2, 4 or 8)")
+    parser.add_argument("n", type=int, nargs="?", help="1 for 256-bit, 0 for 192-bit digests")
+    parser.add_argument("--batch", type=int, default=0, help="write this many seeded vectors to --out instead")
+    parser.add_argument("--seed", type=int, default=0, help="seed of --batch")
+    parser.add_argument("--out", default="sha256_wntz_test_vectors.hex", help="indexed --batch vector file")
+    args = parser.parse_args()
+
+    if args.batch:
+        generate_wntz_batch(args.out, args.batch, args.seed)
+    elif args.w is None or args.n is None:
+        parser.error("w and n are required without --batch")
+    else:
+        generate_expected_wntz_digest(args.w, args.n)
 
-main()
+if __name__ == "__main__":
+    main()
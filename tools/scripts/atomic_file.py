@@ -0,0 +1,63 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Atomic file writes: the data goes to a temporary file in the destination's
+directory that is renamed over the destination once complete, so readers see
+either the old file or the whole new one, never a partial write.
+"""
+import contextlib
+import os
+import stat
+import tempfile
+
+
+def _replacement_mode(path):
+    """The mode of the existing path, or the umask default for a new file"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextlib.contextmanager
+def atomic_path(path):
+    """Yield a temporary path for a writer that only takes file names; it replaces path when the block completes"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp_")
+    os.close(fd)
+    try:
+        yield tmp_path
+        # mkstemp creates the file 0600, keep the permissions a plain open() would give
+        os.chmod(tmp_path, _replacement_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode="w"):
+    """Yield a file opened with mode that replaces path when the block completes"""
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, mode) as f:
+            yield f
+
+
+def write_atomic(path, data, mode="w"):
+    """Write data to path atomically"""
+    with atomic_open(path, mode) as f:
+        f.write(data)
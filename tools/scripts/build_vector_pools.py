@@ -0,0 +1,131 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Builds seeded vector pools ahead of simulation, so testbenches pick a vector
+by $urandom instead of running a generator mid-simulation.
+
+Every pool is a text file <kind>_pool.hex:
+  POOL <kind> <count> <record bytes> <seed>      (header line, numbers in hex)
+  <record 0>
+  <record 1>
+  ...
+Records are the space-separated hex fields of one vector and all have the
+same length, so record n starts at (end of header) + n * (record bytes).
+Record n of a seed is the same whatever the pool size, so a logged vector id
+reproduces the vector. caliptra_top_tb_services.sv reads the pools given by
++WNTZ_VECTOR_POOL=, +DOE_VECTOR_POOL=, +HMAC384_VECTOR_POOL=,
++HMAC512_VECTOR_POOL= and +DRBG_VECTOR_POOL=, and rejects a pool whose
+header names another kind.
+"""
+import argparse
+import hmac
+import multiprocessing
+import os
+import random
+import time
+
+from atomic_file import atomic_open
+from ref_model_server import import_tb_module
+
+
+def wntz_record(seed, vector_id):
+    # w, n, padded block and final digest, as sha256_wntz_test_vector.txt
+    wntz = import_tb_module("src/sha256/tb", "sha256_wntz_test_gen")
+    rng = random.Random("wntz:%d:%d" % (seed, vector_id))
+    w = 2**rng.randint(0, 3)
+    n = rng.randint(0, 1)
+    msg = wntz.random_wntz_msg(w, n, rng.randbytes, rng.randint)
+    _, digest = wntz.wntz_chain(w, n, msg)
+    return ["%X" % w, "%X" % n, wntz.pad_block(msg).hex(), digest.hex()]
+
+
+def doe_record(seed, vector_id):
+    # key, IV, plaintext, ciphertext for UDS, FE and HEK; set n of doe_test_gen.py --seed
+    doe = import_tb_module("src/doe/tb", "doe_test_gen")
+    vector_set = doe.generate_doe_vector_set(doe.seeded_rand_bytes(seed, vector_id))
+    return [value.hex() for _, key, iv, plaintext, ciphertext in vector_set for value in (key, iv, plaintext, ciphertext)]
+
+
+def hmac_record(hash_name, key_bytes, seed, vector_id):
+    # key, one 1024-bit message and the tag
+    rng = random.Random("%s:%d:%d" % (hash_name, seed, vector_id))
+    key = rng.randbytes(key_bytes)
+    msg = rng.randbytes(128)
+    return [key.hex(), msg.hex(), hmac.digest(key, msg, hash_name).hex()]
+
+
+def hmac384_record(seed, vector_id):
+    return hmac_record("sha384", 48, seed, vector_id)
+
+
+def hmac512_record(seed, vector_id):
+    return hmac_record("sha512", 64, seed, vector_id)
+
+
+def drbg_record(seed, vector_id):
+    # entropy, nonce and the first two round outputs of hmac_drbg_ref.py
+    drbg_ref = import_tb_module("src/hmac_drbg/tb", "hmac_drbg_ref")
+    rng = random.Random("drbg:%d:%d" % (seed, vector_id))
+    entropy = rng.randbytes(48)
+    nonce = rng.randbytes(48)
+    return [entropy.hex(), nonce.hex()] + [output.hex() for output in drbg_ref.drbg_rounds(entropy, nonce, 2)]
+
+
+POOL_KINDS = {
+    'wntz': wntz_record,
+    'doe': doe_record,
+    'hmac384': hmac384_record,
+    'hmac512': hmac512_record,
+    'drbg': drbg_record,
+}
+
+
+def build_chunk(args):
+    """Worker: the record lines [first, last) of one pool"""
+    kind, seed, first, last = args
+    record = POOL_KINDS[kind]
+    return [" ".join(record(seed, vector_id)) + "\n" for vector_id in range(first, last)]
+
+
+def build_pool(kind, count, seed, out_dir, pool, chunk_records=512):
+    """Writes <out_dir>/<kind>_pool.hex from a process pool and returns its path"""
+    path = os.path.join(out_dir, kind + "_pool.hex")
+    work = [(kind, seed, first, min(first + chunk_records, count)) for first in range(0, count, chunk_records)]
+    record_bytes = len(build_chunk((kind, seed, 0, 1))[0])
+    with atomic_open(path) as f:
+        f.write("POOL %s %X %X %X\n" % (kind, count, record_bytes, seed))
+        for lines in pool.imap(build_chunk, work):
+            if any(len(line) != record_bytes for line in lines):
+                raise ValueError("%s records are not fixed size" % kind)
+            f.writelines(lines)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build seeded fixed-record vector pools for testbenches")
+    parser.add_argument("--kinds", nargs="+", choices=list(POOL_KINDS), default=list(POOL_KINDS),
+                        help="pools to build (default: all)")
+    parser.add_argument("-n", "--count", type=int, default=10000, help="vectors per pool")
+    parser.add_argument("--seed", type=int, default=0, help="pool seed")
+    parser.add_argument("--out-dir", default=".", help="directory of the <kind>_pool.hex files")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    with multiprocessing.Pool(args.jobs) as pool:
+        for kind in args.kinds:
+            start = time.perf_counter()
+            path = build_pool(kind, args.count, args.seed, args.out_dir, pool)
+            print("%-8s %d vectors -> %s (%.2f s)" % (kind, args.count, path, time.perf_counter() - start))
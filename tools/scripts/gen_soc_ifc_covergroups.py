@@ -14,194 +14,190 @@
 # limitations under the License.
 #
 
-"""Purpose: Generates a set of covergroups and related signal insantiations for SoC registers""" 
-
-
-
-
-
-
-soc_regs_txt = """
-    CPTRA_HW_ERROR_FATAL
-    CPTRA_HW_ERROR_NON_FATAL
-    CPTRA_FW_ERROR_FATAL
-    CPTRA_FW_ERROR_NON_FATAL
-    CPTRA_HW_ERROR_ENC
-    CPTRA_FW_ERROR_ENC
-    CPTRA_FW_EXTENDED_ERROR_INFO 8
-    CPTRA_BOOT_STATUS
-    CPTRA_FLOW_STATUS
-    CPTRA_RESET_REASON
-    CPTRA_SECURITY_STATE
-    CPTRA_MBOX_VALID_AXI_USER 5
-    CPTRA_MBOX_AXI_USER_LOCK 5
-    CPTRA_TRNG_VALID_AXI_USER
-    CPTRA_TRNG_AXI_USER_LOCK
-    CPTRA_TRNG_DATA 12
-    CPTRA_TRNG_CTRL
-    CPTRA_TRNG_STATUS
-    CPTRA_FUSE_WR_DONE
-    CPTRA_TIMER_CONFIG
-    CPTRA_BOOTFSM_GO
-    CPTRA_DBG_MANUF_SERVICE_REG
-    CPTRA_CLK_GATING_EN
-    CPTRA_GENERIC_INPUT_WIRES 2
-    CPTRA_GENERIC_OUTPUT_WIRES 2
-    CPTRA_HW_REV_ID
-    CPTRA_FW_REV_ID 2
-    CPTRA_HW_CONFIG
-    CPTRA_WDT_TIMER1_EN
-    CPTRA_WDT_TIMER1_CTRL
-    CPTRA_WDT_TIMER1_TIMEOUT_PERIOD 2
-    CPTRA_WDT_TIMER2_EN
-    CPTRA_WDT_TIMER2_CTRL
-    CPTRA_WDT_TIMER2_TIMEOUT_PERIOD 2
-    CPTRA_WDT_STATUS
-    CPTRA_FUSE_VALID_AXI_USER
-    CPTRA_FUSE_AXI_USER_LOCK
-    CPTRA_WDT_CFG 2
-    CPTRA_iTRNG_ENTROPY_CONFIG_0
-    CPTRA_iTRNG_ENTROPY_CONFIG_1
-    CPTRA_RSVD_REG 2
-    CPTRA_HW_CAPABILITIES
-    CPTRA_FW_CAPABILITIES 
-    CPTRA_CAP_LOCK
-    CPTRA_OWNER_PK_HASH 12
-    CPTRA_OWNER_PK_HASH_LOCK
-    fuse_uds_seed 16
-    fuse_field_entropy 8
-    fuse_vendor_pk_hash 12
-    fuse_ecc_revocation
-    fuse_fmc_key_manifest_svn
-    fuse_runtime_svn 4
-    fuse_anti_rollback_disable
-    fuse_idevid_cert_attr 24
-    fuse_idevid_manuf_hsm_id 4
-    fuse_lms_revocation
-    fuse_mldsa_revocation
-    fuse_soc_stepping_id
-    fuse_manuf_dbg_unlock_token 16
-    fuse_pqc_key_type
-    fuse_soc_manifest_svn 4
-    fuse_soc_manifest_max_svn
-    fuse_hek_seed 8
-    SS_CALIPTRA_BASE_ADDR_L
-    SS_CALIPTRA_BASE_ADDR_H
-    SS_MCI_BASE_ADDR_L
-    SS_MCI_BASE_ADDR_H
-    SS_RECOVERY_IFC_BASE_ADDR_L
-    SS_RECOVERY_IFC_BASE_ADDR_H
-    SS_OTP_FC_BASE_ADDR_L
-    SS_OTP_FC_BASE_ADDR_H
-    SS_UDS_SEED_BASE_ADDR_L
-    SS_UDS_SEED_BASE_ADDR_H
-    SS_PROD_DEBUG_UNLOCK_AUTH_PK_HASH_REG_BANK_OFFSET
-    SS_NUM_OF_PROD_DEBUG_UNLOCK_AUTH_PK_HASHES
-    SS_DEBUG_INTENT
-    SS_CALIPTRA_DMA_AXI_USER
-    SS_EXTERNAL_STAGING_AREA_BASE_ADDR_L
-    SS_EXTERNAL_STAGING_AREA_BASE_ADDR_H
-    SS_KEY_RELEASE_BASE_ADDR_L
-    SS_KEY_RELEASE_BASE_ADDR_H
-    SS_KEY_RELEASE_SIZE
-    SS_OCP_LOCK_CTRL
-    SS_STRAP_GENERIC 4
-    SS_DBG_SERVICE_REG_REQ
-    SS_DBG_SERVICE_REG_RSP
-    SS_SOC_DBG_UNLOCK_LEVEL 2
-    SS_GENERIC_FW_EXEC_CTRL 4
-    internal_obf_key 8
-    internal_iccm_lock
-    internal_fw_update_reset
-    internal_fw_update_reset_wait_cycles
-    internal_nmi_vector
-    internal_hw_error_fatal_mask
-    internal_hw_error_non_fatal_mask
-    internal_fw_error_fatal_mask
-    internal_fw_error_non_fatal_mask
-    internal_rv_mtime_l
-    internal_rv_mtime_h
-    internal_rv_mtimecmp_l
-    internal_rv_mtimecmp_h
-    intr_brf_global_intr_en_r
-    intr_brf_error_intr_en_r
-    intr_brf_notif_intr_en_r
-    intr_brf_error_global_intr_r
-    intr_brf_notif_global_intr_r
-    intr_brf_error_internal_intr_r
-    intr_brf_notif_internal_intr_r
-    intr_brf_error_intr_trig_r
-    intr_brf_notif_intr_trig_r
-    intr_brf_error_internal_intr_count_r
-    intr_brf_error_inv_dev_intr_count_r
-    intr_brf_error_cmd_fail_intr_count_r
-    intr_brf_error_bad_fuse_intr_count_r
-    intr_brf_error_iccm_blocked_intr_count_r
-    intr_brf_error_mbox_ecc_unc_intr_count_r
-    intr_brf_error_wdt_timer1_timeout_intr_count_r
-    intr_brf_error_wdt_timer2_timeout_intr_count_r
-    intr_brf_notif_cmd_avail_intr_count_r
-    intr_brf_notif_mbox_ecc_cor_intr_count_r
-    intr_brf_notif_debug_locked_intr_count_r
-    intr_brf_notif_scan_mode_intr_count_r
-    intr_brf_notif_soc_req_lock_intr_count_r
-    intr_brf_notif_gen_in_toggle_intr_count_r
-    intr_brf_error_internal_intr_count_incr_r
-    intr_brf_error_inv_dev_intr_count_incr_r
-    intr_brf_error_cmd_fail_intr_count_incr_r
-    intr_brf_error_bad_fuse_intr_count_incr_r
-    intr_brf_error_iccm_blocked_intr_count_incr_r
-    intr_brf_error_mbox_ecc_unc_intr_count_incr_r
-    intr_brf_error_wdt_timer1_timeout_intr_count_incr_r
-    intr_brf_error_wdt_timer2_timeout_intr_count_incr_r
-    intr_brf_notif_cmd_avail_intr_count_incr_r
-    intr_brf_notif_mbox_ecc_cor_intr_count_incr_r
-    intr_brf_notif_debug_locked_intr_count_incr_r
-    intr_brf_notif_scan_mode_intr_count_incr_r
-    intr_brf_notif_soc_req_lock_intr_count_incr_r
-    intr_brf_notif_gen_in_toggle_intr_count_incr_r
-"""
-#   sha_acc_intr_brf_global_intr_en_r
-#   sha_acc_intr_brf_error_intr_en_r
-#   sha_acc_intr_brf_notif_intr_en_r
-#   sha_acc_intr_brf_error_global_intr_r
-#   sha_acc_intr_brf_notif_global_intr_r
-#   sha_acc_intr_brf_error_internal_intr_r
-#   sha_acc_intr_brf_notif_internal_intr_r
-#   sha_acc_intr_brf_error_intr_trig_r
-#   sha_acc_intr_brf_notif_intr_trig_r
-#   sha_acc_intr_brf_error0_intr_count_r
-#   sha_acc_intr_brf_error1_intr_count_r
-#   sha_acc_intr_brf_error2_intr_count_r
-#   sha_acc_intr_brf_error3_intr_count_r
-#   sha_acc_intr_brf_notif_cmd_done_intr_count_r
-#   sha_acc_intr_brf_error0_intr_count_incr_r
-#   sha_acc_intr_brf_error1_intr_count_incr_r
-#   sha_acc_intr_brf_error2_intr_count_incr_r
-#   sha_acc_intr_brf_error3_intr_count_incr_r
-#   sha_acc_intr_brf_notif_cmd_done_intr_count_incr_r
-
-commented_regs = set( "CPTRA_SECURITY_STATE CPTRA_HW_REV_ID CPTRA_HW_CONFIG".split())
+"""Purpose: Generates a set of covergroups and related signal insantiations for SoC registers
 
-def main():
+The register list and array widths are derived from the elaborated soc_ifc_reg
+RDL model (external registers have no field_storage and are skipped). The
+flattened list can be cached in a table file, keyed by a digest of the RDL
+sources, so the RDL does not have to be recompiled on every run.
+"""
 
-    wr_rd_bins_txt = "bins wr_rd[] = (AHB_WR, AXI_WR => IDLE [*1:1000] => AHB_RD, AXI_RD);"
+import argparse
+import hashlib
+import glob
+import io
+import os
+import sys
+
+from atomic_file import write_atomic
+
+SOC_IFC_RDL = "src/soc_ifc/rtl/soc_ifc_reg.rdl"
+
+# Registers in the interrupt regfile are prefixed with 'intr_brf_'
+INTR_REGFILES = {"intr_block_rf": "intr_brf_"}
+
+SCRIPT_OUTPUT_MARKER = "  // begin SCRIPT_OUTPUT"
+
+# Bumped whenever the table layout changes so stale tables are regenerated
+TABLE_VERSION = "2"
+
+# Simulator default for option.auto_bin_max
+AUTO_BIN_MAX = 64
+
+# Upper bound of the IDLE repetition in the wr_rd transition bins
+DEFAULT_IDLE_MAX = 1000
+
+
+def rdl_sources_digest(rdl_file, parameters):
+    """Digest of every RDL file next to rdl_file (includes live there) and the parameters"""
+    h = hashlib.sha256(TABLE_VERSION.encode())
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(rdl_file)), "*.rdl"))):
+        h.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            h.update(f.read())
+    h.update(repr(sorted(parameters.items())).encode())
+    return h.hexdigest()
+
+
+def load_soc_regs_from_rdl(rdl_file, parameters):
+    """Elaborate soc_ifc_reg and return [(name, width, has_storage, storage_bits)] in address order"""
+    from systemrdl import RDLCompiler
+    from systemrdl.node import RegNode, RegfileNode
+
+    rdlc = RDLCompiler()
+    rdlc.compile_file(rdl_file)
+    root = rdlc.elaborate(parameters=parameters if parameters else None)
+
+    soc_regs = []
+    def collect(node, prefix):
+        for child in node.children():
+            if isinstance(child, RegfileNode):
+                collect(child, prefix + INTR_REGFILES.get(child.inst_name, child.inst_name + "_"))
+            elif isinstance(child, RegNode):
+                # External registers are not backed by field_storage
+                if child.external:
+                    continue
+                width = child.array_dimensions[0] if child.is_array else 1
+                storage_bits = sum(field.width for field in child.fields() if field.implements_storage)
+                soc_regs.append((prefix + child.inst_name, width, storage_bits > 0, storage_bits))
+    collect(root.top, "")
+    return soc_regs
+
+
+def read_soc_regs_table(table_file, digest):
+    """Return the cached register list, or None if missing or stale"""
+    if not os.path.exists(table_file):
+        return None
+    soc_regs = []
+    with open(table_file, "r") as f:
+        if f.readline().strip() != f"# digest: {digest}":
+            return None
+        for line in f:
+            r = line.split()
+            if not r or r[0].startswith("#"):
+                continue
+            soc_regs.append((r[0], int(r[1]), int(r[2]) > 0, int(r[2])))
+    return soc_regs
+
+
+def write_soc_regs_table(table_file, digest, soc_regs):
+    lines = [f"# digest: {digest}\n"]
+    for rname, width, has_storage, storage_bits in soc_regs:
+        lines.append(f"{rname} {width} {storage_bits}\n")
+    write_atomic(table_file, "".join(lines))
+
+
+def get_soc_regs(rdl_file, parameters, table_file=None):
+    """Register list from the cached table if it is current, else from the RDL model"""
+    digest = rdl_sources_digest(rdl_file, parameters)
+    if table_file:
+        soc_regs = read_soc_regs_table(table_file, digest)
+        if soc_regs is not None:
+            return soc_regs
+    soc_regs = load_soc_regs_from_rdl(rdl_file, parameters)
+    if table_file:
+        write_soc_regs_table(table_file, digest, soc_regs)
+    return soc_regs
+
+
+def parse_params(params):
+    parameters = {}
+    for param in params:
+        if '=' not in param:
+            print(f"Error: Invalid parameter format '{param}'. Use NAME=VALUE")
+            sys.exit(1)
+        name, value = param.split('=', 1)
+        if value.lower() in ['true', 'false']:
+            parameters[name] = value.lower() == 'true'
+        elif value.startswith('0x'):
+            parameters[name] = int(value, 16)
+        elif value.isdigit():
+            parameters[name] = int(value)
+        else:
+            parameters[name] = value
+    return parameters
+
+
+def sample_indices(width, array_sample=None):
+    """Representative elements of a register array: both ends plus evenly spaced ones"""
+    if not array_sample or width <= array_sample:
+        return list(range(width))
+    if array_sample == 1:
+        return [0]
+    return sorted({round(i * (width - 1) / (array_sample - 1)) for i in range(array_sample)})
+
+
+def estimate_bins(storage_bits, idle_max=DEFAULT_IDLE_MAX):
+    """Bins of one register element: value auto bins plus wr_rd[] transition bins"""
+    value_bins = min(2 ** storage_bits, AUTO_BIN_MAX)
+    # (AHB_WR, AXI_WR => IDLE [*1:N] => AHB_RD, AXI_RD) expands to 2 * N * 2 sequences
+    transition_bins = 2 * idle_max * 2
+    return value_bins + transition_bins
+
+
+def coverage_cost(soc_regs, idle_max=DEFAULT_IDLE_MAX, array_sample=None):
+    """[(name, covered elements, width, bins)] for every generated covergroup"""
+    costs = []
+    for rname,width,has_storage,storage_bits in soc_regs:
+        if not has_storage:
+            continue
+        covered = len(sample_indices(width, array_sample))
+        costs.append((rname, covered, width, covered * estimate_bins(storage_bits, idle_max)))
+    return costs
+
+
+def print_cost_report(costs, budget=None, out=sys.stderr, top=20):
+    total = sum(c[3] for c in costs)
+    print(f"Estimated coverage bins: {total} in {len(costs)} covergroups"
+          + (f" (budget {budget})" if budget else ""), file=out)
+    print(f"  {'covergroup':<52} {'elements':>9} {'bins':>10} {'share':>7}", file=out)
+    for rname, covered, width, bins in sorted(costs, key=lambda c: c[3], reverse=True)[:top]:
+        elements = f"{covered}/{width}"
+        print(f"  {rname:<52} {elements:>9} {bins:>10} {100.0 * bins / max(total, 1):6.1f}%", file=out)
+    return total
+
+
+def generate_covergroups(soc_regs, out, array_cg=False, idle_max=DEFAULT_IDLE_MAX, array_sample=None):
+    """Write the SCRIPT_OUTPUT section for soc_regs to the out stream
+
+    With array_cg, each register array gets one covergroup definition that is
+    instantiated per element instead of one covergroup with N unrolled coverpoints.
+    With array_sample, only representative elements of wider arrays are covered.
+    """
+
+    wr_rd_bins_txt = f"bins wr_rd[] = (AHB_WR, AXI_WR => IDLE [*1:{idle_max}] => AHB_RD, AXI_RD);"
     ignore_bins_txt = "ignore_bins dont_care = {IDLE, 4'hf, (AXI_RD | AXI_WR), (AHB_RD | AHB_WR)};"
 
-    soc_regs = (reg.strip().split() for reg in soc_regs_txt.strip().splitlines())
-    soc_regs = [(r[0], int(r[1])) if len(r) == 2 else (r[0], 1) for r in soc_regs] 
+    print(file=out)
+    print ("  // ------------------------------------------------------------------- ", file=out)
+    print ("  // begin SCRIPT_OUTPUT", file=out) 
+    print ("  // ------------------------------------------------------------------- \n", file=out)
 
+    print (f"\n  // ------------------- COVERGROUP related signals & assigns -------------------\n", file=out)
 
-    print()
-    print ("  // ------------------------------------------------------------------- ")
-    print ("  // begin SCRIPT_OUTPUT") 
-    print ("  // ------------------------------------------------------------------- \n")
 
-    print (f"\n  // ------------------- COVERGROUP related signals & assigns -------------------\n")
-
-
-    for rname,width in  soc_regs:
-        cb = "  // " if rname in commented_regs else "  "
+    for rname,width,has_storage,_ in  soc_regs:
+        cb = "  " if has_storage else "  // "
     
         if rname.startswith("intr_brf_"):    
             tickdef_prefix = rname.replace("intr_brf_","`CLP_SOC_IFC_REG_INTR_BLOCK_RF_").upper()
@@ -211,81 +207,154 @@ def main():
             tickdef_prefix = f"`CLP_SOC_IFC_REG_{rname.upper()}" 
 
         if width == 1:
-            print (f"{cb}logic          hit_{rname};") 
-            print (f"{cb}logic [3:0]    bus_{rname};"); 
-            # print (f"{cb}logic [31:0]   full_addr_{rname} = `CLP_SOC_IFC_REG_{rname.upper()};\n") 
-            print (f"{cb}logic [31:0]   full_addr_{rname} = {tickdef_prefix};\n") 
+            print (f"{cb}logic          hit_{rname};", file=out) 
+            print (f"{cb}logic [3:0]    bus_{rname};", file=out); 
+            print (f"{cb}logic [31:0]   full_addr_{rname} = {tickdef_prefix};\n", file=out) 
         else: 
-            print (f"{cb}logic          hit_{rname}[0:{width-1}];") 
-            print (f"{cb}logic [3:0]    bus_{rname}[0:{width-1}];"); 
-            print (f"{cb}logic [31:0]   full_addr_{rname}[0:{width-1}];")
+            print (f"{cb}logic          hit_{rname}[0:{width-1}];", file=out) 
+            print (f"{cb}logic [3:0]    bus_{rname}[0:{width-1}];", file=out); 
+            print (f"{cb}logic [31:0]   full_addr_{rname}[0:{width-1}];", file=out)
             for i in range(width): 
-                # print (f"{cb}assign         full_addr_{rname}[{i}] = `CLP_SOC_IFC_REG_{rname.upper()}_{i};") 
-                print (f"{cb}assign         full_addr_{rname}[{i}] = {tickdef_prefix}_{i};") 
-            print()
-    print()
+                print (f"{cb}assign         full_addr_{rname}[{i}] = {tickdef_prefix}_{i};", file=out) 
+            print(file=out)
+    print(file=out)
 
-    for rname,width in  soc_regs:
-        cb = "  // " if rname in commented_regs else "  "
+    for rname,width,has_storage,_ in  soc_regs:
+        cb = "  " if has_storage else "  // "
 
         if width == 1:
-            print (f"{cb}" + "assign hit_%s = (soc_ifc_reg_req_data.addr == full_addr_%s[AXI_ADDR_WIDTH-1:0]);" % (rname, rname))
-            print (f"{cb}" + "assign bus_%s = {uc_rd, uc_wr, soc_rd, soc_wr} & {4{hit_%s}};\n" % (rname, rname))
+            print (f"{cb}" + "assign hit_%s = (soc_ifc_reg_req_data.addr == full_addr_%s[AXI_ADDR_WIDTH-1:0]);" % (rname, rname), file=out)
+            print (f"{cb}" + "assign bus_%s = {uc_rd, uc_wr, soc_rd, soc_wr} & {4{hit_%s}};\n" % (rname, rname), file=out)
         else: 
             for i in range(width): 
-                print (f"{cb}" + "assign hit_%s[%d] = (soc_ifc_reg_req_data.addr == full_addr_%s[%d][18-1:0]);" % (rname, i, rname, i))
-                print (f"{cb}" + "assign bus_%s[%d] = {uc_rd, uc_wr, soc_rd, soc_wr} & {4{hit_%s[%d]}};\n" % (rname, i, rname, i))
+                print (f"{cb}" + "assign hit_%s[%d] = (soc_ifc_reg_req_data.addr == full_addr_%s[%d][18-1:0]);" % (rname, i, rname, i), file=out)
+                print (f"{cb}" + "assign bus_%s[%d] = {uc_rd, uc_wr, soc_rd, soc_wr} & {4{hit_%s[%d]}};\n" % (rname, i, rname, i), file=out)
 
 
-    for rname,width in  soc_regs:
-        cb = "  // " if rname in commented_regs else "  "
+    for rname,width,has_storage,_ in  soc_regs:
+        cb = "  " if has_storage else "  // "
 
         rname_mod = rname
         if rname.startswith("intr_brf_"):    
             rname_mod = rname.replace("intr_brf_","intr_block_rf.")
 
-
-        #  automatic logic [0:0] next_c = field_storage.intr_block_rf.notif_intr_en_r.notif_soc_req_lock_en.value;
-
         if width == 1:
-            print (f"{cb}// ----------------------- COVERGROUP {rname} -----------------------")
-            print (f"{cb}covergroup soc_ifc_{rname}_cg (ref logic [3:0] bus_event) @(posedge clk);")
-            print (f"  {cb}{rname}_cp : coverpoint i_soc_ifc_reg.field_storage.{rname_mod};") 
-            print (f"  {cb}bus_{rname}_cp : coverpoint bus_event", '{') 
-            print (f"    {cb}{wr_rd_bins_txt}") 
-            print (f"    {cb}{ignore_bins_txt}")
-            print (f"{cb}", ' }')
-            print (f"{cb}endgroup\n")
+            print (f"{cb}// ----------------------- COVERGROUP {rname} -----------------------", file=out)
+            print (f"{cb}covergroup soc_ifc_{rname}_cg (ref logic [3:0] bus_event) @(posedge clk);", file=out)
+            print (f"  {cb}{rname}_cp : coverpoint i_soc_ifc_reg.field_storage.{rname_mod};", file=out) 
+            print (f"  {cb}bus_{rname}_cp : coverpoint bus_event", '{', file=out) 
+            print (f"    {cb}{wr_rd_bins_txt}", file=out) 
+            print (f"    {cb}{ignore_bins_txt}", file=out)
+            print (f"{cb}", ' }', file=out)
+            print (f"{cb}endgroup\n", file=out)
+        elif array_cg:
+            # One definition shared by every element; idx selects the storage element
+            print (f"{cb}// ----------------------- COVERGROUP {rname} [0:{width-1}] (per element) -----------------------", file=out)
+            print (f"{cb}covergroup soc_ifc_{rname}_cg (ref logic [3:0] bus_event, input int idx) @(posedge clk);", file=out)
+            print (f"  {cb}option.per_instance = 1;", file=out)
+            print (f"  {cb}{rname}_cp : coverpoint i_soc_ifc_reg.field_storage.{rname_mod}[idx];", file=out) 
+            print (f"  {cb}bus_{rname}_cp : coverpoint bus_event", '{', file=out) 
+            print (f"    {cb}{wr_rd_bins_txt}", file=out) 
+            print (f"    {cb}{ignore_bins_txt}", file=out)
+            print (f"{cb}", ' }', file=out)
+            print (f"{cb}endgroup\n", file=out)
         else:
-            print (f"{cb}// ----------------------- COVERGROUP {rname} [0:{width-1}] -----------------------")
-            print (f"{cb}covergroup soc_ifc_{rname}_cg (ref logic [3:0] bus_event[0:{width-1}]) @(posedge clk);")
-            for i in range(width): 
-                print (f"  {cb}{rname}{i}_cp : coverpoint i_soc_ifc_reg.field_storage.{rname_mod}[{i}];") 
-                print (f"  {cb}bus_{rname}{i}_cp : coverpoint bus_event[{i}]", '{') 
-                print (f"    {cb}{wr_rd_bins_txt}") 
-                print (f"    {cb}{ignore_bins_txt}")
-                print (f"{cb}", ' }')
-            print (f"{cb}endgroup\n")
-
+            print (f"{cb}// ----------------------- COVERGROUP {rname} [0:{width-1}] -----------------------", file=out)
+            print (f"{cb}covergroup soc_ifc_{rname}_cg (ref logic [3:0] bus_event[0:{width-1}]) @(posedge clk);", file=out)
+            for i in sample_indices(width, array_sample): 
+                print (f"  {cb}{rname}{i}_cp : coverpoint i_soc_ifc_reg.field_storage.{rname_mod}[{i}];", file=out) 
+                print (f"  {cb}bus_{rname}{i}_cp : coverpoint bus_event[{i}]", '{', file=out) 
+                print (f"    {cb}{wr_rd_bins_txt}", file=out) 
+                print (f"    {cb}{ignore_bins_txt}", file=out)
+                print (f"{cb}", ' }', file=out)
+            print (f"{cb}endgroup\n", file=out)
+
+
+    print (f"\n  // ----------------------- COVERGROUP Instantiations -----------------------\n", file=out)
+
+    for rname,width,has_storage,_ in  soc_regs:
+        cb = "  " if has_storage else "  // "
+
+        if width > 1 and array_cg:
+            print (f"{cb}soc_ifc_{rname}_cg {rname}_cg[0:{width-1}];", file=out)
+            indices = sample_indices(width, array_sample)
+            if len(indices) == width:
+                print (f"{cb}initial foreach ({rname}_cg[i]) {rname}_cg[i] = new(bus_{rname}[i], i);", file=out)
+            else:
+                for i in indices:
+                    print (f"{cb}initial {rname}_cg[{i}] = new(bus_{rname}[{i}], {i});", file=out)
+        else:
+            print (f"{cb}soc_ifc_{rname}_cg {rname}_cg = new(bus_{rname});", file=out)
 
-    print (f"\n  // ----------------------- COVERGROUP Instantiations -----------------------\n")
 
-    for rname,width in  soc_regs:
-        cb = "  // " if rname in commented_regs else "  "
-       
-        print (f"{cb}soc_ifc_{rname}_cg {rname}_cg = new(bus_{rname});")
+    print(file=out)
+    print ("  // ------------------------------------------------------------------- ", file=out)
+    print ("  // end SCRIPT_OUTPUT", file=out) 
+    print ("  // ------------------------------------------------------------------- \n", file=out)
 
 
-    print()
-    print ("  // ------------------------------------------------------------------- ")
-    print ("  // end SCRIPT_OUTPUT") 
-    print ("  // ------------------------------------------------------------------- \n")
+    print ("endinterface\n", file=out)
+    print (file=out)
+    print ("`endif\n", file=out)
 
 
-    print ("endinterface\n")
-    print ()
-    print ("`endif\n")
+def main():
+    repo_root = os.environ.get('CALIPTRA_ROOT', '.')
+
+    parser = argparse.ArgumentParser(description='Generate SoC-IFC register covergroups from the soc_ifc_reg RDL model')
+    parser.add_argument('--rdl', default=os.path.join(repo_root, SOC_IFC_RDL),
+                        help='soc_ifc_reg RDL file to elaborate')
+    parser.add_argument('--param', '-p', action='append', default=[],
+                        help='Set RDL parameter (format: NAME=VALUE). Can be used multiple times.')
+    parser.add_argument('--table', default=None,
+                        help='Flattened register table cache; regenerated when the RDL sources change')
+    parser.add_argument('--output', '-o', default=None,
+                        help='Write to this file atomically instead of stdout. If it already holds a '
+                             'SCRIPT_OUTPUT section, the text before that section is kept.')
+    parser.add_argument('--array-covergroups', action='store_true',
+                        help='Emit one per-element covergroup definition per register array '
+                             'instead of N unrolled coverpoints')
+    parser.add_argument('--idle-max', type=int, default=DEFAULT_IDLE_MAX,
+                        help='Upper bound of the IDLE repetition in the wr_rd transition bins')
+    parser.add_argument('--array-sample', type=int, default=None,
+                        help='Only cover this many representative elements (ends plus evenly '
+                             'spaced) of wider register arrays')
+    parser.add_argument('--budget', type=int, default=None,
+                        help='Fail without writing output if the estimated total bin count exceeds this')
+    parser.add_argument('--report', action='store_true',
+                        help='Print the estimated bin count per covergroup to stderr')
+    args = parser.parse_args()
+
+    soc_regs = get_soc_regs(args.rdl, parse_params(args.param), args.table)
+
+    costs = coverage_cost(soc_regs, args.idle_max, args.array_sample)
+    total = sum(c[3] for c in costs)
+    if args.report or (args.budget and total > args.budget):
+        print_cost_report(costs, args.budget)
+    if args.budget and total > args.budget:
+        print(f"Error: estimated {total} bins exceeds the budget of {args.budget}; "
+              "reduce --idle-max or use --array-sample", file=sys.stderr)
+        sys.exit(1)
+
+    out = io.StringIO()
+    generate_covergroups(soc_regs, out, args.array_covergroups, args.idle_max, args.array_sample)
+
+    if args.output is None:
+        sys.stdout.write(out.getvalue())
+        return
+
+    preamble = ""
+    if os.path.exists(args.output):
+        with open(args.output, "r") as f:
+            existing = f.read()
+        marker = existing.find(SCRIPT_OUTPUT_MARKER)
+        if marker >= 0:
+            # Keep everything up to the separator line preceding the marker,
+            # minus the blank line the generated section starts with
+            preamble = existing[:existing.rfind("\n", 0, existing.rfind("\n", 0, marker)) + 1]
+            if preamble.endswith("\n\n"):
+                preamble = preamble[:-1]
+    write_atomic(args.output, preamble + out.getvalue())
 
 if __name__ == '__main__':
     main()
-
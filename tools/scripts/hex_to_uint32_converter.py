@@ -17,77 +17,298 @@
 """
 Hex to uint32_t Array Converter for AES Test Vectors
 Converts hex strings to little endian uint32_t arrays for C code
+
+Can be imported as a library: hex_to_le_dwords() packs a hex string into
+little endian dwords, and write_gcm_vector_table() emits a vector table in
+which identical arrays are shared as static const tables referenced by pointer.
 """
 
-def hex_to_uint32_compound_literal(hex_str, pad_to_dwords=None):
-    """Convert hex string to uint32_t compound literal in little endian format"""
-    if not hex_str:
-        return "(uint32_t[]){} /* Empty array */"
-    
+import argparse
+import functools
+import io
+import os
+import struct
+import sys
+
+from atomic_file import write_atomic
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Below this many dwords struct.unpack is faster than building a numpy array
+NUMPY_MIN_DWORDS = 64
+
+
+@functools.lru_cache(maxsize=None)
+def hex_to_le_dwords(hex_str, pad_to_dwords=None):
+    """Convert hex string to a tuple of little endian uint32 values (cached per input)"""
     # Remove any whitespace and ensure even length
-    hex_str = hex_str.replace(" ", "").replace("\n", "")
+    hex_str = "".join(hex_str.split())
     if len(hex_str) % 2 != 0:
         hex_str = "0" + hex_str
-    
-    # Pad to specific number of dwords if requested (for IV padding)
-    if pad_to_dwords is not None:
-        target_hex_chars = pad_to_dwords * 8  # 8 hex chars per dword
-        if len(hex_str) < target_hex_chars:
-            hex_str = hex_str + "0" * (target_hex_chars - len(hex_str))
-    
-    # Convert to bytes
+
     bytes_data = bytes.fromhex(hex_str)
-    
-    # Pad to multiple of 4 bytes if necessary (if not already padded above)
-    while len(bytes_data) % 4 != 0:
-        bytes_data += b'\x00'
-    
-    # Convert to uint32_t array (little endian)
-    uint32_array = []
-    for i in range(0, len(bytes_data), 4):
-        # Little endian: LSB first
-        value = (bytes_data[i] | 
-                (bytes_data[i+1] << 8) | 
-                (bytes_data[i+2] << 16) | 
-                (bytes_data[i+3] << 24))
-        uint32_array.append(f"0x{value:08x}")
-    
-    # Format as compound literal
-    array_elements = ", ".join(uint32_array)
-    return f"(uint32_t[]){{{array_elements}}}"
 
-def convert_single_test_vector(plaintext, ciphertext, tag, aad, iv, key, test_name):
+    # Pad to specific number of dwords if requested (for IV padding),
+    # then to a multiple of 4 bytes
+    if pad_to_dwords is not None:
+        bytes_data = bytes_data.ljust(pad_to_dwords * 4, b'\x00')
+    bytes_data = bytes_data.ljust(-(-len(bytes_data) // 4) * 4, b'\x00')
+
+    num_dwords = len(bytes_data) // 4
+    if numpy is not None and num_dwords >= NUMPY_MIN_DWORDS:
+        return tuple(numpy.frombuffer(bytes_data, '<u4').tolist())
+    return struct.unpack(f'<{num_dwords}I', bytes_data)
+
+
+def format_dwords(dwords):
+    """Format dwords as a comma separated list of C hex literals"""
+    return ", ".join(f"0x{value:08x}" for value in dwords)
+
+
+def hex_to_uint32_compound_literal(hex_str, pad_to_dwords=None):
+    """Convert hex string to uint32_t compound literal in little endian format"""
+    if not hex_str:
+        return "(uint32_t[]){} /* Empty array */"
+    return f"(uint32_t[]){{{format_dwords(hex_to_le_dwords(hex_str, pad_to_dwords))}}}"
+
+def convert_single_test_vector(plaintext, ciphertext, tag, aad, iv, key, test_name, out=sys.stdout):
     """Convert a single test vector for easy copy-paste into existing C code"""
     length_dwords = len(plaintext) // 8  # 8 hex chars = 4 bytes = 1 dword
     
-    print(f"    {{ // {test_name}")
-    print(f"        .plaintext = {hex_to_uint32_compound_literal(plaintext)},")
-    print(f"        .ciphertext = {hex_to_uint32_compound_literal(ciphertext)},")
-    print(f"        .tag = {hex_to_uint32_compound_literal(tag)},")
-    print(f"        .aad = {hex_to_uint32_compound_literal(aad)},")
-    print(f"        .iv = {hex_to_uint32_compound_literal(iv, pad_to_dwords=4)},  // Padded to 4 dwords")
-    print(f"        .key = {hex_to_uint32_compound_literal(key)},")
-    print(f"        .length_dwords = {length_dwords}")
-    print("    },")
-    print()
-
-def convert_test_vector_to_struct(plaintext, ciphertext, tag, aad, iv, key, test_name):
+    print(f"    {{ // {test_name}", file=out)
+    print(f"        .plaintext = {hex_to_uint32_compound_literal(plaintext)},", file=out)
+    print(f"        .ciphertext = {hex_to_uint32_compound_literal(ciphertext)},", file=out)
+    print(f"        .tag = {hex_to_uint32_compound_literal(tag)},", file=out)
+    print(f"        .aad = {hex_to_uint32_compound_literal(aad)},", file=out)
+    print(f"        .iv = {hex_to_uint32_compound_literal(iv, pad_to_dwords=4)},  // Padded to 4 dwords", file=out)
+    print(f"        .key = {hex_to_uint32_compound_literal(key)},", file=out)
+    print(f"        .length_dwords = {length_dwords}", file=out)
+    print("    },", file=out)
+    print(file=out)
+
+def convert_test_vector_to_struct(plaintext, ciphertext, tag, aad, iv, key, test_name, out=sys.stdout):
     """Convert a complete test vector to C structure format"""
     length_dwords = len(plaintext) // 8  # 8 hex chars = 4 bytes = 1 dword
     key_dwords = len(key) // 8  # Calculate key length in dwords
     aad_dwords = len(aad) // 8  # Calculate AAD length in dwords
     
-    print(f"    {{ // {test_name}")
-    print(f"        .plaintext = {hex_to_uint32_compound_literal(plaintext)},")
-    print(f"        .ciphertext = {hex_to_uint32_compound_literal(ciphertext)},")
-    print(f"        .tag = {hex_to_uint32_compound_literal(tag)},")
-    print(f"        .aad = {hex_to_uint32_compound_literal(aad)},")
-    print(f"        .iv = {hex_to_uint32_compound_literal(iv, pad_to_dwords=4)},  // Padded to 4 dwords")
-    print(f"        .key = {hex_to_uint32_compound_literal(key)},")
-    print(f"        .length_dwords = {length_dwords},")
-    print(f"        .key_dwords = {key_dwords},    // Key length in dwords")
-    print(f"        .aad_dwords = {aad_dwords}     // AAD length in dwords")
-    print("    },")
+    print(f"    {{ // {test_name}", file=out)
+    print(f"        .plaintext = {hex_to_uint32_compound_literal(plaintext)},", file=out)
+    print(f"        .ciphertext = {hex_to_uint32_compound_literal(ciphertext)},", file=out)
+    print(f"        .tag = {hex_to_uint32_compound_literal(tag)},", file=out)
+    print(f"        .aad = {hex_to_uint32_compound_literal(aad)},", file=out)
+    print(f"        .iv = {hex_to_uint32_compound_literal(iv, pad_to_dwords=4)},  // Padded to 4 dwords", file=out)
+    print(f"        .key = {hex_to_uint32_compound_literal(key)},", file=out)
+    print(f"        .length_dwords = {length_dwords},", file=out)
+    print(f"        .key_dwords = {key_dwords},    // Key length in dwords", file=out)
+    print(f"        .aad_dwords = {aad_dwords}     // AAD length in dwords", file=out)
+    print("    },", file=out)
+
+
+# Struct members of aes_gcm_vectors_t holding dword arrays, with their IV-style padding
+GCM_ARRAY_FIELDS = (
+    ("plaintext", None),
+    ("ciphertext", None),
+    ("tag", None),
+    ("aad", None),
+    ("iv", 4),
+    ("key", None),
+)
+
+
+class SharedDwordTables:
+    """Deduplicates dword arrays; each distinct array is emitted once as a static const table"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.names = {}
+        self.tables = []
+
+    def ref(self, field, hex_str, pad_to_dwords=None):
+        """Return the C name of the table holding hex_str, or NULL for empty input"""
+        if not hex_str:
+            return "NULL"
+        dwords = hex_to_le_dwords(hex_str, pad_to_dwords)
+        name = self.names.get(dwords)
+        if name is None:
+            name = f"{self.prefix}_{field}_{len(self.tables)}"
+            self.names[dwords] = name
+            self.tables.append((name, dwords))
+        return name
+
+    def write(self, out, per_line=8):
+        for name, dwords in self.tables:
+            print(f"static const uint32_t {name}[{len(dwords)}] = {{", file=out)
+            for i in range(0, len(dwords), per_line):
+                print(f"    {format_dwords(dwords[i:i + per_line])},", file=out)
+            print("};", file=out)
+
+
+def write_gcm_vector_table(test_vectors, out, table_name="gcm_test_vectors"):
+    """Emit aes_gcm_vectors_t entries that point at shared, deduplicated dword tables"""
+    shared = SharedDwordTables(table_name)
+    entries = []
+    for vector in test_vectors:
+        refs = {field: shared.ref(field, vector[field], pad) for field, pad in GCM_ARRAY_FIELDS}
+        entries.append((vector, refs))
+
+    print("// Auto-generated aes_gcm_vectors_t structure initialization", file=out)
+    print("// Generated in little endian format; identical arrays are shared between vectors", file=out)
+    print(file=out)
+    shared.write(out)
+    print(file=out)
+    print(f"static const aes_gcm_vectors_t {table_name}[] = {{", file=out)
+    for vector, refs in entries:
+        print(f"    {{ // {vector['name']}", file=out)
+        for field, _ in GCM_ARRAY_FIELDS:
+            print(f"        .{field} = {refs[field]},", file=out)
+        print(f"        .length_dwords = {len(vector['plaintext']) // 8},", file=out)
+        print(f"        .key_dwords = {len(vector['key']) // 8},    // Key length in dwords", file=out)
+        print(f"        .aad_dwords = {len(vector['aad']) // 8}     // AAD length in dwords", file=out)
+        print("    },", file=out)
+    print("};", file=out)
+    print(file=out)
+    print(f"// Total test vectors: {len(entries)}, shared arrays: {len(shared.tables)}", file=out)
+
+
+# Shapes aes_gcm_vectors_t can carry: a 96-bit IV (padded to 4 dwords),
+# a full 4-dword tag and dword-granular plaintext/AAD lengths
+GCM_KEY_LENS = (128, 192, 256)
+GCM_IV_LENS = (96,)
+GCM_TAG_LENS = (128,)
+
+# Size of one aes_gcm_vectors_t entry: six pointers and three uint32_t
+GCM_VECTOR_STRUCT_BYTES = 9 * 4
+
+
+def parse_gcm_rsp(path):
+    """Lazily yield the vectors of a NIST CAVP gcm*.rsp file
+
+    Each vector is a dict with the hex fields (key, iv, plaintext, ciphertext,
+    aad, tag) and the bit lengths from the enclosing [Keylen = ...] section.
+    Vectors marked FAIL (decrypt files) and vectors without a tag are skipped.
+    """
+    section = {}
+    vector = None
+    name = os.path.basename(path)
+    rsp_fields = {"Key": "key", "IV": "iv", "PT": "plaintext", "CT": "ciphertext", "AAD": "aad", "Tag": "tag"}
+
+    def finish(vector):
+        if vector is None or vector.get("fail") or "tag" not in vector:
+            return None
+        for field in ("plaintext", "ciphertext", "aad"):
+            vector.setdefault(field, "")
+        vector["name"] = f"{name} {vector['lens']} Count = {vector.pop('count')}"
+        return vector
+
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("["):
+                key, _, value = line.strip("[]").partition("=")
+                section[key.strip()] = int(value.strip())
+                continue
+            key, _, value = line.partition("=")
+            key = key.strip()
+            value = value.strip()
+            if key == "Count":
+                done = finish(vector)
+                if done is not None:
+                    yield done
+                vector = dict(section=dict(section), count=int(value))
+                vector["lens"] = "/".join(f"{k}={v}" for k, v in section.items())
+            elif vector is None:
+                continue
+            elif key in rsp_fields:
+                vector[rsp_fields[key]] = value
+            elif key == "FAIL":
+                vector["fail"] = True
+    done = finish(vector)
+    if done is not None:
+        yield done
+
+
+def gcm_vector_shape(vector):
+    """Return (key, iv, tag, pt, aad) bit lengths of a parsed CAVP vector"""
+    return tuple(len(vector[field]) * 4 for field in ("key", "iv", "tag", "plaintext", "aad"))
+
+
+def gcm_unsupported_reason(shape, key_lens=GCM_KEY_LENS, iv_lens=GCM_IV_LENS, tag_lens=GCM_TAG_LENS,
+                           pt_lens=None, aad_lens=None):
+    """Why a vector cannot be carried by aes_gcm_vectors_t (or was filtered out), None if usable"""
+    key_len, iv_len, tag_len, pt_len, aad_len = shape
+    if key_len not in key_lens:
+        return f"Keylen {key_len}"
+    if iv_len not in iv_lens:
+        return f"IVlen {iv_len}"
+    if tag_len not in tag_lens:
+        return f"Taglen {tag_len}"
+    if pt_len % 32 or aad_len % 32:
+        return "PT/AAD not dword aligned"
+    if pt_len == 0:
+        return "empty PT"
+    if pt_lens is not None and pt_len not in pt_lens:
+        return f"PTlen {pt_len}"
+    if aad_lens is not None and aad_len not in aad_lens:
+        return f"AADlen {aad_len}"
+    return None
+
+
+def gcm_vector_bytes(vector):
+    """Upper bound of the firmware bytes a vector adds (before sharing)"""
+    hex_chars = sum(len(vector[field]) for field, _ in GCM_ARRAY_FIELDS)
+    return hex_chars // 2 + 4 * 4 + GCM_VECTOR_STRUCT_BYTES
+
+
+def convert_gcm_rsp_files(rsp_files, out_dir, prefix="gcm_cavp", chunk_bytes=32 * 1024, filters=None):
+    """Stream CAVP vectors into chunked C files bucketed by key length
+
+    A chunk is flushed once its vectors would exceed chunk_bytes, keeping each
+    generated file small enough for the ICCM/DCCM images. Returns the list of
+    written files and a dict of skip reasons with counts.
+    """
+    filters = filters or {}
+    buckets = {}
+    written = []
+    skipped = {}
+
+    def flush(key_len):
+        vectors, _, index = buckets[key_len]
+        if not vectors:
+            return
+        table_name = f"{prefix}_k{key_len}_{index}"
+        out = io.StringIO()
+        write_gcm_vector_table(vectors, out, table_name)
+        path = os.path.join(out_dir, table_name + ".h")
+        write_atomic(path, out.getvalue())
+        written.append(path)
+        buckets[key_len] = ([], 0, index + 1)
+
+    for rsp_file in rsp_files:
+        for vector in parse_gcm_rsp(rsp_file):
+            shape = gcm_vector_shape(vector)
+            reason = gcm_unsupported_reason(shape, **filters)
+            if reason is not None:
+                skipped[reason] = skipped.get(reason, 0) + 1
+                continue
+            key_len = shape[0]
+            vectors, size, index = buckets.setdefault(key_len, ([], 0, 0))
+            vector_size = gcm_vector_bytes(vector)
+            if vectors and size + vector_size > chunk_bytes:
+                flush(key_len)
+                vectors, size, index = buckets[key_len]
+            vectors.append(vector)
+            buckets[key_len] = (vectors, size + vector_size, index)
+
+    for key_len in sorted(buckets):
+        flush(key_len)
+    return written, skipped
+
 
 def main():
     # Test vectors from your code
@@ -202,14 +423,62 @@ def main():
         }
     ]
     
-    print("// Auto-generated aes_gcm_vectors_t structure initialization")
-    print("// Generated in little endian format for compound literals")
-    print("static const aes_gcm_vectors_t gcm_test_vectors[] = {")
-    print("    // AES-256 key: feffe9928665731c6d6a8f9467308308feffe9928665731c6d6a8f9467308308")
-    print("    // IV (96-bit): cafebabefacedbaddecaf888") 
-    print("    // AAD: feedfacedeadbeeffeedfacedeadbeefabaddad2")
-    print()
-    print()
+    parser = argparse.ArgumentParser(description="Convert AES-GCM test vectors to an aes_gcm_vectors_t table")
+    parser.add_argument("-o", "--output", default="gcm_test_vectors.h",
+                        help="Output file (written atomically), '-' for stdout")
+    parser.add_argument("--compound-literals", action="store_true",
+                        help="Emit one compound literal per array instead of shared static const tables")
+    parser.add_argument("--rsp", nargs="+", default=None,
+                        help="NIST CAVP gcm*.rsp files to convert instead of the built-in vectors")
+    parser.add_argument("--out-dir", default=".",
+                        help="Directory for the chunked C files generated from --rsp")
+    parser.add_argument("--prefix", default="gcm_cavp",
+                        help="Table and file name prefix for --rsp output")
+    parser.add_argument("--chunk-bytes", type=int, default=32 * 1024,
+                        help="Maximum vector data per generated file for --rsp output")
+    parser.add_argument("--key-len", type=int, nargs="+", default=list(GCM_KEY_LENS),
+                        help="Keep only these key lengths (bits)")
+    parser.add_argument("--pt-len", type=int, nargs="+", default=None,
+                        help="Keep only these plaintext lengths (bits)")
+    parser.add_argument("--aad-len", type=int, nargs="+", default=None,
+                        help="Keep only these AAD lengths (bits)")
+    args = parser.parse_args()
+
+    if args.rsp:
+        # .req files are the requests without the expected results, nothing to check against
+        requests = [path for path in args.rsp if not path.endswith(".rsp")]
+        if requests:
+            parser.error(f"--rsp needs CAVP response (.rsp) files, got {', '.join(requests)}")
+        filters = dict(key_lens=args.key_len, pt_lens=args.pt_len, aad_lens=args.aad_len)
+        written, skipped = convert_gcm_rsp_files(args.rsp, args.out_dir, args.prefix, args.chunk_bytes, filters)
+        for path in written:
+            print(f"Wrote {path}")
+        for reason, count in sorted(skipped.items()):
+            print(f"Skipped {count} vectors: {reason}")
+        return
+
+    out = io.StringIO()
+    if args.compound_literals:
+        write_compound_literal_table(test_vectors, out)
+    else:
+        write_gcm_vector_table(test_vectors, out)
+
+    if args.output == "-":
+        sys.stdout.write(out.getvalue())
+    else:
+        write_atomic(args.output, out.getvalue())
+        print(f"Wrote {len(test_vectors)} vectors to {args.output}")
+
+def write_compound_literal_table(test_vectors, out):
+    """Emit the table with one compound literal per array (no sharing between vectors)"""
+    print("// Auto-generated aes_gcm_vectors_t structure initialization", file=out)
+    print("// Generated in little endian format for compound literals", file=out)
+    print("static const aes_gcm_vectors_t gcm_test_vectors[] = {", file=out)
+    print("    // AES-256 key: feffe9928665731c6d6a8f9467308308feffe9928665731c6d6a8f9467308308", file=out)
+    print("    // IV (96-bit): cafebabefacedbaddecaf888", file=out) 
+    print("    // AAD: feedfacedeadbeeffeedfacedeadbeefabaddad2", file=out)
+    print(file=out)
+    print(file=out)
     
     for vector in test_vectors:
         convert_test_vector_to_struct(
@@ -219,12 +488,13 @@ def main():
             vector["aad"],
             vector["iv"],
             vector["key"],
-            vector["name"]
+            vector["name"],
+            out
         )
     
-    print("};")
-    print()
-    print(f"// Total test vectors: {len(test_vectors)}")
+    print("};", file=out)
+    print(file=out)
+    print(f"// Total test vectors: {len(test_vectors)}", file=out)
 
 if __name__ == "__main__":
     main()
@@ -12,189 +12,500 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import numpy
 import argparse
-from textwrap import wrap
-
-def generate_vector_file_sha512(src_dir, dest_dir, dest_name, arg_f):
-
-    for src_name in arg_f:
-
-        # open source vector file and read in lines
-        src_file = open(src_dir+src_name,'r')
-        src_lines = src_file.readlines()
-        src_file.close()
-
-        # open destination file and check if vectors section is already generated
-        empty_file = False
-        keyword_found = False
-        keyword = src_name[:-4]
-        print("keyword is: ",keyword)
-
+import glob
+import collections
+import contextlib
+import functools
+import os
+import random
+import shutil
+import struct
+import tempfile
+import time
+
+# Output buffer size; vector files are written in large sequential chunks
+WRITE_BUFFER_BYTES = 1 << 20
+
+# Sidecar listing the keyword sections already present in a destination file
+INDEX_SUFFIX = ".idx"
+
+
+def wrap_words(hex_str):
+    """Split a hex string into 8-character (32-bit) words"""
+    return [hex_str[i:i+8] for i in range(0, len(hex_str), 8)]
+
+
+def read_index(dest_path):
+    """Return the keywords already generated into dest_path
+
+    The sidecar index is created on first use by scanning the destination
+    once for section labels, so later runs never rescan the vector file.
+    An index is only trusted while the destination exists and is not older
+    than it; otherwise it is stale and rebuilt from the destination (or
+    dropped along with a deleted destination).
+    """
+    index_path = dest_path + INDEX_SUFFIX
+    if not os.path.exists(dest_path):
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        return set()
+    if os.path.exists(index_path) and os.stat(index_path).st_mtime_ns <= os.stat(dest_path).st_mtime_ns:
+        with open(index_path, "r") as f:
+            return set(line.strip() for line in f if line.strip())
+    keywords = set()
+    with open(dest_path, "r") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.endswith(":") and not line.startswith(("//", ".")):
+                keywords.add(line[:-1])
+    with open(index_path, "w") as f:
+        f.writelines(keyword + "\n" for keyword in sorted(keywords))
+    # the destination must not look older than the index it was just scanned into
+    os.utime(dest_path)
+    return keywords
+
+
+# A vector is yielded as (label, length in bits, parts); each part is (comment, [8-char hex words])
+
+def sha2_vectors(src_lines, keyword, block_bytes=128, length_bytes=16, digest_words=16, mode=None):
+    """Yield every vector of a SHA-2 .rsp file
+
+    The message is padded per FIPS 180-4 for a block_bytes block with a
+    length_bytes length field; the expected digest is zero-filled up to
+    digest_words (the width of the digest registers the test compares).
+    With mode given, each vector starts with that mode word so variants
+    sharing one destination file stay distinguishable.
+    """
+    vector_cnt = 0
+    msg_len_int = 0
+    parts = []
+    for line in src_lines:
+        # length
+        if line.startswith('Len = '):
+            vector_cnt = vector_cnt + 1
+            msg_len_int = int(line[6:])
+            parts = []
+            if mode is not None:
+                parts.append(("indicates hash mode, write to SHA512_CTRL.MODE", ["%08X" % mode]))
+            parts.append(("vector length", ["%08X" % msg_len_int]))
+
+        # message, "Msg = 00" stands for the empty message when Len is 0
+        elif line.startswith('Msg = '):
+            msg_hex = line[6:].strip()[:msg_len_int // 4]
+            zero_bytes = -(msg_len_int // 8 + 1 + length_bytes) % block_bytes
+            msg_wrapped = wrap_words(msg_hex + "80" + "00" * zero_bytes)
+            # append message length info at the back
+            msg_wrapped.extend(wrap_words("%0*X" % (2 * length_bytes, msg_len_int)))
+            parts.append(("input message", msg_wrapped))
+
+        # expected
+        elif line.startswith('MD = '):
+            expected_wrapped = wrap_words(line[5:].strip())
+            expected_wrapped.extend(["00000000"] * (digest_words - len(expected_wrapped)))
+            parts.append(("expected output", expected_wrapped))
+            yield (keyword + "vector_" + str(vector_cnt), msg_len_int, parts)
+
+
+def aes_vectors(src_lines, keyword):
+    """Yield every vector of an AES .rsp file"""
+    vector_cnt = 0
+    op_mode = 1
+    key = IV = msg = expected = None
+    for line in src_lines:
+        # define operation mode:
+        if '[ENCRYPT]' in line:
+            op_mode = 1
+        elif '[DECRYPT]' in line:
+            op_mode = 0
+
+        # get key
+        elif line.startswith('KEY = '):
+            vector_cnt = vector_cnt + 1
+            key = line[6:].strip()
+            IV = msg = expected = None
+
+        # get IV
+        elif line.startswith('IV = '):
+            IV = line[5:].strip()
+
+        # get message
+        elif line.startswith('PLAINTEXT = '):
+            msg = line[12:].strip()
+
+        # get expected
+        elif line.startswith('CIPHERTEXT = '):
+            expected = line[13:].strip()
+
+        # DECRYPT records list the ciphertext first, so emit once both are known
+        if key is not None and msg is not None and expected is not None:
+            key_len_int = int(len(key)/32)
+            msg_len_int = int(len(msg)/32)
+            config_int = int((key_len_int-1) * 2 + op_mode)
+            yield (keyword + "_vector" + str(vector_cnt), len(msg) * 4, [
+                ("indicates op mode and key length, write to AES_ADDR_CONFIG", ["%08X" % config_int]),
+                ("indicates message length, multiply of 128", ["%08X" % msg_len_int]),
+                ("start of key", wrap_words(key)),
+                ("start of IV", wrap_words(IV or "")),
+                ("input message", wrap_words(msg)),
+                ("expected output", wrap_words(expected)),
+            ])
+            key = None
+
+
+def parse_selection(spec):
+    """Parse a --select spec such as "len=0:1024,len=4096:,sample=16,seed=3"
+
+    len=LO:HI keeps vectors whose message length in bits is within [LO, HI]
+    (either bound may be omitted, the option may repeat), count=N keeps the
+    first N matching vectors and sample=N keeps a random N of them, chosen
+    reproducibly from seed (default 0). count and sample apply per vector file.
+    """
+    selection = {"ranges": [], "count": None, "sample": None, "seed": 0}
+    for term in spec.split(","):
+        key, sep, value = term.strip().partition("=")
         try:
-            dest_file = open(dest_dir+dest_name,"r+")
-            dest_lines = dest_file.readlines()
-        except:
-            dest_file = open(dest_dir+dest_name,"w")
-            empty_file = True
-
-        if empty_file == False:
-            for line in dest_lines:
-                if keyword in line:
-                    keyword_found = True
-
-        if keyword_found == True:
-            print("vectors already exist: ", keyword)
+            if not sep:
+                raise ValueError
+            if key == "len":
+                lo, sep, hi = value.partition(":")
+                if not sep:
+                    lo = hi = value
+                selection["ranges"].append((int(lo) if lo else 0, int(hi) if hi else None))
+            elif key in ("count", "sample", "seed"):
+                selection[key] = int(value)
+            else:
+                raise ValueError
+        except ValueError:
+            raise argparse.ArgumentTypeError("invalid selection term: " + repr(term))
+    if selection["count"] is not None and selection["sample"] is not None:
+        raise argparse.ArgumentTypeError("count and sample are mutually exclusive")
+    return selection
+
+
+def select_vectors(vectors, selection):
+    """Filter a vector stream according to a parse_selection() result"""
+    if selection is None:
+        yield from vectors
+        return
+    ranges = selection["ranges"]
+    matched = (vector for vector in vectors
+               if not ranges or any(lo <= vector[1] and (hi is None or vector[1] <= hi) for lo, hi in ranges))
+    if selection["count"] is not None:
+        for n, vector in enumerate(matched):
+            if n >= selection["count"]:
+                break
+            yield vector
+    elif selection["sample"] is not None:
+        # reservoir sampling keeps memory bounded to the sample size
+        rng = random.Random(selection["seed"])
+        reservoir = []
+        for n, vector in enumerate(matched):
+            if n < selection["sample"]:
+                reservoir.append((n, vector))
+            else:
+                slot = rng.randint(0, n)
+                if slot < selection["sample"]:
+                    reservoir[slot] = (n, vector)
+        for _, vector in sorted(reservoir, key=lambda item: item[0]):
+            yield vector
+    else:
+        yield from matched
+
+
+def hex_record_vectors(src_lines, keyword, fields=()):
+    """Yield vectors from a .hex file holding one hex value per line
+
+    Every len(fields) lines form one vector; each value becomes a part named
+    after its field, or is dropped when the field name is None. The first
+    kept field's width in bits is the vector length used by --select.
+    """
+    vector_cnt = 0
+    values = []
+    for line in src_lines:
+        line = line.strip()
+        if not line:
             continue
-
-        # process the source vector file and write to new files
-        if empty_file == True:
-            dest_file.write(".data\n")
-        dest_file.write(keyword+':\n')
-
-        vector_cnt = 0
-        for line in src_lines:
-            # write length
-            if 'Len = ' in line:
-                vector_cnt = vector_cnt + 1
-                dest_file.write("// " + keyword + "vector_" + str(vector_cnt) + "\n")
-                dest_file.write("// vector length\n")
-
-                msg_len_int = int(line[6:])
-                dest_file.write(".word " + ("0x%08X" % msg_len_int) + "\n")
-
-            # write message
-            if 'Msg = ' in line:
-                dest_file.write("// input message\n")
-                msg = line[6:]
-                msg_wrapped = wrap(msg,8)
-                # add padding
-                if len(msg_wrapped[-1]) < 8:
-                    msg_wrapped[-1] = msg_wrapped[-1] + '8' + (8-len(msg_wrapped[-1])-1)*'0'
-                else:
-                    msg_wrapped.append("80000000")
-
-                for word in msg_wrapped:
-                    dest_file.write(".word 0x" + word + "\n")
-                remain_word = 32 - len(msg_wrapped) % 32;
-                if remain_word < 4: remain_word = remain_word + 128
-
-                for i in range(remain_word - 4):
-                    dest_file.write(".word 0x00000000\n")
-
-                # append message length info at the back
-                msg_len_append = "0x%032X" % msg_len_int
-                msg_len_append = wrap(msg_len_append[2:], 8)
-                for word in msg_len_append:
-                    dest_file.write(".word 0x" + word + "\n")
-
-            # write expected
-            if 'MD = ' in line:
-                dest_file.write("// expected output\n")
-                expected = line[5:]
-                expected_wrapped = wrap(expected,8)
-                for word in expected_wrapped:
-                    dest_file.write(".word 0x" + word + "\n")
-
-                for i in range(16 - len(expected_wrapped)):
-                    dest_file.write(".word 0x00000000\n")
-
-    pass
-
-
-def generate_vector_file_aes(src_dir, dest_dir, dest_name, arg_f):
-
-    for src_name in arg_f:
-
-        # open source vector file and read in lines
-        src_file = open(src_dir+src_name,'r')
-        src_lines = src_file.readlines()
-        src_file.close()
-
-        # open destination file and check if vectors section is already generated
-        empty_file = False
-        keyword_found = False
-        keyword = src_name[:-4]
-        print("keyword is: ",keyword)
-
-        try:
-            dest_file = open(dest_dir+dest_name,"r+")
-            dest_lines = dest_file.readlines()
-        except:
-            dest_file = open(dest_dir+dest_name,"w")
-            empty_file = True
-
-        if empty_file == False:
-            for line in dest_lines:
-                if keyword in line:
-                    keyword_found = True
-
-        if keyword_found == True:
-            print("vectors already exist: ", keyword)
+        values.append(line)
+        if len(values) < len(fields):
+            continue
+        vector_cnt = vector_cnt + 1
+        parts = []
+        for field, value in zip(fields, values):
+            if field is not None:
+                # left-pad to whole words so each value keeps its numeric value
+                parts.append((field, wrap_words(value.zfill(-(-len(value) // 8) * 8))))
+        values = []
+        yield (keyword + "_vector" + str(vector_cnt), len(parts[0][1]) * 32, parts)
+
+
+# Vector formats: how to parse the source files and where the vectors go
+VectorFormat = collections.namedtuple("VectorFormat", "vectors src_dir dest_dir dest_filename")
+
+SHA512_VECTORS_SRC = '../../sha512/tb/vectors/'
+
+# SHA512_CTRL.MODE encodings, see sha512_params_pkg.sv
+SHA512_MODES = {'sha512_224': 0, 'sha512_256': 1, 'sha384': 2}
+
+# Fields of the ECC test vector file, in the order ecc_read_test_vectors reads them
+ECC_FIELDS = ("hashed_msg", "privkey", "pubkey_x", "pubkey_y", "seed", "nonce", "R", "S", "IV",
+              "privkeyB", "dh_sharedkey")
+
+VECTOR_FORMATS = {
+    # SHA-512: 1024-bit blocks, 128-bit length, 512-bit digest registers
+    'sha512': VectorFormat(functools.partial(sha2_vectors, digest_words=16),
+                           SHA512_VECTORS_SRC, './smoke_test_sha512/', 'smoke_test_sha512_vectors.s'),
+}
+# Truncated SHA-512 variants: one file each next to the sha512 one, every record led by its
+# SHA512_CTRL.MODE word and the digest zero-filled to the 16-word digest registers
+VECTOR_FORMATS.update(
+    (name, VectorFormat(functools.partial(sha2_vectors, digest_words=16, mode=mode),
+                        SHA512_VECTORS_SRC, './smoke_test_sha512/', 'smoke_test_sha512_%s_vectors.s' % name))
+    for name, mode in SHA512_MODES.items())
+VECTOR_FORMATS.update({
+    'aes': VectorFormat(aes_vectors, '../../aes/tb/vectors/', './smoke_test_aes/', 'smoke_test_aes_vectors.s'),
+    # secp384_testvector.hex as written by ecc_secp384r1.exe
+    'ecc': VectorFormat(functools.partial(hex_record_vectors, fields=ECC_FIELDS),
+                        './', './smoke_test_ecc_sign/', 'smoke_test_ecc_sign_vectors.s'),
+    # keygen_output.hex as written by test_dilithium5: command, public key, private key
+    'mldsa_keygen': VectorFormat(functools.partial(hex_record_vectors, fields=(None, "pubkey", "privkey")),
+                                 './', './smoke_test_mldsa/', 'smoke_test_mldsa_vectors.s'),
+})
+
+
+class AsmVectorWriter:
+    """Writes vectors as .word assembly directly into the destination file"""
+
+    def __init__(self, dest_file, dest_dir, keyword):
+        self.dest_file = dest_file
+        dest_file.write(keyword + ":\n")
+
+    def write(self, label, parts):
+        text = ["// " + label + "\n"]
+        for comment, words in parts:
+            text.append("// " + comment + "\n")
+            text.extend(".word 0x" + word + "\n" for word in words)
+        self.dest_file.write("".join(text))
+
+    def close(self):
+        pass
+
+
+class BinVectorWriter:
+    """Writes vectors as a raw binary blob plus a C header indexing them
+
+    The destination assembly file only gets a global, word-aligned .rodata
+    label around an .incbin of the blob, so the toolchain does not have to
+    assemble one text line per word. The blob is found through the
+    assembler's -I$(TEST_DIR) include path.
+    """
+
+    def __init__(self, dest_file, dest_dir, keyword, endian="little"):
+        self.dest_dir = dest_dir
+        self.keyword = keyword
+        self.word_format = "<" if endian == "little" else ">"
+        self.blob_name = keyword + ".bin"
+        self.blob = open(os.path.join(dest_dir, self.blob_name), "wb", buffering=WRITE_BUFFER_BYTES)
+        self.offset = 0
+        self.index = []
+        dest_file.write("".join([
+            ".pushsection .rodata\n",
+            ".balign 4\n",
+            ".globl " + keyword + "\n",
+            keyword + ":\n",
+            '.incbin "' + self.blob_name + '"\n',
+            ".popsection\n",
+        ]))
+
+    def write(self, label, parts):
+        words = [int(word, 16) for _, part_words in parts for word in part_words]
+        data = struct.pack(self.word_format + "%dI" % len(words), *words)
+        self.blob.write(data)
+        self.index.append((label, self.offset, len(data)))
+        self.offset += len(data)
+
+    def close(self):
+        self.blob.close()
+        guard = self.keyword.upper() + "_INDEX_H"
+        lines = [
+            "// Generated by integration_vector_gen.py - offsets and lengths in bytes\n",
+            "#ifndef " + guard + "\n",
+            "#define " + guard + "\n\n",
+            "#include <stdint.h>\n\n",
+            "#ifndef VECTOR_INDEX_ENTRY_T\n",
+            "#define VECTOR_INDEX_ENTRY_T\n",
+            "typedef struct {\n    uint32_t offset;\n    uint32_t length;\n} vector_index_entry_t;\n",
+            "#endif\n\n",
+            "extern const uint32_t " + self.keyword + "[];\n",
+            "#define " + self.keyword.upper() + "_VECTOR_COUNT " + str(len(self.index)) + "\n\n",
+            "static const vector_index_entry_t " + self.keyword + "_index[] = {\n",
+        ]
+        lines.extend("    {0x%08X, %d}, // %s\n" % (offset, length, label) for label, offset, length in self.index)
+        lines.append("};\n\n#endif\n")
+        with open(os.path.join(self.dest_dir, self.keyword + "_index.h"), "w") as f:
+            f.write("".join(lines))
+
+
+def shard_targets(dest_dir, dest_name, shards):
+    """Return the (dest_dir, dest_name) of every output image
+
+    With more than one shard, shard k of ./smoke_test_sha512/ goes to
+    ./smoke_test_sha512_shard<k>/smoke_test_sha512_shard<k>_vectors.s
+    """
+    if shards <= 1:
+        return [(dest_dir, dest_name)]
+    test_name = os.path.basename(os.path.normpath(dest_dir))
+    parent = os.path.dirname(os.path.normpath(dest_dir))
+    targets = []
+    for shard in range(shards):
+        shard_name = "%s_shard%d" % (test_name, shard)
+        targets.append((os.path.join(parent, shard_name), dest_name.replace(test_name, shard_name, 1)))
+    return targets
+
+
+def link_shard_sources(test_dir, shard_dir, vector_name):
+    """Make a shard directory buildable as TESTNAME=<shard_name>
+
+    The test's <test>.c/.ld are symlinked as <shard>.c/.ld and its headers
+    under their own names; <shard>.mk links the shard's vector image and
+    pulls in the test's own .mk fragment, if any.
+    """
+    test_name = os.path.basename(os.path.normpath(test_dir))
+    shard_name = os.path.basename(os.path.normpath(shard_dir))
+    rel_dir = os.path.join("..", test_name)
+    for name in sorted(os.listdir(test_dir)) if os.path.isdir(test_dir) else []:
+        root, ext = os.path.splitext(name)
+        if root == test_name and ext in (".c", ".ld"):
+            link_name = shard_name + ext
+        elif ext == ".h":
+            link_name = name
+        else:
             continue
+        link_path = os.path.join(shard_dir, link_name)
+        if os.path.lexists(link_path):
+            os.remove(link_path)
+        os.symlink(os.path.join(rel_dir, name), link_path)
+    with open(os.path.join(shard_dir, shard_name + ".mk"), "w") as f:
+        f.write("# Generated by integration_vector_gen.py\n")
+        f.write("-include $(TEST_DIR)/../%s/%s.mk\n" % (test_name, test_name))
+        f.write("AUX_OFILES += %s.o\n" % os.path.splitext(vector_name)[0])
+
+
+def write_shard_testsuite(dest_dir, dest_name, shards, seed=1):
+    """Write a buildable test directory and yml per shard plus a testsuite yml listing all of them"""
+    test_name = os.path.basename(os.path.normpath(dest_dir))
+    parent = os.path.dirname(os.path.normpath(dest_dir))
+    paths = []
+    for shard_dir, vector_name in shard_targets(dest_dir, dest_name, shards):
+        shard_name = os.path.basename(shard_dir)
+        link_shard_sources(dest_dir, shard_dir, vector_name)
+        with open(os.path.join(shard_dir, shard_name + ".yml"), "w") as f:
+            f.write("---\nseed: %d\ntestname: %s\n" % (seed, shard_name))
+        paths.append(shard_name + "/" + shard_name + ".yml")
+    testsuite = os.path.join(parent, test_name + "_shards.yml")
+    with open(testsuite, "w") as f:
+        f.write("document:\n  schema: 1.0\n\ncontents:\n  - tests:\n")
+        f.write('      tags: ["%s_shards"]\n      paths:\n' % test_name)
+        f.writelines("        - " + path + "\n" for path in paths)
+    print("testsuite written: ", testsuite)
+
+
+def generate_vector_file(src_dir, dest_dir, dest_name, arg_f, vectors, fmt="asm", endian="little",
+                         selection=None, shards=1):
+    """Append the vectors of every source file to dest_name in a single pass
+
+    Source files are streamed line by line and output is buffered; source
+    files whose keyword section already exists (per the sidecar index) are skipped.
+    With fmt="bin" each source file becomes a <keyword>.bin blob and a
+    <keyword>_index.h header, and dest_name only gets an .incbin stub.
+    Vectors are filtered by selection (see parse_selection) and, with
+    shards > 1, dealt round-robin into independent per-shard images.
+    """
+    targets = shard_targets(dest_dir, dest_name, shards)
+    with contextlib.ExitStack() as stack:
+        outputs = []
+        for target_dir, target_name in targets:
+            os.makedirs(target_dir, exist_ok=True)
+            dest_path = os.path.join(target_dir, target_name)
+            generated = read_index(dest_path)
+            empty_file = not os.path.exists(dest_path)
+            dest_file = stack.enter_context(open(dest_path, "a", buffering=WRITE_BUFFER_BYTES))
+            index_file = stack.enter_context(open(dest_path + INDEX_SUFFIX, "a"))
+            if empty_file:
+                dest_file.write(".data\n")
+            outputs.append((target_dir, dest_file, index_file, generated))
+
+        for src_name in arg_f:
+            keyword = os.path.splitext(os.path.basename(src_name))[0]
+            print("keyword is: ", keyword)
+
+            if all(keyword in generated for _, _, _, generated in outputs):
+                print("vectors already exist: ", keyword)
+                continue
+
+            # process the source vector file and write to the destination
+            writers = []
+            for target_dir, dest_file, _, generated in outputs:
+                if keyword in generated:
+                    writers.append(None)
+                    continue
+                if fmt == "bin":
+                    writers.append(BinVectorWriter(dest_file, target_dir, keyword, endian))
+                else:
+                    writers.append(AsmVectorWriter(dest_file, target_dir, keyword))
+            with open(os.path.join(src_dir, src_name), 'r') as src_file:
+                for n, (label, _, parts) in enumerate(select_vectors(vectors(src_file, keyword), selection)):
+                    writer = writers[n % len(writers)]
+                    if writer is not None:
+                        writer.write(label, parts)
+            for writer, (_, _, index_file, generated) in zip(writers, outputs):
+                if writer is not None:
+                    writer.close()
+                    generated.add(keyword)
+                    index_file.write(keyword + "\n")
+
+    # both files are closed now; keep every destination at least as new as its index
+    for target_dir, target_name in targets:
+        os.utime(os.path.join(target_dir, target_name))
+
+    if shards > 1:
+        write_shard_testsuite(dest_dir, dest_name, shards)
+
+
+def generate_vector_file_sha512(src_dir, dest_dir, dest_name, arg_f, fmt="asm", endian="little",
+                                selection=None, shards=1):
+    generate_vector_file(src_dir, dest_dir, dest_name, arg_f, VECTOR_FORMATS['sha512'].vectors, fmt, endian,
+                         selection, shards)
+
+
+def generate_vector_file_aes(src_dir, dest_dir, dest_name, arg_f, fmt="asm", endian="little",
+                             selection=None, shards=1):
+    generate_vector_file(src_dir, dest_dir, dest_name, arg_f, aes_vectors, fmt, endian, selection, shards)
+
+
+def benchmark_sha512(src_dir, fmt="asm"):
+    """Time generation of every .rsp file in src_dir into a scratch directory"""
+    src_files = sorted(os.path.basename(path) for path in glob.glob(os.path.join(src_dir, "*.rsp")))
+    if not src_files:
+        print("No .rsp files found in ", src_dir)
+        return
+    scratch = tempfile.mkdtemp(prefix="vector_gen_bench_")
+    try:
+        total_in = 0
+        start = time.perf_counter()
+        for src_name in src_files:
+            src_start = time.perf_counter()
+            generate_vector_file_sha512(src_dir, scratch, "bench_vectors.s", [src_name], fmt)
+            size = os.path.getsize(os.path.join(src_dir, src_name))
+            total_in += size
+            print("  %-28s %8.1f KiB in %7.3f s" % (src_name, size / 1024, time.perf_counter() - src_start))
+        elapsed = time.perf_counter() - start
+        total_out = sum(os.path.getsize(path) for path in glob.glob(os.path.join(scratch, "*")))
+        print("Total: %.1f MiB in, %.1f MiB out, %.3f s (%.1f MiB/s)" %
+              (total_in / 2**20, total_out / 2**20, elapsed, total_in / 2**20 / elapsed))
+    finally:
+        shutil.rmtree(scratch)
 
-        # process the source vector file and write to new files
-        if empty_file == True:
-            dest_file.write(".data\n")
-        dest_file.write(keyword+':\n')
-
-        vector_cnt = 0
-        for line in src_lines:
-            # define operation mode:
-            if '[ENCRYPT]' in line:
-                op_mode = 1
-            elif '[DECRYPT]' in line:
-                op_mode = 0
-
-            # get key
-            if 'KEY = ' in line:
-                vector_cnt = vector_cnt + 1
-                key = line[6:-1]
-                key_wrapped = wrap(key,8)
-
-            # get IV
-            if 'IV' in line:
-
-                IV = line[5:]
-                IV_wrapped = wrap(IV,8)
-
-            # get message
-            if 'PLAINTEXT = ' in line:
-                msg = line[12:]
-                msg_wrapped = wrap(msg,8)
-
-            # get expected
-            if 'CIPHERTEXT ='  in line:
-                expected = line[13:]
-                expected_wrapped = wrap(expected,8)
-
-                # write information
-                dest_file.write("// " + keyword + "_vector" + str(vector_cnt) + "\n")
-                key_len_int = int(len(key)/32)
-                msg_len_int = int(len(msg)/32)
-                config_int = int((key_len_int-1) * 2 + op_mode)
-                dest_file.write("// indicates op mode and key length, write to AES_ADDR_CONFIG\n")
-                dest_file.write(".word " + ("0x%08X" % config_int) + "\n")
-                dest_file.write("// indicates message length, multiply of 128\n")
-                dest_file.write(".word " + ("0x%08X" % msg_len_int) + "\n")
-                #write key
-                dest_file.write("// start of key\n")
-                for key_word in key_wrapped:
-                    dest_file.write(".word 0x" + key_word + "\n")
-                # write IV
-                dest_file.write("// start of IV\n")
-                for IV_word in IV_wrapped:
-                    dest_file.write(".word 0x" + IV_word + "\n")
-                # write message
-                dest_file.write("// input message\n")
-                for msg_word in msg_wrapped:
-                        dest_file.write(".word 0x" + msg_word + "\n")
-                # write expected
-                dest_file.write("// expected output\n")
-                for word in expected_wrapped:
-                    dest_file.write(".word 0x" + word + "\n")
-
-    pass
 
 class Argument_Defaults:
     algorithms = "sha512"
@@ -217,20 +528,37 @@ if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(prog="vector_gen", description="add vector files here")
     parser.add_argument(
-        "-a", type=str, help=HelpMessage.algorithms, default=Argument_Defaults.algorithms, choices=['sha512', 'aes']
+        "-a", type=str, help=HelpMessage.algorithms, default=Argument_Defaults.algorithms,
+        choices=list(VECTOR_FORMATS)
     )
     parser.add_argument(
         "-f", type=str, help=HelpMessage.filenames, default=Argument_Defaults.filenames, nargs = '*'
     )
+    parser.add_argument(
+        "--format", choices=['asm', 'bin'], default='asm',
+        help="asm: .word lines in the .s file; bin: raw blob per vector file, .incbin stub and index header"
+    )
+    parser.add_argument(
+        "--endian", choices=['little', 'big'], default='little', help="word byte order of --format bin blobs"
+    )
+    parser.add_argument(
+        "--select", type=parse_selection, default=None,
+        help="vector subset, e.g. len=0:1024,len=4096:,count=8 or sample=16,seed=3 (count/sample per vector file)"
+    )
+    parser.add_argument(
+        "--shards", type=int, default=1,
+        help="split the vectors round-robin into N test images with matching test yml entries"
+    )
+    parser.add_argument(
+        "--benchmark", action="store_true", help="time generation of all SHA-512 .rsp vector files and exit"
+    )
     args = parser.parse_args()
-
-    if (args.a == 'sha512'):
-        src_dir = '../../sha512/tb/vectors/'
-        dest_dir = './smoke_test_sha512/'
-        dest_filename = 'smoke_test_sha512_vectors.s'
-        generate_vector_file_sha512(src_dir, dest_dir, dest_filename, args.f)
-    elif (args.a == 'aes'):
-        src_dir = '../../aes/tb/vectors/'
-        dest_dir = './smoke_test_aes/'
-        dest_filename = 'smoke_test_aes_vectors.s'
-        generate_vector_file_aes(src_dir, dest_dir, dest_filename, args.f)
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+
+    if args.benchmark:
+        benchmark_sha512(SHA512_VECTORS_SRC, args.format)
+    else:
+        vector_format = VECTOR_FORMATS[args.a]
+        generate_vector_file(vector_format.src_dir, vector_format.dest_dir, vector_format.dest_filename, args.f,
+                             vector_format.vectors, args.format, args.endian, args.select, args.shards)
@@ -0,0 +1,192 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Long-lived reference model for testbenches, so predictions do not pay a
+Python start-up per $system() call.
+
+One request per line, one reply per line, values in hex:
+  PING                               -> PONG
+  WNTZ <w> <n> <msg>                 -> <final chain digest> (as sha256_wntz_test_gen.py)
+  HMAC384 <key> <msg>                -> <tag>
+  HMAC512 <key> <msg>                -> <tag>
+  DOE <key> <iv> <plaintext>         -> <AES-256-CBC ciphertext>
+  DRBG_INIT <id> <entropy> <nonce>   -> <first round output> (as hmac_drbg_ref.py)
+  DRBG_NEXT <id>                     -> <next round output>
+  QUIT                               -> closes the connection, and stops a --fifo server
+Errors are answered with "ERROR <reason>".
+caliptra_top_tb_services.sv sends these with +WNTZ_REF_MODEL, +DOE_REF_MODEL,
++HMAC_REF_MODEL and +DRBG_REF_MODEL instead of running a generator script.
+
+Transports, local only:
+  --socket PATH      Unix socket, any number of concurrent clients
+  --fifo REQ RSP     two named pipes; a testbench can use them with plain
+                     $fopen/$fdisplay/$fgets as a file-handshake shim, see
+                     ref_model_request() in caliptra_top_tb_services.sv
+  --request ...      send one request to a running --socket server and print the reply
+"""
+import argparse
+import hmac
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+CALIPTRA_ROOT = os.environ.get('CALIPTRA_ROOT', os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+
+def import_tb_module(subdir, name):
+    """Import a reference model that lives next to a block testbench"""
+    path = os.path.join(CALIPTRA_ROOT, subdir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return __import__(name)
+
+
+class RefModel:
+    """Dispatches request lines; DRBG instances persist across requests by id"""
+
+    def __init__(self):
+        self.drbgs = {}
+        self.lock = threading.Lock()
+
+    def op_wntz(self, w, n, msg):
+        wntz = import_tb_module("src/sha256/tb", "sha256_wntz_test_gen")
+        return wntz.wntz_chain(int(w), int(n), bytes.fromhex(msg))[1].hex()
+
+    def op_hmac384(self, key, msg):
+        return hmac.digest(bytes.fromhex(key), bytes.fromhex(msg), "sha384").hex()
+
+    def op_hmac512(self, key, msg):
+        return hmac.digest(bytes.fromhex(key), bytes.fromhex(msg), "sha512").hex()
+
+    def op_doe(self, key, iv, plaintext):
+        doe = import_tb_module("src/doe/tb", "doe_test_gen")
+        return doe.encrypt(bytes.fromhex(plaintext), bytes.fromhex(key), bytes.fromhex(iv)).hex()
+
+    def op_drbg_init(self, drbg_id, entropy, nonce):
+        drbg_ref = import_tb_module("src/hmac_drbg/tb", "hmac_drbg_ref")
+        drbg = drbg_ref.HMAC_DRBG(bytes.fromhex(entropy), bytes.fromhex(nonce))
+        # the lock also covers generation: socket clients run in threads and may share an id
+        with self.lock:
+            self.drbgs[drbg_id] = drbg
+            return drbg_ref.next_round_output(drbg).hex()
+
+    def op_drbg_next(self, drbg_id):
+        drbg_ref = import_tb_module("src/hmac_drbg/tb", "hmac_drbg_ref")
+        with self.lock:
+            drbg = self.drbgs.get(drbg_id)
+            if drbg is None:
+                raise ValueError("unknown DRBG id " + drbg_id)
+            return drbg_ref.next_round_output(drbg).hex()
+
+    def handle(self, line):
+        """Returns the reply line for one request line"""
+        op, *args = line.split()
+        if op == "PING":
+            return "PONG"
+        handler = getattr(self, "op_" + op.lower(), None)
+        if handler is None:
+            return "ERROR unknown request " + op
+        try:
+            return handler(*args)
+        except Exception as e:
+            return "ERROR " + str(e).replace("\n", " ")
+
+    def serve(self, fin, fout):
+        """Answers requests from fin on fout until QUIT or EOF; returns True on QUIT"""
+        for line in fin:
+            if not line.strip():
+                continue
+            if line.split()[0] == "QUIT":
+                return True
+            fout.write(self.handle(line) + "\n")
+            fout.flush()
+        return False
+
+
+def serve_socket(socket_path):
+    model = RefModel()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            with self.rfile as fin, self.wfile as fout:
+                model.serve((line.decode() for line in fin), TextWriter(fout))
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as server:
+        print("REF MODEL: serving on", socket_path)
+        server.serve_forever()
+
+
+class TextWriter:
+    """Minimal text wrapper around a binary socket file"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, text):
+        self.f.write(text.encode())
+
+    def flush(self):
+        self.f.flush()
+
+
+def serve_fifo(request_path, response_path):
+    for path in (request_path, response_path):
+        if not os.path.exists(path):
+            os.mkfifo(path)
+    model = RefModel()
+    # a testbench reconnecting reopens the pipes, so keep serving until it sends QUIT
+    while True:
+        with open(request_path, "r") as fin, open(response_path, "w") as fout:
+            if model.serve(fin, fout):
+                return
+
+
+def request(socket_path, line):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        with client.makefile("r") as fin, client.makefile("w") as fout:
+            fout.write(line + "\n")
+            fout.flush()
+            return fin.readline().strip()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Persistent reference model server for testbenches")
+    transport = parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument("--socket", metavar="PATH", help="serve on a Unix socket")
+    transport.add_argument("--fifo", nargs=2, metavar=("REQUEST_FIFO", "RESPONSE_FIFO"),
+                           help="serve over two named pipes")
+    parser.add_argument("--request", nargs=argparse.REMAINDER,
+                        help="send one request to the --socket server and print the reply")
+    args = parser.parse_args()
+
+    if args.request:
+        if not args.socket:
+            parser.error("--request needs --socket")
+        try:
+            reply = request(args.socket, " ".join(args.request))
+        except OSError as e:
+            print("REF MODEL: cannot reach", args.socket, "-", e)
+            sys.exit(1)
+        print(reply)
+        sys.exit(1 if reply.startswith("ERROR") else 0)
+    elif args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_fifo(*args.fifo)
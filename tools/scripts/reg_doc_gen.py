@@ -20,7 +20,7 @@ from peakrdl_regblock import RegblockExporter
 from peakrdl_uvm import UVMExporter
 from peakrdl_html import HTMLExporter
 from peakrdl_regblock.cpuif.passthrough import PassthroughCpuif
-from reg_json import JsonImporter
+from reg_json import JsonImporter, JSON_EXTENSIONS, import_cached
 from math import log, ceil
 import sys
 import os
@@ -29,9 +29,11 @@ import argparse
 
 # Parse command line arguments
 parser = argparse.ArgumentParser(description='Generate register documentation from RDL files')
-parser.add_argument('files', nargs='+', help='RDL or JSON input files')
+parser.add_argument('files', nargs='+', help='RDL, JSON or HJSON input files')
 parser.add_argument('--param', '-p', action='append', default=[], 
                     help='Set RDL parameter (format: NAME=VALUE). Can be used multiple times.')
+parser.add_argument('--cache-dir', default=None,
+                    help='Cache SystemRDL converted from JSON/HJSON per input hash in this directory')
 args = parser.parse_args()
 
 # Process input files from parsed args
@@ -145,8 +147,11 @@ try:
     for input_file in reversed(input_files):
       # compile or import based on the file extension
       ext = os.path.splitext(input_file)[1]
-      if ext == ".json":
-        json_importer.import_file(input_file)
+      if ext in JSON_EXTENSIONS:
+        if args.cache_dir:
+          import_cached(rdlc, input_file, args.cache_dir)
+        else:
+          json_importer.import_file(input_file)
       else:
         rdlc.compile_file(input_file)
 
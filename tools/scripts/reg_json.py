@@ -19,12 +19,19 @@
 # This module imports a json register definition from OpenTitan and creates SystemRDL
 # model.
 # Note that OpenTitan uses a more "human readable" extension to json called hjson.
-# To convert hjson -> json, run the following command:
+# .hjson files are read natively when the hjson package is installed
+# (pip install hjson). Otherwise, convert hjson -> json with:
 #  hjson -j src.hjson > src.json
+#
+# Converted SystemRDL can be cached per input hash (see import_cached) so that
+# repeated reg_json.py / reg_doc_gen.py runs skip unchanged IP imports.
 
+import hashlib
 import json
+import os
 import re
 
+from atomic_file import atomic_path
 from systemrdl import RDLListener
 from systemrdl import component as comp
 from systemrdl.importer import RDLImporter
@@ -33,15 +40,49 @@ from systemrdl.rdltypes import AccessType
 from systemrdl.rdltypes import OnReadType
 from systemrdl.rdltypes import OnWriteType
 
+# Register descriptions accepted by JsonImporter
+JSON_EXTENSIONS = ('.json', '.hjson')
+
+# Bump when the generated RDL changes so stale cache entries are not reused
+IMPORTER_CACHE_VERSION = '1'
+
+# Field bit ranges are either 'msb:lsb' or a single bit index
+BITS_PATTERN = re.compile(r'^\s*(\d+)\s*(?::\s*(\d+)\s*)?$')
+
+
+def load_register_description(path: str) -> dict:
+  # Load a JSON or HJSON register description into primitive Python objects
+  ext = os.path.splitext(path)[1]
+  with open(path, 'r', encoding='utf-8') as f:
+    if ext == '.hjson':
+      try:
+        import hjson
+      except ImportError:
+        raise ImportError(
+            "reading '%s' requires the hjson package (pip install hjson), "
+            'or convert it first with: hjson -j src.hjson > src.json' % path
+        )
+      # Return plain dicts so the decoder does not depend on hjson types
+      return hjson.load(f, object_pairs_hook=dict)
+    return json.load(f)
+
+
+def description_digest(path: str) -> str:
+  # Hash the raw input together with the importer version
+  h = hashlib.sha256(IMPORTER_CACHE_VERSION.encode())
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 16), b''):
+      h.update(chunk)
+  return h.hexdigest()
+
 
 class JsonImporter(RDLImporter):
 
   def import_file(self, path: str) -> None:
     super().import_file(path)
 
-    # Load the JSON from a file and convert it to primitive Python objects
-    with open(path, 'r', encoding='utf-8') as f:
-      json_obj = json.load(f)
+    # Load the JSON/HJSON from a file and convert it to primitive Python objects
+    json_obj = load_register_description(path)
 
     # Decode the JSON object
     # Set is_top=True so that decode returns a definition rather than an instance
@@ -50,25 +91,33 @@ class JsonImporter(RDLImporter):
     # Register the top definition in the root namespace
     self.register_root_component(top_addrmap_def)
 
+    # The top definition is named after the description's 'name', not the file
+    return top_addrmap_def
+
+  def import_files(self, paths) -> None:
+    # Import many OpenTitan IP descriptions into the same compiler session
+    for path in paths:
+      self.import_file(path)
+
   def parse_digits(self, digits):
     # return lsb, msb for a given string input
     # Have: 4:3
     # Want: msb = 4, lsb = 3
     # Have: 4
-    # Want: msb = 4, lsb = 3
+    # Want: msb = 4, lsb = 4
 
-    msb = digits
-    lsb = digits
-    if ':' in digits:
-      pattern = re.compile(r'(\d+):(\d+)')
-      match = pattern.match(digits)
-      if match:
-        msb = match.group(1)
-        lsb = match.group(2)
-      else:
-        self.msg.fatal(
-            "invalid bits found in '%s'" % bits, self.default_src_ref
-        )
+    match = BITS_PATTERN.match(str(digits))
+    if not match:
+      self.msg.fatal(
+          "invalid bits found in '%s'" % digits, self.default_src_ref
+      )
+
+    msb = match.group(1)
+    lsb = match.group(2) if match.group(2) is not None else msb
+    if int(msb) < int(lsb):
+      self.msg.fatal(
+          "msb is lower than lsb in '%s'" % digits, self.default_src_ref
+      )
 
     return msb, lsb
 
@@ -130,7 +179,7 @@ class JsonImporter(RDLImporter):
     )
     return inst
 
-  def decode_reg(self, reg_obj: dict, addr: int) -> comp.Reg:
+  def decode_reg(self, reg_obj: dict, addr: int, count: int = None) -> comp.Reg:
     # validate that this json object contains all the required fields
     if 'name' not in reg_obj:
       self.msg.fatal("JSON object is missing 'name'", self.default_src_ref)
@@ -159,10 +208,133 @@ class JsonImporter(RDLImporter):
       child_inst = self.decode_field(reg_obj, field)
       self.add_child(comp_def, child_inst)
 
-    # Convert the definition into an instance
-    inst = self.instantiate_reg(comp_def, reg_obj['name'], addr)
+    # Convert the definition into an instance. Multiregs become RDL arrays
+    if count is None:
+      inst = self.instantiate_reg(comp_def, reg_obj['name'], addr)
+    else:
+      inst = self.instantiate_reg(
+          comp_def, reg_obj['name'], addr, [count], self.reg_bytes
+      )
     return inst
 
+  def resolve_count(self, json_obj: dict, count) -> int:
+    # multireg counts are either literals or names from 'param_list'
+    if isinstance(count, int):
+      return count
+    count = str(count).strip()
+    if count.isdigit():
+      return int(count)
+    for param in json_obj.get('param_list', []):
+      if param.get('name') == count and 'default' in param:
+        return int(str(param['default']), 0)
+    self.msg.fatal(
+        "multireg count '%s' is neither a number nor a parameter" % count,
+        self.default_src_ref,
+    )
+
+  def parse_offset(self, offset) -> int:
+    # skipto/offset values are given as numbers or strings such as "0x100"
+    if isinstance(offset, int):
+      return offset
+    try:
+      return int(str(offset).replace('_', ''), 0)
+    except ValueError:
+      self.msg.fatal("invalid offset '%s'" % offset, self.default_src_ref)
+
+  def decode_multireg(self, json_obj: dict, multireg_obj: dict, addr: int):
+    # Expand an OpenTitan multireg into RDL register arrays.
+    # Returns the list of instances and the address following the last one.
+    if 'name' not in multireg_obj:
+      self.msg.fatal("multireg object is missing 'name'", self.default_src_ref)
+    if 'count' not in multireg_obj:
+      self.msg.fatal(
+          "'%s' is missing 'count'" % multireg_obj['name'], self.default_src_ref
+      )
+    if 'fields' not in multireg_obj:
+      self.msg.fatal(
+          "'%s' is missing 'fields'" % multireg_obj['name'], self.default_src_ref
+      )
+
+    count = self.resolve_count(json_obj, multireg_obj['count'])
+    name = multireg_obj['name']
+    fields = multireg_obj['fields']
+
+    # A single narrow field is packed several times into each register,
+    # unless the description explicitly disables compaction
+    per_reg = 1
+    if len(fields) == 1 and str(multireg_obj.get('compact', 'true')) != 'false':
+      msb, lsb = self.parse_digits(fields[0]['bits'])
+      width = int(msb) - int(lsb) + 1
+      per_reg = max(1, (self.reg_bytes * 8 - int(lsb)) // width)
+
+    if per_reg == 1:
+      inst = self.decode_reg(multireg_obj, addr, count)
+      return [inst], addr + count * self.reg_bytes
+
+    field = fields[0]
+    field_name = field.get('name', name)
+    field_lsb = int(lsb)
+
+    def packed_reg(n_fields):
+      packed = []
+      for j in range(n_fields):
+        low = field_lsb + j * width
+        packed.append(dict(
+            field, name='%s_%d' % (field_name, j),
+            bits='%d:%d' % (low + width - 1, low),
+        ))
+      return packed
+
+    full_regs, remainder = divmod(count, per_reg)
+    insts = []
+    if full_regs:
+      reg_obj = dict(multireg_obj, fields=packed_reg(per_reg))
+      insts.append(self.decode_reg(reg_obj, addr, full_regs))
+      addr += full_regs * self.reg_bytes
+    if remainder:
+      # The partially filled last register cannot share the array definition
+      reg_obj = dict(
+          multireg_obj, name='%s_%d' % (name, full_regs),
+          fields=packed_reg(remainder),
+      )
+      insts.append(self.decode_reg(reg_obj, addr))
+      addr += self.reg_bytes
+    return insts, addr
+
+  def decode_window(self, window_obj: dict, addr: int):
+    # Map an OpenTitan window onto an RDL mem node.
+    # Returns the instance and the address following the window.
+    if 'name' not in window_obj:
+      self.msg.fatal("window object is missing 'name'", self.default_src_ref)
+    if 'items' not in window_obj:
+      self.msg.fatal(
+          "'%s' is missing 'items'" % window_obj['name'], self.default_src_ref
+      )
+
+    entries = int(str(window_obj['items']), 0)
+    size = entries * self.reg_bytes
+
+    # Windows are aligned to their (power of two) size
+    align = 1 << max(size - 1, 0).bit_length()
+    addr = (addr + align - 1) // align * align
+
+    comp_def = self.create_mem_definition()
+    self.assign_property(comp_def, 'mementries', entries)
+    self.assign_property(comp_def, 'memwidth', self.reg_bytes * 8)
+
+    access_type = window_obj.get('swaccess', 'rw')
+    if access_type == 'ro':
+      self.assign_property(comp_def, 'sw', AccessType['r'])
+    elif access_type == 'wo':
+      self.assign_property(comp_def, 'sw', AccessType['w'])
+    else:
+      self.assign_property(comp_def, 'sw', AccessType['rw'])
+    if 'desc' in window_obj:
+      self.assign_property(comp_def, 'desc', window_obj['desc'])
+
+    inst = self.instantiate_mem(comp_def, window_obj['name'], addr)
+    return inst, addr + size
+
   def decode_addrmap(
       self, json_obj: dict, is_top: bool = False
   ) -> comp.Addrmap:
@@ -184,26 +356,59 @@ class JsonImporter(RDLImporter):
       # otherwise, create an anonymous definition
       comp_def = self.create_addrmap_definition()
 
+    # Register stride in bytes, OpenTitan defaults to 32-bit registers
+    self.reg_bytes = int(str(json_obj.get('regwidth', 32)), 0) // 8
+
     addr = 0
     for index in range(4):
       child_inst = self.add_common_reg(json_obj, index * 4)
       self.add_child(comp_def, child_inst)
       addr += 4
 
-    # Collect child registers
+    # Collect child registers, multiregs and windows.
+    # Addresses are packed in order unless moved by 'skipto'/'offset'
     for register in json_obj['registers']:
-      child_inst = self.decode_reg(register, addr)
-      addr += 4
+      if 'skipto' in register:
+        skip_addr = self.parse_offset(register['skipto'])
+        if skip_addr < addr:
+          self.msg.fatal(
+              "skipto 0x%x overlaps previous registers ending at 0x%x"
+              % (skip_addr, addr), self.default_src_ref,
+          )
+        addr = skip_addr
+        continue
+      if 'reserved' in register:
+        addr += int(str(register['reserved']), 0) * self.reg_bytes
+        continue
+
+      if 'multireg' in register:
+        item = register['multireg']
+      elif 'window' in register:
+        item = register['window']
+      else:
+        item = register
+      if 'offset' in item:
+        addr = self.parse_offset(item['offset'])
+
+      if 'multireg' in register:
+        child_insts, addr = self.decode_multireg(json_obj, item, addr)
+      elif 'window' in register:
+        child_inst, addr = self.decode_window(item, addr)
+        child_insts = [child_inst]
+      else:
+        child_insts = [self.decode_reg(item, addr)]
+        addr += self.reg_bytes
 
-      # Add the child component to this
-      self.add_child(comp_def, child_inst)
+      # Add the child components to this
+      for child_inst in child_insts:
+        self.add_child(comp_def, child_inst)
 
     if is_top:
       # keep top-level addrmap as a definition. Skip instantiation
       return comp_def
 
     inst = self.instantiate_addrmap(
-        comp_def, addrmap_name, json_obj['addr_offset']
+        comp_def, json_obj['name'], json_obj['addr_offset']
     )
     return inst
 
@@ -291,6 +496,33 @@ class JsonImporter(RDLImporter):
     return inst
 
 
+def import_cached(rdlc, path: str, cache_dir: str) -> str:
+  # Import a JSON/HJSON description through a per-input-hash SystemRDL cache.
+  # On a miss the description is converted in a private compiler session and
+  # exported to the cache; the cached RDL is then compiled into rdlc, so an
+  # unchanged IP is never decoded twice.
+  name = os.path.splitext(os.path.basename(path))[0]
+  cached_rdl = os.path.join(
+      cache_dir, '%s_%s.rdl' % (name, description_digest(path)[:16])
+  )
+
+  if not os.path.exists(cached_rdl):
+    from systemrdl import RDLCompiler
+    from peakrdl_systemrdl import SystemRDLExporter
+
+    session = RDLCompiler()
+    top_def = JsonImporter(session).import_file(path)
+    root = session.elaborate(top_def_name=top_def.type_name)
+
+    # Export to a private file first so concurrent runs never see partial RDL
+    os.makedirs(cache_dir, exist_ok=True)
+    with atomic_path(cached_rdl) as tmp_rdl:
+      SystemRDLExporter().export(root, tmp_rdl)
+
+  rdlc.compile_file(cached_rdl)
+  return cached_rdl
+
+
 # -------------------------------------------------------------------------------
 
 
@@ -334,9 +566,11 @@ if __name__ == '__main__':
 
   # Parse command line arguments
   parser = argparse.ArgumentParser(description='Import JSON register definitions and convert to SystemRDL')
-  parser.add_argument('files', nargs='+', help='RDL or JSON input files')
+  parser.add_argument('files', nargs='+', help='RDL, JSON or HJSON input files')
   parser.add_argument('--param', '-p', action='append', default=[], 
                       help='Set RDL parameter (format: NAME=VALUE). Can be used multiple times.')
+  parser.add_argument('--cache-dir', default=None,
+                      help='Cache converted SystemRDL per input hash in this directory')
   args = parser.parse_args()
 
   # Process input files from parsed args
@@ -353,8 +587,11 @@ if __name__ == '__main__':
       ext = os.path.splitext(input_file)[1]
       if ext == '.rdl':
         rdlc.compile_file(input_file)
-      elif ext == '.json':
-        json_importer.import_file(input_file)
+      elif ext in JSON_EXTENSIONS:
+        if args.cache_dir:
+          import_cached(rdlc, input_file, args.cache_dir)
+        else:
+          json_importer.import_file(input_file)
       else:
         rdlc.msg.fatal(
             'Unknown file extension: %s' % ext, FileSourceRef(input_file)
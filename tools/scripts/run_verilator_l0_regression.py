@@ -16,13 +16,17 @@
 
 import sys
 import os
-import shutil
-import yaml
 import re
+import json
+import time
+import shutil
+import argparse
+import resource
 import subprocess
 import logging
 import datetime
 from multiprocessing import Pool, Lock, Array
+from test_list_resolver import resolve_tests
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -105,29 +109,55 @@ def verilateTB(scratch):
     return verilatedDir
 
 def getTestNames():
-    l0_regress_file = os.path.join(os.environ.get('CALIPTRA_ROOT'), "src/integration/stimulus/L0_regression.yml")
-    testPaths = []
-    x = ''
-    integrationTestSuiteList = []
+    # L0 regression tests, minus the Verilator skip list (see test_list_resolver.py)
+    return resolve_tests("L0_regression", simulator="verilator")
 
-    with open (l0_regress_file) as f:
-        dict = yaml.load(f, Loader=yaml.FullLoader)
-        for item in dict["contents"]:
-            for key in item.keys():
-                for testKey in item[key].keys():
-                    if (testKey == 'paths'):
-                        testPaths = item[key][testKey]
+# Simulation throughput of one test: host wall and CPU time of the simulation
+# (children of this worker since usage_before) and the cycle count printed by
+# the testbench at the end of the sim
+def getSimPerf(output, usage_before, start_time):
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = (usage.ru_utime - usage_before.ru_utime) + (usage.ru_stime - usage_before.ru_stime)
+    match = re.search(r"Simulated cycles = (\d+)", output) or re.search(r"mcycle = (\d+)", output)
+    cycles = int(match.group(1)) if match else None
+    return {
+        "seconds": round(time.time() - start_time, 2),
+        "cpu_seconds": round(cpu_seconds, 2),
+        "cycles": cycles,
+        "kcycles_per_sec": round(cycles / cpu_seconds / 1000, 3) if cycles and cpu_seconds > 0 else None,
+    }
 
-    for testYml in testPaths:
-        x = re.search(r'../test_suites/(\S+)/\S+.yml', testYml)
-        # Skip clk gating tests in Verilator until PC issue is resolved
-        # https://github.com/chipsalliance/Cores-VeeR-EL2/issues/88
-        # https://github.com/chipsalliance/caliptra-rtl/issues/126
-        if (re.search(r'(smoke_test_clk_gating|smoke_test_cg_wdt|smoke_test_mbox_cg|smoke_test_kv_cg|smoke_test_doe_cg|smoke_test_dma|smoke_test_wdt_rst)',x.groups()[0])) :
-            continue
-        integrationTestSuiteList.append(x.groups()[0])
+def getRevision():
+    exitcode, resultout, resulterr = runBashScript(f"git -C {os.environ.get('CALIPTRA_ROOT')} rev-parse HEAD")
+    return resultout.decode().strip() if exitcode == 0 else None
 
-    return integrationTestSuiteList
+# Report tests whose simulation rate dropped by more than threshold percent
+# between two sim_perf.json files, returns the number of such tests
+def compareSimPerf(baseline_file, current_file, threshold):
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    with open(current_file) as f:
+        current = json.load(f)
+    logger.info(f"Simulation rate of {current.get('revision')} against baseline {baseline.get('revision')}:")
+    logger.info(f"  {'test':50} {'baseline kc/s':>14} {'current kc/s':>14} {'change':>8}")
+    slower = 0
+    for test, result in current["tests"].items():
+        base_rate = baseline["tests"].get(test, {}).get("kcycles_per_sec")
+        rate = result.get("kcycles_per_sec")
+        if not base_rate or not rate:
+            logger.info(f"  {test:50} {str(base_rate):>14} {str(rate):>14} {'n/a':>8}")
+            continue
+        change = (rate - base_rate) / base_rate * 100
+        if change < -threshold:
+            slower += 1
+            logger.warning(f"  {test:50} {base_rate:14.3f} {rate:14.3f} {change:+7.1f}%  SLOWER")
+        else:
+            logger.info(f"  {test:50} {base_rate:14.3f} {rate:14.3f} {change:+7.1f}%")
+    if slower:
+        logger.error(f"{slower} test(s) simulate more than {threshold}% slower than the baseline")
+    else:
+        logger.info(f"No test simulates more than {threshold}% slower than the baseline")
+    return slower
 
 def init_pool(lock, arr):
     global printlock
@@ -161,8 +191,18 @@ def runTest(args):
     # Invoke makefile for the current test
     mfile = os.path.join(os.environ.get('CALIPTRA_ROOT'),"tools/scripts/Makefile")
     testname = "TESTNAME=" + test
+    # Build the firmware first, so the CPU time measured is the simulation only
+    fwcmd = " ".join(["make", "-C", testdir, "-f", mfile, testname, "program.hex"])
     cmd = " ".join(["make", "-C", testdir, "-f", mfile, testname, "verilator", "VERILATOR_RUN_ARGS=+CLP_REGRESSION"])
-    exitcode, resultout, resulterr = runBashScript(cmd)
+    exitcode, resultout, resulterr = runBashScript(fwcmd)
+    perf = {}
+    if (exitcode == 0):
+        usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start_time = time.time()
+        exitcode, simout, simerr = runBashScript(cmd)
+        perf = getSimPerf(simout.decode(), usage_before, start_time)
+        resultout += simout
+        resulterr += simerr
 
     # Parse and log the results
     if not printlock.acquire(timeout=60):
@@ -198,9 +238,14 @@ def runTest(args):
         testlogger.info(resultout.decode())
         testlogger.error(resulterr.decode())
         teststatus = 1
+    perf["status"] = "passed" if teststatus == 0 else "failed"
+    if perf.get("kcycles_per_sec") is not None:
+        logger.info(f"{test}: {perf['cycles']} cycles in {perf['cpu_seconds']} s CPU = {perf['kcycles_per_sec']} kcycles/s")
+    with open(os.path.join(testdir, test + ".perf.json"), "w") as f:
+        json.dump(perf, f, indent=2)
     pending_test_arr[idx] = 0
     printlock.release()
-    return teststatus
+    return teststatus, perf
 
 def main():
     # Env vars $CALIPTRA_WORKSPACE and $CALIPTRA_ROOT must be set/present
@@ -243,9 +288,17 @@ def main():
         printlock.release()
     logger.info(f"Ending status of multiprocessing pool: {async_res.successful()}")
     test_status_list = async_res.get(None)
-    for sts in test_status_list:
+    for sts, perf in test_status_list:
         failcount += sts
 
+    # Per-test simulation throughput, for compareSimPerf and build_tests_matrix.py --durations
+    perffile = os.path.join(scratch, "sim_perf.json")
+    with open(perffile, "w") as f:
+        json.dump({"revision": getRevision(),
+                   "tests": {testname: perf for testname, (sts, perf) in zip(testnames, test_status_list)}},
+                  f, indent=2)
+    logger.info(f"Simulation throughput per test logged at: {perffile}")
+
     # Ending summary
     infoMsg = f"############################################## SUMMARY ##############################################"
     logger.info(infoMsg)
@@ -258,4 +311,12 @@ def main():
     return failcount
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the L0 smoke test regression in Verilator")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="only compare two sim_perf.json files and report tests that simulate slower")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="kcycles/s drop, in percent, reported by --compare (default: 10)")
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(1 if compareSimPerf(*args.compare, args.threshold) else 0)
     sys.exit(main())
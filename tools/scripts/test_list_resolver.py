@@ -0,0 +1,204 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Resolves the test names of a regression yml under src/integration/stimulus,
+shared by run_verilator_l0_regression.py and .github/scripts/build_tests_matrix.py.
+
+  - "tests: {tags, paths}" and "generator: {tags, templates}" entries
+  - paths that point to another testsuite yml are resolved recursively
+  - a test under src/integration/test_suites/<name>/ is named <name>, any
+    other test by its file name
+  - entries can be selected by tags, tests excluded by name, and each
+    simulator has its own skip list (SIM_SKIP_LISTS)
+  - parsed yml files are cached on disk, keyed by path and mtime
+
+Usage:
+  python3 test_list_resolver.py L0_regression [--sim verilator] [--tags L0] [--exclude a,b]
+"""
+import argparse
+import json
+import os
+import sys
+import yaml
+
+from atomic_file import atomic_open
+
+CALIPTRA_ROOT = os.environ.get('CALIPTRA_ROOT', os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../..")))
+STIMULUS_DIR = os.path.join(CALIPTRA_ROOT, "src/integration/stimulus")
+
+# Tests that can't run on a simulator, by simulator name
+SIM_SKIP_LISTS = {
+    # Skip clk gating tests in Verilator until PC issue is resolved
+    # https://github.com/chipsalliance/Cores-VeeR-EL2/issues/88
+    # https://github.com/chipsalliance/caliptra-rtl/issues/126
+    'verilator': [
+        'smoke_test_clk_gating',
+        'smoke_test_cg_wdt',
+        'smoke_test_mbox_cg',
+        'smoke_test_kv_cg',
+        'smoke_test_doe_cg',
+        'smoke_test_dma',
+        'smoke_test_wdt_rst',
+    ],
+}
+
+CACHE_FILE = os.environ.get('CALIPTRA_TEST_LIST_CACHE',
+                            os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser("~/.cache")),
+                                         "caliptra", "test_list_cache.json"))
+
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class YamlCache:
+    """Parsed yml files keyed by absolute path, valid while the mtime matches"""
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self.dirty = False
+        try:
+            with open(cache_file, "r") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def load(self, path):
+        path = os.path.abspath(path)
+        mtime = os.stat(path).st_mtime_ns
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        with open(path, "r") as f:
+            data = yaml.load(f, Loader=YamlLoader)
+        self.entries[path] = [mtime, data]
+        self.dirty = True
+        return data
+
+    def save(self):
+        if not self.dirty or not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with atomic_open(self.cache_file) as f:
+                json.dump(self.entries, f)
+            self.dirty = False
+        except (OSError, TypeError):
+            # the cache is only an optimization
+            pass
+
+
+def find_regression(regression):
+    """A path, or a regression name under src/integration/stimulus (or its testsuites/)"""
+    candidates = [regression]
+    name = regression if regression.endswith(".yml") else regression + ".yml"
+    candidates += [os.path.join(STIMULUS_DIR, name), os.path.join(STIMULUS_DIR, "testsuites", name)]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.abspath(candidate)
+    raise FileNotFoundError(f"No regression yml found for {regression}")
+
+
+def expand_path(path, base_dir):
+    path = path.replace("${CALIPTRA_ROOT}", CALIPTRA_ROOT).replace("$CALIPTRA_ROOT", CALIPTRA_ROOT)
+    path = os.path.expandvars(path)
+    return os.path.normpath(os.path.join(base_dir, path))
+
+
+def test_name(path):
+    parts = path.split(os.sep)
+    if "test_suites" in parts[:-1]:
+        return parts[parts.index("test_suites") + 1]
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def resolve_entries(regression, cache=None, _seen=None):
+    """
+    Returns (test name, test yml path, tags) for every test of a regression,
+    in file order and following nested testsuites.
+    """
+    own_cache = cache is None
+    if own_cache:
+        cache = YamlCache()
+    seen = set() if _seen is None else _seen
+    path = find_regression(regression)
+    if path in seen:
+        return []
+    seen.add(path)
+
+    entries = []
+    base_dir = os.path.dirname(path)
+    root = cache.load(path) or {}
+    for item in root.get("contents") or []:
+        for kind, content in item.items():
+            content = content or {}
+            tags = list(content.get("tags") or [])
+            if kind == "tests":
+                paths = content.get("paths") or []
+            elif kind == "generator":
+                paths = list((content.get("templates") or {}).keys())
+            else:
+                continue
+            for test_path in paths:
+                test_path = expand_path(test_path, base_dir)
+                if "test_suites" not in test_path.split(os.sep) and test_path.endswith(".yml") and os.path.isfile(test_path):
+                    nested = cache.load(test_path)
+                    if isinstance(nested, dict) and "contents" in nested:
+                        entries += [(name, p, tags + t) for name, p, t in resolve_entries(test_path, cache, seen)]
+                        continue
+                entries.append((test_name(test_path), test_path, tags))
+
+    if own_cache:
+        cache.save()
+    return entries
+
+
+def resolve_tests(regression, simulator=None, tags=None, exclude_tags=None, excluded=()):
+    """
+    Test names of a regression, without duplicates: entries with any of tags
+    (if given) and none of exclude_tags, minus excluded names and the skip
+    list of simulator.
+    """
+    skipped = set(excluded) | set(SIM_SKIP_LISTS.get(simulator, []))
+    names = []
+    for name, _, entry_tags in resolve_entries(regression):
+        if tags and not set(tags) & set(entry_tags):
+            continue
+        if exclude_tags and set(exclude_tags) & set(entry_tags):
+            continue
+        if name not in skipped and name not in names:
+            names.append(name)
+    return names
+
+
+def split_list(value):
+    return [s.strip() for s in (value or "").split(",") if s.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the tests of a regression yml")
+    parser.add_argument("regression", help="regression name or yml path, e.g. L0_regression")
+    parser.add_argument("--sim", choices=sorted(SIM_SKIP_LISTS), default=None, help="apply this simulator's skip list")
+    parser.add_argument("--tags", default="", help="comma-separated tags, entries need one of them")
+    parser.add_argument("--exclude-tags", default="", help="comma-separated tags to leave out")
+    parser.add_argument("--exclude", default=os.environ.get("EXCLUDE_TESTS", ""),
+                        help="comma-separated test names to leave out (default: $EXCLUDE_TESTS)")
+    args = parser.parse_args()
+
+    try:
+        tests = resolve_tests(args.regression, args.sim, split_list(args.tags), split_list(args.exclude_tags),
+                              split_list(args.exclude))
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print("\n".join(tests))